@@ -24,13 +24,14 @@
 
 
 import os
+import threading
 
 from openfisca_core.taxbenefitsystems import XmlBasedTaxBenefitSystem
 
 from .entities import entity_class_by_symbol
 from .scenarios import Scenario
 from . import param
-from .param import preprocessing
+from .param import legislation_cache, preprocessing
 
 
 # TaxBenefitSystems
@@ -47,6 +48,16 @@ def init_country():
             )
         preprocess_legislation = staticmethod(preprocessing.preprocess_legislation)
 
+        def __init__(self, entity_class_by_key_plural = None):
+            # Skip XmlBasedTaxBenefitSystem.__init__: the preprocessed legislation is read from the on-disk cache.
+            super(XmlBasedTaxBenefitSystem, self).__init__(
+                entity_class_by_key_plural = entity_class_by_key_plural,
+                legislation_json = legislation_cache.load_legislation_json(
+                    self.legislation_xml_file_path,
+                    self.preprocess_legislation,
+                    ),
+                )
+
         def prefill_cache(self):
             # Define categorie_fiscale_* and poste_coicp_* variables
             from .model.consommation import categories_fiscales
@@ -73,3 +84,25 @@ def init_tax_benefit_system():
     TaxBenefitSystem = init_country()
     tax_benefit_system = TaxBenefitSystem()
     return tax_benefit_system
+
+
+shared_tax_benefit_system = None
+shared_tax_benefit_system_lock = threading.Lock()
+
+
+def get_tax_benefit_system():
+    """
+    Return the TaxBenefitSystem shared by the whole process, built with its cache prefilled on first call.
+
+    Call it before forking workers (multiprocessing.Pool, etc) so that they inherit the already built system instead of
+    building their own.
+    """
+    global shared_tax_benefit_system
+    if shared_tax_benefit_system is None:
+        with shared_tax_benefit_system_lock:
+            if shared_tax_benefit_system is None:
+                TaxBenefitSystem = init_country()
+                tax_benefit_system = TaxBenefitSystem()
+                tax_benefit_system.prefill_cache()
+                shared_tax_benefit_system = tax_benefit_system
+    return shared_tax_benefit_system
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Agrégats pondérés de plusieurs variables par groupes de ménages (décile, strate, typmen, zeat...), calculés en une
+seule passe.
+
+Les groupes sont numérotés une fois par un code entier, puis chaque statistique de chaque variable est la somme par
+groupe d'un seul numpy.bincount, au lieu d'un regroupement complet de la population par variable.
+"""
+
+
+from __future__ import division
+
+import collections
+
+import numpy
+import pandas
+
+
+statistics = ('weight', 'count', 'sum', 'mean', 'share')
+
+
+def compute_weighted_aggregates(simulation, values, by, filter_by = None, period = None,
+        weights_variable = 'pondmen'):
+    """
+    Renvoie la table longue des agrégats pondérés des variables de values par groupe des variables de by.
+
+    La table a une ligne par variable et par groupe non vide : les modalités des variables de by, puis les colonnes
+    variable, weight (somme des poids du groupe), count (nombre d'observations), sum (somme pondérée), mean (moyenne
+    pondérée) et share (part du groupe dans la somme pondérée de la variable). Si filter_by est donné, seules les
+    observations où cette variable est vraie sont agrégées.
+    """
+    if period is None:
+        period = simulation.period
+    if isinstance(values, basestring):
+        values = [values]
+    if isinstance(by, basestring):
+        by = [by]
+    entity = simulation.get_or_new_holder(weights_variable).entity
+
+    def calculate(variable):
+        assert simulation.get_or_new_holder(variable).entity is entity, \
+            "Variable {} doesn't belong to the entity of {}".format(variable, weights_variable)
+        # As AbstractSurveyScenario.compute_pivot_table, sum the values of the variable over the period.
+        return simulation.calculate_add(variable, period)
+
+    weights = calculate(weights_variable).astype(numpy.float64)
+    selection = None if filter_by is None else calculate(filter_by).astype(bool)
+    if selection is not None:
+        weights = weights[selection]
+
+    # Mixed radix code of the groups: one digit per variable of by.
+    codes = numpy.zeros(len(weights), dtype = numpy.int64)
+    levels_by_variable = collections.OrderedDict()
+    for variable in by:
+        data = calculate(variable)
+        if selection is not None:
+            data = data[selection]
+        levels, variable_codes = numpy.unique(data, return_inverse = True)
+        levels_by_variable[variable] = levels
+        codes = codes * len(levels) + variable_codes
+    shape = [len(variable_levels) for variable_levels in levels_by_variable.itervalues()]
+    groups_count = int(numpy.prod(shape))
+    if groups_count > len(codes):
+        # Most combinations are empty: number only the observed ones.
+        groups, codes = numpy.unique(codes, return_inverse = True)
+    else:
+        groups = numpy.arange(groups_count)
+
+    weight_by_group = sum_by_group(codes, weights, len(groups))
+    count_by_group = sum_by_group(codes, None, len(groups)).astype(numpy.int64)
+    observed = count_by_group > 0
+    groups = groups[observed]
+    weight_by_group = weight_by_group[observed]
+    count_by_group = count_by_group[observed]
+    level_index_by_variable = dict(zip(
+        by,
+        numpy.unravel_index(groups, shape) if by else [],
+        ))
+
+    sum_by_variable = collections.OrderedDict()
+    for variable in values:
+        data = calculate(variable).astype(numpy.float64)
+        if selection is not None:
+            data = data[selection]
+        sum_by_variable[variable] = sum_by_group(codes, weights * data, len(observed))[observed]
+
+    groups_per_variable = len(groups)
+    columns = collections.OrderedDict(
+        (variable, numpy.tile(levels[level_index_by_variable[variable]], len(values)))
+        for variable, levels in levels_by_variable.iteritems()
+        )
+    columns['variable'] = numpy.repeat(values, groups_per_variable)
+    columns['weight'] = numpy.tile(weight_by_group, len(values))
+    columns['count'] = numpy.tile(count_by_group, len(values))
+    sums = numpy.concatenate(sum_by_variable.values()) if values else numpy.zeros(0)
+    columns['sum'] = sums
+    with numpy.errstate(divide = 'ignore', invalid = 'ignore'):
+        columns['mean'] = sums / columns['weight']
+        columns['share'] = numpy.concatenate([
+            variable_sums / variable_sums.sum()
+            for variable_sums in sum_by_variable.itervalues()
+            ]) if values else numpy.zeros(0)
+    return pandas.DataFrame(columns)
+
+
+def sum_by_group(codes, weights, groups_count):
+    # Old versions of numpy.bincount require a positive minlength.
+    return numpy.bincount(codes, weights = weights, minlength = max(groups_count, 1))[:groups_count]
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Mesures de performance du modèle sur des populations synthétiques de ménages (voir le module synthetic), sans les
+données de l'enquête BdF.
+
+Chaque mesure est faite dans un processus fils neuf : les caches de module (registre des variables, variables
+générées par prefill_cache...) n'y sont pas encore remplis par une mesure précédente, et le pic de mémoire mesuré est
+celui de la mesure seule. Les rapports sont des dicts sérialisables en JSON, comparables d'un commit à l'autre avec
+compare_reports.
+"""
+
+
+from __future__ import division
+
+import collections
+import datetime
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy
+import pkg_resources
+
+
+log = logging.getLogger(__name__)
+
+benchmark_variables = ('taxes_indirectes_total', 'ticpe_totale', 'niveau_vie_decile')
+default_sizes = (1000, 100000, 1000000)
+distributions = ('numpy', 'OpenFisca-Core', 'OpenFisca-France-Indirect-Taxation', 'pandas', 'scipy')
+report_version = 1
+
+
+def compare_reports(reference_report, report, threshold = .1):
+    """
+    Compare les meilleurs temps de deux rapports, mesure par mesure.
+
+    Renvoie la liste des mesures communes aux deux rapports, avec le rapport des temps et un booléen regression vrai
+    quand le temps a augmenté de plus de threshold (en proportion).
+    """
+    reference_result_by_key = dict(
+        ((result['name'], result['households']), result)
+        for result in reference_report['results']
+        )
+    comparisons = []
+    for result in report['results']:
+        reference_result = reference_result_by_key.get((result['name'], result['households']))
+        if reference_result is None:
+            continue
+        ratio = result['best'] / reference_result['best'] if reference_result['best'] > 0 else None
+        comparisons.append(collections.OrderedDict([
+            ('name', result['name']),
+            ('households', result['households']),
+            ('reference_best', reference_result['best']),
+            ('best', result['best']),
+            ('ratio', ratio),
+            ('regression', ratio is not None and ratio > 1 + threshold),
+            ]))
+    return comparisons
+
+
+def get_environment():
+    version_by_distribution = dict()
+    for distribution in distributions:
+        try:
+            version_by_distribution[distribution] = pkg_resources.get_distribution(distribution).version
+        except pkg_resources.DistributionNotFound:
+            version_by_distribution[distribution] = None
+    with open(os.devnull, 'w') as devnull:
+        try:
+            commit = subprocess.check_output(
+                ['git', 'rev-parse', 'HEAD'],
+                cwd = os.path.dirname(os.path.abspath(__file__)),
+                stderr = devnull,
+                ).strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+    return collections.OrderedDict([
+        ('commit', commit),
+        ('cpu_count', multiprocessing.cpu_count()),
+        ('date', datetime.datetime.utcnow().isoformat()),
+        ('machine', platform.machine()),
+        ('platform', platform.platform()),
+        ('python', platform.python_version()),
+        ('versions', version_by_distribution),
+        ])
+
+
+def get_peak_rss():
+    """Renvoie le pic de mémoire résidente du processus, en octets."""
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on Mac OS X.
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+def iter_benchmarks(sizes = default_sizes, variables = benchmark_variables, year = 2011):
+    """
+    Renvoie les mesures à faire, sous forme de triplets (nom, nombre de ménages ou None, fonction de préparation).
+
+    La fonction de préparation, appelée dans le processus fils, prépare ce qui n'est pas mesuré et renvoie la
+    fonction mesurée.
+    """
+    yield 'tax_benefit_system', None, setup_tax_benefit_system
+    yield 'preprocess_legislation', None, setup_preprocess_legislation
+    yield 'prefill_cache', None, setup_prefill_cache
+    for size in sizes:
+        for variable in variables:
+            yield 'calculate:{}'.format(variable), size, SetupCalculate(variable, size, year)
+
+
+def run_benchmark(name, households, setup, repeat = 3):
+    """Mesure repeat fois une fonction, chaque fois dans un processus fils neuf, et renvoie le résultat."""
+    times = []
+    peak_rss = 0
+    peak_rss_increase = 0
+    for _ in range(repeat):
+        receiver, sender = multiprocessing.Pipe(duplex = False)
+        process = multiprocessing.Process(target = run_benchmark_child, args = (setup, sender))
+        process.start()
+        sender.close()
+        try:
+            measure = receiver.recv()
+        except EOFError:
+            measure = dict(error = u'Benchmark process exited with code {}'.format(process.exitcode))
+        process.join()
+        if 'error' in measure:
+            raise RuntimeError(u'Benchmark {} ({} households) failed: {}'.format(
+                name, households, measure['error']).encode('utf-8'))
+        times.append(measure['time'])
+        peak_rss = max(peak_rss, measure['peak_rss'])
+        peak_rss_increase = max(peak_rss_increase, measure['peak_rss_increase'])
+    log.info(u'{} ({} households): {:.3f} s'.format(name, households, min(times)))
+    return collections.OrderedDict([
+        ('name', name),
+        ('households', households),
+        ('repeat', repeat),
+        ('times', times),
+        ('best', min(times)),
+        ('median', float(numpy.median(times))),
+        ('peak_rss', peak_rss),
+        ('peak_rss_increase', peak_rss_increase),
+        ])
+
+
+def run_benchmark_child(setup, sender):
+    try:
+        function = setup()
+        peak_rss_before = get_peak_rss()
+        start = time.time()
+        function()
+        measure = dict(time = time.time() - start)
+        measure['peak_rss'] = get_peak_rss()
+        measure['peak_rss_increase'] = measure['peak_rss'] - peak_rss_before
+    except Exception as error:
+        log.exception(u'Benchmark failed')
+        measure = dict(error = repr(error))
+    sender.send(measure)
+    sender.close()
+
+
+def run_benchmarks(sizes = default_sizes, repeat = 3, variables = benchmark_variables, year = 2011, names = None):
+    """
+    Mesure la construction du TaxBenefitSystem, prefill_cache, preprocess_legislation et le calcul complet des
+    variables sur des populations synthétiques des tailles données.
+
+    Renvoie un rapport sérialisable en JSON : environnement de la mesure (commit, versions...) et, pour chaque
+    mesure, les temps de chaque répétition, le meilleur et le médian (en secondes), le pic de mémoire résidente du
+    processus et son augmentation pendant la mesure (en octets). names restreint les mesures faites à ces noms.
+    """
+    results = [
+        run_benchmark(name, households, setup, repeat = repeat)
+        for name, households, setup in iter_benchmarks(sizes = sizes, variables = variables, year = year)
+        if names is None or name in names
+        ]
+    return collections.OrderedDict([
+        ('version', report_version),
+        ('environment', get_environment()),
+        ('year', year),
+        ('results', results),
+        ])
+
+
+class SetupCalculate(object):
+    def __init__(self, variable, size, year):
+        self.size = size
+        self.variable = variable
+        self.year = year
+
+    def __call__(self):
+        from . import get_tax_benefit_system
+        from .synthetic import build_synthetic_input_data_frame, new_synthetic_simulation
+
+        simulation = new_synthetic_simulation(
+            get_tax_benefit_system(),
+            build_synthetic_input_data_frame(self.size, self.year),
+            self.year,
+            )
+        return lambda: simulation.calculate(self.variable)
+
+
+def setup_prefill_cache():
+    from . import init_tax_benefit_system
+
+    return init_tax_benefit_system().prefill_cache
+
+
+def setup_preprocess_legislation():
+    from . import init_country
+    from .param import legislation_cache, preprocessing
+
+    TaxBenefitSystem = init_country()
+    legislation_json = legislation_cache.build_legislation_json(TaxBenefitSystem.legislation_xml_file_path)
+    return lambda: preprocessing.preprocess_legislation(legislation_json)
+
+
+def setup_tax_benefit_system():
+    from . import init_tax_benefit_system
+
+    return init_tax_benefit_system
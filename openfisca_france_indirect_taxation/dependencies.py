@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Graphe des dépendances entre variables, relevé en calculant les variables demandées sur une simulation témoin.
+
+Les formules appellent souvent simulation.calculate avec des noms construits à l'exécution (postes COICOP,
+catégories fiscales...) : le graphe est donc relevé pendant un calcul à blanc plutôt que par lecture du code des
+formules. Il sert à ne charger que les entrées utiles, à ordonner et paralléliser les calculs et à savoir quelles
+variables recalculer après une modification.
+"""
+
+
+from __future__ import division
+
+import collections
+import contextlib
+import json
+import logging
+import time
+
+import numpy
+
+from openfisca_core import periods
+
+
+log = logging.getLogger(__name__)
+
+compute_methods_names = ('compute', 'compute_add', 'compute_add_divide', 'compute_divide')
+# Functions (period) -> dict variable -> dependencies, for formulas computing several variables in one batch: the
+# calls recorded while running such a formula would be those of the whole batch.
+declared_dependencies_functions = []
+
+
+class DependencyGraph(object):
+    """
+    Graphe orienté acyclique des variables d'une période : chaque variable pointe vers les variables dont sa formule
+    a besoin.
+
+    Les ancêtres d'une variable sont les variables dont elle dépend (directement ou non), ses descendants celles qui
+    dépendent d'elle. Le coût d'une variable est le temps passé dans sa propre formule lors du calcul à blanc.
+    """
+    cost_by_variable = None
+    dependencies_by_variable = None
+    dependents_by_variable = None
+    error_by_variable = None  # Variables whose formula failed during the dry run
+    input_variables = None  # Variables without formula
+    period = None
+
+    def __init__(self, period, dependencies_by_variable, cost_by_variable = None, error_by_variable = None,
+            input_variables = None):
+        self.period = periods.period(period)
+        self.dependencies_by_variable = collections.OrderedDict(
+            (variable, set(dependencies))
+            for variable, dependencies in dependencies_by_variable.iteritems()
+            )
+        for dependencies in dependencies_by_variable.values():
+            for dependency in dependencies:
+                self.dependencies_by_variable.setdefault(dependency, set())
+        self.dependents_by_variable = collections.OrderedDict(
+            (variable, set()) for variable in self.dependencies_by_variable)
+        for variable, dependencies in self.dependencies_by_variable.iteritems():
+            for dependency in dependencies:
+                self.dependents_by_variable[dependency].add(variable)
+        self.cost_by_variable = dict(cost_by_variable or dict())
+        self.error_by_variable = dict(error_by_variable or dict())
+        self.input_variables = set(input_variables or ())
+
+    def __contains__(self, variable):
+        return variable in self.dependencies_by_variable
+
+    def __len__(self):
+        return len(self.dependencies_by_variable)
+
+    def ancestors(self, *variables):
+        """Renvoie les variables dont dépendent, directement ou non, les variables données."""
+        return self._walk(variables, self.dependencies_by_variable)
+
+    def cost(self, variable):
+        return self.cost_by_variable.get(variable, 0)
+
+    def cumulative_cost(self, variable):
+        """Renvoie le coût de la variable et de toutes les variables dont elle dépend."""
+        return self.cost(variable) + sum(self.cost(ancestor) for ancestor in self.ancestors(variable))
+
+    def descendants(self, *variables):
+        """Renvoie les variables qui dépendent, directement ou non, des variables données."""
+        return self._walk(variables, self.dependents_by_variable)
+
+    @classmethod
+    def load(cls, file_path):
+        with open(file_path) as graph_file:
+            graph_json = json.load(graph_file)
+        nodes = graph_json['nodes']
+        return cls(
+            graph_json['period'],
+            collections.OrderedDict((node['name'], node['dependencies']) for node in nodes),
+            cost_by_variable = dict((node['name'], node['cost']) for node in nodes),
+            error_by_variable = dict((node['name'], node['error']) for node in nodes if node.get('error')),
+            input_variables = [node['name'] for node in nodes if node['is_input']],
+            )
+
+    def to_dot(self):
+        lines = [u'digraph dependencies {']
+        for variable in self.topological_order():
+            lines.append(u'  "{}"{};'.format(variable, u' [shape=box]' if variable in self.input_variables else u''))
+            lines.extend(
+                u'  "{}" -> "{}";'.format(dependency, variable)
+                for dependency in sorted(self.dependencies_by_variable[variable])
+                )
+        lines.append(u'}')
+        return u'\n'.join(lines) + u'\n'
+
+    def to_json(self):
+        return collections.OrderedDict((
+            ('period', unicode(self.period)),
+            ('nodes', [
+                collections.OrderedDict((
+                    ('name', variable),
+                    ('dependencies', sorted(self.dependencies_by_variable[variable])),
+                    ('cost', self.cost(variable)),
+                    ('is_input', variable in self.input_variables),
+                    ('error', self.error_by_variable.get(variable)),
+                    ))
+                for variable in self.topological_order()
+                ]),
+            ))
+
+    def topological_order(self, variables = None):
+        """
+        Renvoie les variables (toutes, ou celles données et leurs ancêtres) dans un ordre où chaque variable suit
+        celles dont elle dépend.
+        """
+        if variables is None:
+            selected_variables = set(self.dependencies_by_variable)
+        else:
+            selected_variables = self.ancestors(*variables).union(variables)
+        order = []
+        visited = set()
+        for root in sorted(selected_variables):
+            if root in visited:
+                continue
+            # Iterative depth-first search, to support deep graphs.
+            visited.add(root)
+            stack = [(root, iter(sorted(self.dependencies_by_variable.get(root, ()))))]
+            while stack:
+                variable, dependencies = stack[-1]
+                for dependency in dependencies:
+                    if dependency not in visited:
+                        visited.add(dependency)
+                        stack.append((dependency, iter(sorted(self.dependencies_by_variable.get(dependency, ())))))
+                        break
+                else:
+                    stack.pop()
+                    order.append(variable)
+        return order
+
+    def write(self, file_path):
+        """Écrit le graphe au format JSON, ou au format Graphviz si le fichier a l'extension .dot."""
+        with open(file_path, 'w') as graph_file:
+            if file_path.endswith('.dot'):
+                graph_file.write(self.to_dot().encode('utf-8'))
+            else:
+                json.dump(self.to_json(), graph_file, indent = 2)
+
+    def _walk(self, variables, neighbours_by_variable):
+        visited = set()
+        pending = []
+        for variable in variables:
+            pending.extend(neighbours_by_variable.get(variable, ()))
+        while pending:
+            variable = pending.pop()
+            if variable in visited:
+                continue
+            visited.add(variable)
+            pending.extend(neighbours_by_variable.get(variable, ()))
+        return visited
+
+
+def build_dependency_graph(tax_benefit_system, period, variables = None, simulation = None):
+    """
+    Relève le graphe des dépendances en calculant les variables données (par défaut toutes celles qui ont une
+    formule) sur une simulation témoin d'un ménage, ou sur la simulation donnée pour mesurer des coûts réalistes.
+
+    Les variables dont la formule échoue sont gardées dans le graphe, avec les dépendances relevées avant l'erreur,
+    et leur erreur est notée dans error_by_variable.
+    """
+    period = periods.period(period)
+    column_by_name = tax_benefit_system.column_by_name
+    if variables is None:
+        variables = sorted(
+            name
+            for name, column in column_by_name.iteritems()
+            if not column.is_input_variable()
+            )
+    if simulation is None:
+        simulation = tax_benefit_system.new_scenario().init_single_entity(
+            period = period,
+            personne_de_reference = dict(),
+            ).new_simulation()
+    dependencies_by_variable = collections.OrderedDict()
+    cost_by_variable = collections.defaultdict(float)
+    error_by_variable = dict()
+    # Frames of the variables being computed: [variable, start time, time spent in dependencies]
+    stack = []
+
+    def recording(compute):
+        def recording_compute(column_name, period = None, **parameters):
+            if stack and stack[-1][0] != column_name:
+                dependencies_by_variable[stack[-1][0]].add(column_name)
+            dependencies_by_variable.setdefault(column_name, set())
+            start = time.time()
+            stack.append([column_name, start, 0])
+            try:
+                return compute(column_name, period = period, **parameters)
+            finally:
+                _, _, children_duration = stack.pop()
+                duration = time.time() - start
+                cost_by_variable[column_name] += duration - children_duration
+                if stack:
+                    stack[-1][2] += duration
+        return recording_compute
+
+    # Fast paths computing several variables in one go (see taux_effectifs_applicables) would put them in cache
+    # without recording their dependencies, making the graph depend on the order of the variables: they are disabled
+    # during the dry run.
+    recording_dependencies = getattr(simulation, 'recording_dependencies', False)
+    simulation.recording_dependencies = True
+    # The probe household has only default (zero) inputs.
+    try:
+        with wrapped_compute_methods(simulation, recording), numpy.errstate(all = 'ignore'):
+            for variable in variables:
+                try:
+                    simulation.calculate(variable, period)
+                except Exception as error:
+                    log.info(u'Unable to calculate {} during the dependencies dry run: {}'.format(variable, error))
+                    error_by_variable[variable] = unicode(repr(error))
+    finally:
+        simulation.recording_dependencies = recording_dependencies
+
+    for declared_dependencies_function in declared_dependencies_functions:
+        for variable, dependencies in declared_dependencies_function(period).iteritems():
+            if variable in dependencies_by_variable:
+                dependencies_by_variable[variable] = set(dependencies)
+    # Drop the variables only read by batches for other variables.
+    reachable_variables = set(variables)
+    pending = list(variables)
+    while pending:
+        for dependency in dependencies_by_variable.get(pending.pop(), ()):
+            if dependency not in reachable_variables:
+                reachable_variables.add(dependency)
+                pending.append(dependency)
+    dependencies_by_variable = collections.OrderedDict(
+        (variable, dependencies)
+        for variable, dependencies in dependencies_by_variable.iteritems()
+        if variable in reachable_variables
+        )
+
+    return DependencyGraph(
+        period,
+        dependencies_by_variable,
+        cost_by_variable = cost_by_variable,
+        error_by_variable = error_by_variable,
+        input_variables = [
+            variable
+            for variable in dependencies_by_variable
+            if variable in column_by_name and column_by_name[variable].is_input_variable()
+            ],
+        )
+
+
+def record_dependencies(tax_benefit_system, variables, period):
+    """
+    Calcule les variables sur une simulation témoin d'un ménage et renvoie le dict ordonné variable -> ensemble des
+    variables appelées directement par sa formule, pour la période donnée.
+    """
+    return build_dependency_graph(tax_benefit_system, period, variables = variables).dependencies_by_variable
+
+
+def get_population_wide_variables(tax_benefit_system, period, variables):
+    """
+    Renvoie celles des variables dont la valeur pour un ménage dépend des autres ménages simulés, c'est-à-dire dont
+    la formule lit, directement ou non, les poids des ménages (quantiles.population_weights_variables) : déciles de
+    niveau de vie, de dépenses...
+    """
+    from .model.quantiles import population_weights_variables
+
+    graph = build_dependency_graph(tax_benefit_system, period, variables = variables)
+    return set(
+        variable
+        for variable in variables
+        if population_weights_variables & graph.ancestors(variable)
+        )
+
+
+def get_required_input_variables(tax_benefit_system, variables, period, available_variables = None):
+    """
+    Renvoie l'ensemble des variables d'entrée nécessaires au calcul des variables demandées.
+
+    Si available_variables (les colonnes d'une table d'entrée) est donné, le parcours s'arrête aux variables
+    disponibles, même quand elles ont une formule, puisque leur valeur lue remplace alors la formule, et seules des
+    variables disponibles sont renvoyées. Sinon, ce sont les variables sans formule atteintes qui sont renvoyées.
+    """
+    dependencies_by_variable = record_dependencies(tax_benefit_system, variables, period)
+    column_by_name = tax_benefit_system.column_by_name
+    if available_variables is not None:
+        available_variables = set(available_variables)
+    required_variables = set()
+    visited = set()
+    pending = list(variables)
+    while pending:
+        variable = pending.pop()
+        if variable in visited:
+            continue
+        visited.add(variable)
+        if variable not in column_by_name:
+            # Formulas may try to calculate variables absent from the model (see depenses_tva_taux_reduit).
+            continue
+        if available_variables is not None:
+            if variable in available_variables:
+                required_variables.add(variable)
+                continue
+        elif column_by_name[variable].is_input_variable():
+            required_variables.add(variable)
+        pending.extend(dependencies_by_variable.get(variable, ()))
+    return required_variables
+
+
+def restore_compute_methods(simulation, original_compute_by_name):
+    """Rétablit les méthodes compute* remplacées par wrap_compute_methods."""
+    for method_name, original_compute in original_compute_by_name.iteritems():
+        if original_compute is None:
+            delattr(simulation, method_name)
+        else:
+            setattr(simulation, method_name, original_compute)
+
+
+def wrap_compute_methods(simulation, wrap):
+    """
+    Remplace les méthodes compute* de la simulation par wrap(méthode), et renvoie les attributs remplacés, à donner à
+    restore_compute_methods.
+
+    Les formules appellent simulation.calculate*, qui appellent self.compute* : les attributs d'instance sont
+    prioritaires sur les méthodes de la classe.
+    """
+    original_compute_by_name = dict(
+        (method_name, simulation.__dict__.get(method_name))
+        for method_name in compute_methods_names
+        )
+    for method_name in compute_methods_names:
+        setattr(simulation, method_name, wrap(getattr(simulation, method_name)))
+    return original_compute_by_name
+
+
+@contextlib.contextmanager
+def wrapped_compute_methods(simulation, wrap):
+    """Remplace temporairement les méthodes compute* de la simulation par wrap(méthode)."""
+    original_compute_by_name = wrap_compute_methods(simulation, wrap)
+    try:
+        yield simulation
+    finally:
+        restore_compute_methods(simulation, original_compute_by_name)
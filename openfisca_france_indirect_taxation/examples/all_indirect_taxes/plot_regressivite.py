@@ -8,12 +8,11 @@ Created on Thu Feb 04 11:28:12 2016
 # Import de modules généraux
 from __future__ import division
 
-import pandas
 import seaborn
 
 # Import de modules spécifiques à Openfisca
 from openfisca_france_indirect_taxation.examples.utils_example import graph_builder_bar
-from openfisca_france_indirect_taxation.surveys import SurveyScenario
+from openfisca_france_indirect_taxation.runner import run_jobs
 
 # Import d'une nouvelle palette de couleurs
 seaborn.set_palette(seaborn.color_palette("Set2", 12))
@@ -38,15 +37,14 @@ if __name__ == '__main__':
         'somme_coicop12',
         'taxes_indirectes_total'
         ]
-    for year in [2000, 2005, 2011]:
-        survey_scenario = SurveyScenario.create(year = year)
-        pivot_table = pandas.DataFrame()
-        for values in simulated_variables:
-            pivot_table = pandas.concat([
-                pivot_table,
-                survey_scenario.compute_pivot_table(values = [values], columns = ['niveau_vie_decile'])
-                ])
-        taxe_indirectes = pivot_table.T
+    jobs = [dict(year = year) for year in [2000, 2005, 2011]]
+    results = sorted(
+        run_jobs(jobs, columns = ['niveau_vie_decile'], values = simulated_variables),
+        key = lambda (job, _): job['year'],
+        )
+    for job, data_frame in results:
+        year = job['year']
+        taxe_indirectes = data_frame.pivot(index = 'niveau_vie_decile', columns = 'variable', values = 'value')
 
         taxe_indirectes['TVA'] = taxe_indirectes['tva_total']
         taxe_indirectes['TICPE'] = taxe_indirectes['ticpe_totale']
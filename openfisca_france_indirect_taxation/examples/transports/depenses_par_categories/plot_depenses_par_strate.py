@@ -12,7 +12,6 @@ Created on Fri Sep 18 11:11:34 2015
 # Import de modules généraux
 from __future__ import division
 
-import pandas
 import seaborn
 
 # Import de modules spécifiques à Openfisca
@@ -28,13 +27,8 @@ if __name__ == '__main__':
     simulated_variables = ['depenses_carburants', 'depenses_essence', 'depenses_diesel', 'revtot']
     for year in [2000, 2005, 2011]:
         survey_scenario = SurveyScenario.create(year = year)
-        pivot_table = pandas.DataFrame()
-        for values in simulated_variables:
-            pivot_table = pandas.concat([
-                pivot_table,
-                survey_scenario.compute_pivot_table(values = [values], columns = ['strate'])
-                ])
-        df = pivot_table.T
+        df = survey_scenario.compute_aggregates(simulated_variables, ['strate']).pivot(
+            index = 'strate', columns = 'variable', values = 'mean')
 
         # Réalisation de graphiques
         for element in simulated_variables:
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Tables d'entrée matérialisées en tableaux numpy projetés en mémoire, pour les simulations lancées en parallèle.
+
+Chaque colonne de la table d'entrée d'une année est écrite une fois dans le répertoire de cache de l'utilisateur,
+au niveau de son entité et dans le type de sa colonne. Les holders reçoivent directement les tableaux projetés en
+lecture seule : tous les processus qui simulent la même année partagent une seule copie physique des données, dans
+le cache de pages du système.
+"""
+
+
+import collections
+import errno
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy
+import pandas
+
+from openfisca_core import formulas
+
+from .utils import get_cache_directory
+
+
+log = logging.getLogger(__name__)
+
+metadata_file_name = 'columns.json'
+# Person-level columns used to build the entities, kept in the input data frame.
+structure_columns = ('ident_men', 'pondmen', 'role_menage')
+
+
+def get_input_arrays(year, columns = None, directory = None, tax_benefit_system = None):
+    """
+    Renvoie la table d'entrée de l'année sous forme de tableaux projetés, en la matérialisant au premier appel.
+
+    Renvoie la table de structure (colonnes de structure_columns, chargées en mémoire) et le dict ordonné
+    variable -> tableau en lecture seule au niveau de son entité, limité aux colonnes données si columns n'est pas
+    None.
+    """
+    from .surveys import get_input_data_frame, get_input_data_hash
+
+    if directory is None:
+        cache_directory = get_cache_directory()
+        assert cache_directory is not None, "Memory-mapped inputs need a writable cache directory"
+        directory = os.path.join(cache_directory, 'input_arrays', '{}-{}'.format(year, get_input_data_hash(year)[:16]))
+    if not os.path.exists(os.path.join(directory, metadata_file_name)):
+        if tax_benefit_system is None:
+            from . import get_tax_benefit_system
+            tax_benefit_system = get_tax_benefit_system()
+        log.info(u'Materializing the {} input table in {}'.format(year, directory))
+        materialize_input_arrays(get_input_data_frame(year), directory, tax_benefit_system)
+    return load_input_arrays(directory, columns = columns)
+
+
+def iter_household_chunks(structure_data_frame, array_by_variable, chunk_size, tax_benefit_system):
+    """
+    Découpe la population en blocs d'au plus chunk_size ménages consécutifs.
+
+    Renvoie, bloc après bloc, la table de structure des individus du bloc (dans leur ordre d'origine) et le dict
+    variable -> tableau du bloc. Les tableaux des ménages sont des tranches des tableaux projetés : seules les pages
+    du bloc sont lues sur le disque.
+    """
+    assert chunk_size > 0
+    column_by_name = tax_benefit_system.column_by_name
+    ident_men = structure_data_frame['ident_men'].values
+    is_menage_head = structure_data_frame['role_menage'].values == 0
+    # Menage-level arrays are in the order of the household heads in the structure table.
+    heads_ident_men = ident_men[is_menage_head]
+    heads_order = numpy.argsort(heads_ident_men, kind = 'mergesort')
+    menage_index = heads_order[numpy.searchsorted(heads_ident_men[heads_order], ident_men)]
+    assert (heads_ident_men[menage_index] == ident_men).all(), "Some individuals have no household head"
+    persons_order = numpy.argsort(menage_index, kind = 'mergesort')
+    sorted_menage_index = menage_index[persons_order]
+    menages_count = len(heads_ident_men)
+    for start in xrange(0, menages_count, chunk_size):
+        stop = min(start + chunk_size, menages_count)
+        first_person, last_person = numpy.searchsorted(sorted_menage_index, [start, stop])
+        rows = numpy.sort(persons_order[first_person:last_person])
+        chunk_structure_data_frame = structure_data_frame.iloc[rows].reset_index(drop = True)
+        chunk_array_by_variable = collections.OrderedDict()
+        for column_name, array in array_by_variable.iteritems():
+            column = column_by_name.get(column_name)
+            if column is not None and column.entity_key_plural == 'menages':
+                chunk_array_by_variable[column_name] = array[start:stop]
+            else:
+                chunk_array_by_variable[column_name] = array[rows]
+        yield chunk_structure_data_frame, chunk_array_by_variable
+
+
+def load_input_arrays(directory, columns = None):
+    with open(os.path.join(directory, metadata_file_name)) as metadata_file:
+        metadata = json.load(metadata_file)
+    structure_data_frame = pandas.DataFrame(collections.OrderedDict(
+        (column_name, numpy.load(os.path.join(directory, column_name + '.npy')))
+        for column_name in metadata['structure_columns']
+        ))
+    array_by_variable = collections.OrderedDict(
+        (
+            column_name,
+            # Plain read-only views of the maps: results of operations on them are ordinary arrays.
+            numpy.load(os.path.join(directory, column_name + '.npy'), mmap_mode = 'r').view(numpy.ndarray),
+            )
+        for column_name in metadata['columns']
+        if columns is None or column_name in columns
+        )
+    return structure_data_frame, array_by_variable
+
+
+def materialize_input_arrays(input_data_frame, directory, tax_benefit_system):
+    """
+    Écrit chaque colonne de la table d'entrée dans un fichier .npy, au niveau de son entité et dans le type de sa
+    colonne, en remplaçant les NaN par la valeur par défaut comme le fait le survey manager. Les colonnes des
+    variables calculées sont écrites aussi, pour used_as_input_variables, mais set_input_arrays les ignore sinon.
+    """
+    column_by_name = tax_benefit_system.column_by_name
+    is_menage_head = input_data_frame['role_menage'].values == 0
+    parent_directory = os.path.dirname(os.path.abspath(directory))
+    if not os.path.isdir(parent_directory):
+        os.makedirs(parent_directory)
+    # Write to a temporary directory then rename it, so that concurrent processes never read partial arrays.
+    temporary_directory = tempfile.mkdtemp(dir = parent_directory)
+    try:
+        columns = []
+        for column_name, serie in input_data_frame.iteritems():
+            if column_name in structure_columns:
+                values = serie.values
+            else:
+                column = column_by_name.get(column_name)
+                if column is None:
+                    continue
+                values = serie.values
+                if column.entity_key_plural == 'menages':
+                    values = values[is_menage_head]
+                if values.dtype.kind == 'f' and numpy.isnan(values).any():
+                    values = numpy.where(numpy.isnan(values), column.default, values)
+                values = values.astype(column.dtype)
+                columns.append(column_name)
+            numpy.save(os.path.join(temporary_directory, column_name + '.npy'), values)
+        with open(os.path.join(temporary_directory, metadata_file_name), 'w') as metadata_file:
+            json.dump(
+                dict(
+                    columns = columns,
+                    structure_columns = [name for name in structure_columns if name in input_data_frame],
+                    ),
+                metadata_file,
+                )
+        try:
+            os.rename(temporary_directory, directory)
+        except OSError as error:
+            if error.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                raise
+            # Another process materialized the table first.
+            shutil.rmtree(temporary_directory)
+    except Exception:
+        if os.path.exists(temporary_directory):
+            shutil.rmtree(temporary_directory)
+        raise
+
+
+def is_survey_input_column(column, used_as_input_variables = None):
+    """
+    Indique si une colonne de la table d'entrée est une entrée de la simulation, comme dans
+    AbstractSurveyScenario.filter_input_variables du survey manager : les variables d'une formule simple sont
+    calculées, sauf si elles sont dans used_as_input_variables.
+    """
+    formula_class = column.formula_class
+    if not issubclass(formula_class, formulas.SimpleFormula) or formula_class.function is None:
+        return True
+    return used_as_input_variables is not None and column.name in used_as_input_variables
+
+
+def set_input_arrays(simulation, array_by_variable, used_as_input_variables = None):
+    """
+    Donne aux holders de la simulation les tableaux projetés, sans copie quand leur type est celui de la colonne.
+
+    Les colonnes des variables calculées sont ignorées, comme par le survey manager (voir is_survey_input_column).
+    """
+    period = simulation.period
+    column_by_name = simulation.tax_benefit_system.column_by_name
+    for column_name, array in array_by_variable.iteritems():
+        column = column_by_name.get(column_name)
+        if column is None or not is_survey_input_column(column, used_as_input_variables):
+            continue
+        holder = simulation.get_or_new_holder(column_name)
+        assert array.size == holder.entity.count, 'Bad size for {}: {} instead of {}'.format(
+            column_name, array.size, holder.entity.count)
+        if array.dtype != holder.column.dtype:
+            # A reform changed the type of the column.
+            array = array.astype(holder.column.dtype)
+        holder.set_input(period, array)
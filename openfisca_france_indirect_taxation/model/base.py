@@ -26,10 +26,12 @@
 from openfisca_core.columns import AgeCol, DateCol, FloatCol, IntCol, EnumCol
 from openfisca_core.enumerations import Enum
 from openfisca_core.formulas import dated_function, DatedVariable, Variable
+from openfisca_core.legislations import ParameterNotFound
 from openfisca_survey_manager.statshelpers import mark_weighted_percentiles, weighted_quantiles
 
 
 from ..entities import Individus, Menages
+from .quantiles import deciles_enum, get_weighted_quantiles, WeightedQuantiles
 
 
 __all__ = [
@@ -37,20 +39,34 @@ __all__ = [
     'DateCol',
     'DatedVariable',
     'dated_function',
+    'deciles_enum',
+    'depenses_apres_reaction',
     'Enum',
     'EnumCol',
     'FloatCol',
+    'get_legislation_snapshot',
+    'get_weighted_quantiles',
     'Individus',
     'IntCol',
+    'LegislationSnapshot',
     'mark_weighted_percentiles',
     'Menages',
     'droit_d_accise',
     'tax_from_expense_including_tax',
     'Variable',
     'weighted_quantiles',
+    'WeightedQuantiles',
     ]
 
 
+def depenses_apres_reaction(depenses, elasticite_prix, variation_relative_prix):
+    """
+    Dépenses après réaction à une variation relative du prix : les quantités varient de elasticite_prix fois la
+    variation du prix, d'où au premier ordre des dépenses multipliées par 1 + (1 + elasticite_prix) * variation.
+    """
+    return depenses * (1 + (1 + elasticite_prix) * variation_relative_prix)
+
+
 def droit_d_accise(depense, droit_cn, consommation_cn, taux_plein_tva):
     """
     Calcule le montant de droit d'accise sur un volume de dépense payé pour le poste adéquat.
@@ -66,3 +82,246 @@ def taux_implicite(accise, tva, prix_ttc):
 def tax_from_expense_including_tax(expense = None, tax_rate = None):
     """Compute the tax amount form the expense including tax : si Dttc = (1+t) * Dht, ici on obtient t * Dht"""
     return expense * tax_rate / (1 + tax_rate)
+
+
+class snapshot_parameter(object):
+    """Compute a LegislationSnapshot attribute on first access, then store it as a plain instance attribute."""
+    def __init__(self, function):
+        self.function = function
+        self.__doc__ = function.__doc__
+        self.__name__ = function.__name__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = instance.__dict__[self.__name__] = self.function(instance)
+        return value
+
+
+class LegislationSnapshot(object):
+    """
+    Paramètres d'imposition indirecte à un instant donné, avec les grandeurs qui en dérivent (accises majorées,
+    taux implicites de TICPE).
+
+    Chaque valeur est calculée au premier accès puis lue comme un simple attribut. Un snapshot est partagé par toutes
+    les simulations utilisant la même législation : il ne doit pas être modifié.
+
+    parameter_by_path remplace certains paramètres (chemins relatifs à imposition_indirecte, par exemple
+    "tva.taux_plein") : les grandeurs dérivées en tiennent compte.
+    """
+    def __init__(self, legislation, parameter_by_path = None):
+        self.__dict__['imposition_indirecte'] = legislation.imposition_indirecte
+        self.__dict__['instant'] = legislation.instant
+        self.__dict__['parameter_by_path'] = parameter_by_path or dict()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(u"LegislationSnapshot is immutable: can't set {}".format(name).encode('utf-8'))
+
+    def parameter(self, path):
+        if path in self.parameter_by_path:
+            return self.parameter_by_path[path]
+        node = self.imposition_indirecte
+        for name in path.split('.'):
+            node = getattr(node, name)
+        return node
+
+    def accise_majoree(self, accise_path, majoration_path):
+        accise = self.parameter(accise_path)
+        try:
+            majoration = self.parameter(majoration_path)
+        except ParameterNotFound:
+            return accise
+        return accise + majoration
+
+    # TVA
+
+    @snapshot_parameter
+    def taux_intermediaire_tva(self):
+        return self.parameter('tva.taux_intermediaire')
+
+    @snapshot_parameter
+    def taux_plein_tva(self):
+        return self.parameter('tva.taux_plein')
+
+    @snapshot_parameter
+    def taux_reduit_tva(self):
+        return self.parameter('tva.taux_reduit')
+
+    @snapshot_parameter
+    def taux_super_reduit_tva(self):
+        return self.parameter('tva.taux_super_reduit')
+
+    # TICPE
+
+    @snapshot_parameter
+    def accise_diesel_ticpe(self):
+        return self.accise_majoree('ticpe.ticpe_gazole', 'major_regionale_ticpe_gazole.alsace')
+
+    @snapshot_parameter
+    def accise_super9598_ticpe(self):
+        return self.accise_majoree('ticpe.ticpe_super9598', 'major_regionale_ticpe_super.alsace')
+
+    @snapshot_parameter
+    def accise_super_e10_ticpe(self):
+        return self.accise_majoree('ticpe.ticpe_super_e10', 'major_regionale_ticpe_super.alsace')
+
+    @snapshot_parameter
+    def accise_super_plombe_ticpe(self):
+        return self.parameter('ticpe.super_plombe_ticpe')
+
+    @snapshot_parameter
+    def prix_diesel_ttc(self):
+        return self.parameter('prix_carburants.diesel_ttc')
+
+    @snapshot_parameter
+    def prix_super_95_ttc(self):
+        return self.parameter('prix_carburants.super_95_ttc')
+
+    @snapshot_parameter
+    def prix_super_95_e10_ttc(self):
+        return self.parameter('prix_carburants.super_95_e10_ttc')
+
+    @snapshot_parameter
+    def prix_super_98_ttc(self):
+        return self.parameter('prix_carburants.super_98_ttc')
+
+    @snapshot_parameter
+    def prix_super_plombe_ttc(self):
+        return self.parameter('prix_carburants.super_plombe_ttc')
+
+    @snapshot_parameter
+    def taux_implicite_diesel(self):
+        return taux_implicite(self.accise_diesel_ticpe, self.taux_plein_tva, self.prix_diesel_ttc)
+
+    @snapshot_parameter
+    def taux_implicite_sp95(self):
+        return taux_implicite(self.accise_super9598_ticpe, self.taux_plein_tva, self.prix_super_95_ttc)
+
+    @snapshot_parameter
+    def taux_implicite_sp98(self):
+        return taux_implicite(self.accise_super9598_ticpe, self.taux_plein_tva, self.prix_super_98_ttc)
+
+    @snapshot_parameter
+    def taux_implicite_sp_e10(self):
+        return taux_implicite(self.accise_super_e10_ticpe, self.taux_plein_tva, self.prix_super_95_e10_ttc)
+
+    @snapshot_parameter
+    def taux_implicite_super_plombe(self):
+        return taux_implicite(self.accise_super_plombe_ticpe, self.taux_plein_tva, self.prix_super_plombe_ttc)
+
+    @snapshot_parameter
+    def part_sp95(self):
+        return self.parameter('part_type_supercarburants.sp_95')
+
+    @snapshot_parameter
+    def part_sp98(self):
+        return self.parameter('part_type_supercarburants.sp_98')
+
+    @snapshot_parameter
+    def part_sp_e10(self):
+        return self.parameter('part_type_supercarburants.sp_e10')
+
+    @snapshot_parameter
+    def part_super_plombe(self):
+        return self.parameter('part_type_supercarburants.super_plombe')
+
+    @snapshot_parameter
+    def conso_moyenne_vp_diesel(self):
+        return self.parameter('quantite_carbu_vp.diesel') / self.parameter('parc_vp.diesel')
+
+    @snapshot_parameter
+    def conso_moyenne_vp_essence(self):
+        return self.parameter('quantite_carbu_vp.essence') / self.parameter('parc_vp.essence')
+
+    @snapshot_parameter
+    def part_conso_totale_vp_diesel(self):
+        conso_totale_vp_diesel = self.parameter('quantite_carbu_vp.diesel')
+        conso_totale_vp_essence = self.parameter('quantite_carbu_vp.essence')
+        return conso_totale_vp_diesel / (conso_totale_vp_diesel + conso_totale_vp_essence)
+
+    # Alcools et tabacs
+
+    @snapshot_parameter
+    def droit_cn_alcools_forts(self):
+        return self.parameter('alcool_conso_et_vin.alcools_forts.droit_cn_alcools_total')
+
+    @snapshot_parameter
+    def consommation_cn_alcools_forts(self):
+        return self.parameter('alcool_conso_et_vin.alcools_forts.masse_conso_cn_alcools')
+
+    @snapshot_parameter
+    def droit_cn_biere(self):
+        return self.parameter('alcool_conso_et_vin.biere.droit_cn_biere')
+
+    @snapshot_parameter
+    def consommation_cn_biere(self):
+        return self.parameter('alcool_conso_et_vin.biere.masse_conso_cn_biere')
+
+    @snapshot_parameter
+    def droit_cn_vin(self):
+        return self.parameter('alcool_conso_et_vin.vin.droit_cn_vin')
+
+    @snapshot_parameter
+    def consommation_cn_vin(self):
+        return self.parameter('alcool_conso_et_vin.vin.masse_conso_cn_vin')
+
+    @snapshot_parameter
+    def taux_normal_cigares(self):
+        return self.parameter('tabac.taux_normal.cigares')
+
+    @snapshot_parameter
+    def taux_normal_cigarettes(self):
+        return self.parameter('tabac.taux_normal.cigarettes')
+
+    @snapshot_parameter
+    def taux_normal_tabac_a_rouler(self):
+        return self.parameter('tabac.taux_normal.tabac_a_rouler')
+
+    # Assurances
+
+    @snapshot_parameter
+    def taux_assurance_sante(self):
+        return self.parameter(
+            'taux_assurances.contrats_d_assurance_maladie_individuelles_et_collectives_cas_general_2_ter')
+
+    @snapshot_parameter
+    def taux_assurance_vtm(self):
+        return self.parameter(
+            'taux_assurances.assurance_pour_les_vehicules_terrestres_a_moteurs_pour_les_particuliers')
+
+    @snapshot_parameter
+    def taux_autres_assurances(self):
+        return self.parameter('taux_assurances.autres_assurances')
+
+    @snapshot_parameter
+    def taux_contrib_fgao(self):
+        return self.parameter('fgao.contribution_des_assures_en_pourcentage_des_primes')
+
+    @snapshot_parameter
+    def taux_contrib_secu_vtm(self):
+        return self.parameter('taux_assurances.contribution_secu_assurances_automobiles')
+
+
+def get_legislation_snapshot(simulation, instant):
+    """
+    Return the LegislationSnapshot of the simulation legislation at instant.
+
+    Snapshots are built once per instant and cached on the tax-benefit system, so that every simulation, reference
+    simulation and scenario using this legislation shares them. Reforms which don't modify the legislation share the
+    snapshots of their reference.
+    """
+    if simulation.trace:
+        # Don't cache traced legislations, they record the parameters used by this simulation only.
+        return LegislationSnapshot(simulation.legislation_at(instant))
+    tax_benefit_system = simulation.tax_benefit_system
+    while tax_benefit_system.reference is not None and \
+            tax_benefit_system.legislation_json is tax_benefit_system.reference.legislation_json:
+        tax_benefit_system = tax_benefit_system.reference
+    legislation_snapshot_by_instant = getattr(tax_benefit_system, 'legislation_snapshot_by_instant', None)
+    if legislation_snapshot_by_instant is None:
+        tax_benefit_system.legislation_snapshot_by_instant = legislation_snapshot_by_instant = dict()
+    legislation_snapshot = legislation_snapshot_by_instant.get(instant)
+    if legislation_snapshot is None:
+        legislation_snapshot = legislation_snapshot_by_instant[instant] = LegislationSnapshot(
+            tax_benefit_system.get_compact_legislation(instant))
+    return legislation_snapshot
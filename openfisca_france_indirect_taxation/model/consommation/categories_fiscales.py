@@ -28,63 +28,123 @@ from __future__ import division
 
 from datetime import date
 
+import numpy
+from scipy import sparse
+
 from openfisca_core.columns import FloatCol
 from openfisca_core.formulas import dated_function, DatedVariable
 
 
+from openfisca_france_indirect_taxation import dependencies
 from openfisca_france_indirect_taxation.model.base import *
-from openfisca_france_indirect_taxation.utils import get_parametres_fiscalite_data_frame
+from openfisca_france_indirect_taxation.model.consommation.postes_coicop import dot_postes_coicop
+from openfisca_france_indirect_taxation.model.consommation.variables_registry import get_registry
+
+
+matrice_passage_by_year = None
+
+
+def build_matrice_passage_by_year(nomenclature_by_year):
+    """
+    Construit pour chaque année la matrice creuse (catégories fiscales x postes COICOP) qui agrège les dépenses.
+    Les années qui partagent la même nomenclature partagent la même matrice.
+    """
+    categories_fiscales = sorted(set(
+        categorie_fiscale
+        for nomenclature in nomenclature_by_year.itervalues()
+        for _, categorie_fiscale in nomenclature
+        ))
+    index_by_categorie_fiscale = dict(
+        (categorie_fiscale, index) for index, categorie_fiscale in enumerate(categories_fiscales)
+        )
+    matrice_passage_by_nomenclature = dict()
+    matrice_passage_by_year = dict()
+    for year, nomenclature in nomenclature_by_year.iteritems():
+        postes_coicop = tuple(str(poste) for poste, _ in nomenclature)
+        categories_fiscales_index = tuple(
+            index_by_categorie_fiscale[categorie_fiscale] for _, categorie_fiscale in nomenclature)
+        nomenclature = (postes_coicop, categories_fiscales_index)
+        matrice_passage = matrice_passage_by_nomenclature.get(nomenclature)
+        if matrice_passage is None:
+            matrice = sparse.csr_matrix(
+                (
+                    # Float64 coefficients: the sums over the postes are accumulated in float64.
+                    numpy.ones(len(postes_coicop), dtype = numpy.float64),
+                    (numpy.array(categories_fiscales_index), numpy.arange(len(postes_coicop))),
+                    ),
+                shape = (len(categories_fiscales), len(postes_coicop)),
+                )
+            matrice_passage = matrice_passage_by_nomenclature[nomenclature] = (
+                postes_coicop,
+                categories_fiscales,
+                matrice,
+                )
+        matrice_passage_by_year[int(year)] = matrice_passage
+    return matrice_passage_by_year
+
+
+def calculate_categories_fiscales(simulation, period):
+    """
+    Calcule toutes les catégories fiscales de la période par un seul produit matriciel creux et les met en cache.
+    """
+    postes_coicop, categories_fiscales, matrice = matrice_passage_by_year[period.start.year]
+    depenses_by_categorie_fiscale = dot_postes_coicop(simulation, period, matrice, postes_coicop)
+
+    array_by_categorie_fiscale = dict()
+    for index, categorie_fiscale in enumerate(categories_fiscales):
+        holder = simulation.get_or_new_holder(u'categorie_fiscale_{}'.format(categorie_fiscale))
+        array = holder.get_array(period)
+        if array is None:
+            array = depenses_by_categorie_fiscale[index].astype(holder.column.dtype)
+            holder.put_in_cache(array, period)
+        array_by_categorie_fiscale[categorie_fiscale] = array
+    return array_by_categorie_fiscale
+
+
+def get_categories_fiscales_dependencies(period):
+    """
+    Renvoie les postes COICOP de chaque catégorie fiscale : calculate_categories_fiscales lit tous les postes pour
+    calculer toutes les catégories à la fois.
+    """
+    if matrice_passage_by_year is None or period.start.year not in matrice_passage_by_year:
+        return dict()
+    postes_coicop, categories_fiscales, matrice = matrice_passage_by_year[period.start.year]
+    matrice = matrice.tocsr()
+    return dict(
+        (
+            'categorie_fiscale_{}'.format(categorie_fiscale),
+            set(
+                'poste_coicop_{}'.format(postes_coicop[index])
+                for index in matrice.indices[matrice.indptr[row]:matrice.indptr[row + 1]]
+                ),
+            )
+        for row, categorie_fiscale in enumerate(categories_fiscales)
+        )
 
 
-categories_fiscales_data_frame = None
+dependencies.declared_dependencies_functions.append(get_categories_fiscales_dependencies)
 
 
-def function_creator(postes_coicop, year_start = None, year_stop = None):
+def function_creator(categorie_fiscale, year_start = None, year_stop = None):
     start = date(year_start, 1, 1) if year_start is not None else None
     stop = date(year_stop, 12, 31) if year_stop is not None else None
 
     @dated_function(start = start, stop = stop)
     def func(self, simulation, period):
-        return period, sum(simulation.calculate('poste_coicop_' + poste, period) for poste in postes_coicop)
+        return period, calculate_categories_fiscales(simulation, period)[categorie_fiscale]
 
     func.__name__ = "function_{year_start}_{year_stop}".format(year_start = year_start, year_stop = year_stop)
     return func
 
 
-def generate_variables():
-    existing_categ = sorted(categories_fiscales_data_frame['categoriefiscale'].drop_duplicates())
-
-    for categorie_fiscale in existing_categ:
-        year_start = 1994
-        year_final_stop = 2014
+def generate_variables(intervals_by_categorie_fiscale):
+    for categorie_fiscale, intervals in intervals_by_categorie_fiscale:
         functions_by_name = dict()
-        for year in range(year_start, year_final_stop + 1):
-            postes_coicop = sorted(
-                categories_fiscales_data_frame.query(
-                    'annee == @year and categoriefiscale == @categorie_fiscale'
-                    )['posteCOICOP'].astype(str))
-            variables = ', '.join(postes_coicop)
-
-            if year == year_start:
-                previous_variables = variables
-                previous_postes_coicop = postes_coicop
-                continue
-
-            if previous_postes_coicop == postes_coicop and year != year_final_stop:
-                continue
-            else:
-                year_stop = year - 1 if year != year_final_stop else year_final_stop
-
-                dated_func = function_creator(previous_postes_coicop, year_start = year_start, year_stop = year_stop)
-                dated_function_name = u"function_{year_start}_{year_stop}".format(
-                    year_start = year_start, year_stop = year_stop)
-
-                if len(previous_postes_coicop) != 0:
-                    functions_by_name[dated_function_name] = dated_func
-
-                year_start = year
-
-            previous_postes_coicop = postes_coicop
+        for year_start, year_stop in intervals:
+            dated_function_name = u"function_{year_start}_{year_stop}".format(
+                year_start = year_start, year_stop = year_stop)
+            functions_by_name[dated_function_name] = function_creator(
+                categorie_fiscale, year_start = year_start, year_stop = year_stop)
 
         class_name = u'categorie_fiscale_{}'.format(categorie_fiscale)
         # Trick to create a class with a dynamic name.
@@ -99,10 +159,8 @@ def generate_variables():
 
 
 def preload_categories_fiscales_data_frame():
-    global categories_fiscales_data_frame
-    if categories_fiscales_data_frame is None:
-        categories_fiscales_data_frame = get_parametres_fiscalite_data_frame()
-        categories_fiscales_data_frame = categories_fiscales_data_frame[
-            ['posteCOICOP', 'annee', 'categoriefiscale']
-            ].copy()
-        generate_variables()
+    global matrice_passage_by_year
+    if matrice_passage_by_year is None:
+        registry = get_registry()
+        matrice_passage_by_year = build_matrice_passage_by_year(registry['nomenclature_by_year'])
+        generate_variables(registry['intervals_by_categorie_fiscale'])
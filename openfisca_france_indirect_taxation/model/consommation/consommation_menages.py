@@ -136,7 +136,7 @@ class depenses_diesel_htva(Variable):
     label = u"Dépenses en diesel htva (mais incluant toujours la TICPE)"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
+        taux_plein_tva = get_legislation_snapshot(simulation, period.start).taux_plein_tva
         depenses_diesel = simulation.calculate('depenses_diesel', period)
         depenses_diesel_htva = depenses_diesel - tax_from_expense_including_tax(depenses_diesel, taux_plein_tva)
 
@@ -149,22 +149,7 @@ class depenses_diesel_ht(Variable):
     label = u"Dépenses en diesel ht (prix brut sans TVA ni TICPE)"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-
-        try:
-            majoration_ticpe_diesel = \
-                simulation.legislation_at(period.start).imposition_indirecte.major_regionale_ticpe_gazole.alsace
-            accise_diesel = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_gazole
-            accise_diesel_ticpe = accise_diesel + majoration_ticpe_diesel
-        except:
-            accise_diesel_ticpe = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_gazole
-
-        prix_diesel_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.diesel_ttc
-        taux_implicite_diesel = (
-            (accise_diesel_ticpe * (1 + taux_plein_tva)) /
-            (prix_diesel_ttc - accise_diesel_ticpe * (1 + taux_plein_tva))
-            )
-
+        taux_implicite_diesel = get_legislation_snapshot(simulation, period.start).taux_implicite_diesel
         depenses_diesel_htva = simulation.calculate('depenses_diesel_htva', period)
         depenses_diesel_ht = \
             depenses_diesel_htva - tax_from_expense_including_tax(depenses_diesel_htva, taux_implicite_diesel)
@@ -178,23 +163,11 @@ class depenses_diesel_recalculees(Variable):
     label = u"Dépenses en diesel recalculées à partir du prix ht"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
+        legislation = get_legislation_snapshot(simulation, period.start)
+        taux_plein_tva = legislation.taux_plein_tva
+        taux_implicite_diesel = legislation.taux_implicite_diesel
         depenses_diesel_ht = simulation.calculate('depenses_diesel_ht', period)
 
-        try:
-            majoration_ticpe_diesel = \
-                simulation.legislation_at(period.start).imposition_indirecte.major_regionale_ticpe_gazole.alsace
-            accise_diesel = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_gazole
-            accise_diesel_ticpe = accise_diesel + majoration_ticpe_diesel
-        except:
-            accise_diesel_ticpe = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_gazole
-
-        prix_diesel_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.diesel_ttc
-        taux_implicite_diesel = (
-            (accise_diesel_ticpe * (1 + taux_plein_tva)) /
-            (prix_diesel_ttc - accise_diesel_ticpe * (1 + taux_plein_tva))
-            )
-
         depenses_diesel_recalculees = depenses_diesel_ht * (1 + taux_plein_tva) * (1 + taux_implicite_diesel)
 
         return period, depenses_diesel_recalculees
@@ -206,27 +179,13 @@ class depenses_sp_e10_ht(Variable):
     label = u"Dépenses en essence sans plomb e10 hors taxes (HT, i.e. sans TVA ni TICPE)"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
+        legislation = get_legislation_snapshot(simulation, period.start)
+        taux_plein_tva = legislation.taux_plein_tva
         depenses_essence = simulation.calculate('depenses_essence', period)
-        part_sp_e10 = simulation.legislation_at(period.start).imposition_indirecte.part_type_supercarburants.sp_e10
+        part_sp_e10 = legislation.part_sp_e10
         depenses_sp_e10 = depenses_essence * part_sp_e10
         depenses_sp_e10_htva = depenses_sp_e10 - tax_from_expense_including_tax(depenses_sp_e10, taux_plein_tva)
-
-        try:
-            accise_super_e10 = \
-                simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super_e10
-            majoration_ticpe_super_e10 = \
-                simulation.legislation_at(period.start).imposition_indirecte.major_regionale_ticpe_super.alsace
-            accise_ticpe_super_e10 = accise_super_e10 + majoration_ticpe_super_e10
-        except:
-            accise_super_e10 = \
-                simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super_e10
-
-        super_95_e10_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.super_95_e10_ttc
-        taux_implicite_sp_e10 = (
-            (accise_ticpe_super_e10 * (1 + taux_plein_tva)) /
-            (super_95_e10_ttc - accise_ticpe_super_e10 * (1 + taux_plein_tva))
-            )
+        taux_implicite_sp_e10 = legislation.taux_implicite_sp_e10
         depenses_sp_e10_ht = \
             depenses_sp_e10_htva - tax_from_expense_including_tax(depenses_sp_e10_htva, taux_implicite_sp_e10)
 
@@ -239,23 +198,11 @@ class depenses_sp_95_ht(Variable):
     label = u"Dépenses en essence sans plomb 95 hors taxes (HT, i.e. sans TVA ni TICPE)"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-
-        try:
-            accise_super95 = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super9598
-            majoration_ticpe_super95 = \
-                simulation.legislation_at(period.start).imposition_indirecte.major_regionale_ticpe_super.alsace
-            accise_ticpe_super95 = accise_super95 + majoration_ticpe_super95
-        except:
-            accise_ticpe_super95 = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super9598
-
-        super_95_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.super_95_ttc
-        taux_implicite_sp95 = (
-            (accise_ticpe_super95 * (1 + taux_plein_tva)) /
-            (super_95_ttc - accise_ticpe_super95 * (1 + taux_plein_tva))
-            )
+        legislation = get_legislation_snapshot(simulation, period.start)
+        taux_plein_tva = legislation.taux_plein_tva
+        taux_implicite_sp95 = legislation.taux_implicite_sp95
         depenses_essence = simulation.calculate('depenses_essence', period)
-        part_sp95 = simulation.legislation_at(period.start).imposition_indirecte.part_type_supercarburants.sp_95
+        part_sp95 = legislation.part_sp95
         depenses_sp_95 = depenses_essence * part_sp95
         depenses_sp_95_htva = depenses_sp_95 - tax_from_expense_including_tax(depenses_sp_95, taux_plein_tva)
         depenses_sp_95_ht = \
@@ -270,23 +217,11 @@ class depenses_sp_98_ht(Variable):
     label = u"Dépenses en essence sans plomb 98 hors taxes (HT, i.e. sans TVA ni TICPE)"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-
-        try:
-            accise_super98 = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super9598
-            majoration_ticpe_super98 = \
-                simulation.legislation_at(period.start).imposition_indirecte.major_regionale_ticpe_super.alsace
-            accise_ticpe_super98 = accise_super98 + majoration_ticpe_super98
-        except:
-            accise_ticpe_super98 = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super9598
-
-        super_98_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.super_98_ttc
-        taux_implicite_sp98 = (
-            (accise_ticpe_super98 * (1 + taux_plein_tva)) /
-            (super_98_ttc - accise_ticpe_super98 * (1 + taux_plein_tva))
-            )
+        legislation = get_legislation_snapshot(simulation, period.start)
+        taux_plein_tva = legislation.taux_plein_tva
+        taux_implicite_sp98 = legislation.taux_implicite_sp98
         depenses_essence = simulation.calculate('depenses_essence', period)
-        part_sp98 = simulation.legislation_at(period.start).imposition_indirecte.part_type_supercarburants.sp_98
+        part_sp98 = legislation.part_sp98
         depenses_sp_98 = depenses_essence * part_sp98
         depenses_sp_98_htva = depenses_sp_98 - tax_from_expense_including_tax(depenses_sp_98, taux_plein_tva)
         depenses_sp_98_ht = \
@@ -301,17 +236,11 @@ class depenses_super_plombe_ht(Variable):
     label = u"Dépenses en essence super plombée hors taxes (HT, i.e. sans TVA ni TICPE)"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-        accise_super_plombe_ticpe = \
-            simulation.legislation_at(period.start).imposition_indirecte.ticpe.super_plombe_ticpe
-        super_plombe_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.super_plombe_ttc
-        taux_implicite_super_plombe = (
-            (accise_super_plombe_ticpe * (1 + taux_plein_tva)) /
-            (super_plombe_ttc - accise_super_plombe_ticpe * (1 + taux_plein_tva))
-            )
+        legislation = get_legislation_snapshot(simulation, period.start)
+        taux_plein_tva = legislation.taux_plein_tva
+        taux_implicite_super_plombe = legislation.taux_implicite_super_plombe
         depenses_essence = simulation.calculate('depenses_essence', period)
-        part_super_plombe = \
-            simulation.legislation_at(period.start).imposition_indirecte.part_type_supercarburants.super_plombe
+        part_super_plombe = legislation.part_super_plombe
         depenses_super_plombe = depenses_essence * part_super_plombe
         depenses_super_plombe_htva = \
             depenses_super_plombe - tax_from_expense_including_tax(depenses_super_plombe, taux_plein_tva)
@@ -356,7 +285,7 @@ class depenses_essence_recalculees(Variable):
     label = u"Dépenses en essence recalculées à partir du prix ht"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
+        taux_plein_tva = get_legislation_snapshot(simulation, period.start).taux_plein_tva
         depenses_sp_e10_ht = simulation.calculate('depenses_sp_e10_ht', period)
         depenses_sp_95_ht = simulation.calculate('depenses_sp_95_ht', period)
         depenses_sp_98_ht = simulation.calculate('depenses_sp_98_ht', period)
@@ -381,6 +310,35 @@ class depenses_totales(Variable):
             )
 
 
+class depenses_totales_centile(Variable):
+    column = IntCol
+    entity_class = Menages
+    label = u"Centile de consommation totale"
+
+    def function(self, simulation, period):
+        return period, get_weighted_quantiles(simulation, 'depenses_totales', period).partition(100)
+
+
+class depenses_totales_decile(Variable):
+    column = EnumCol(
+        enum = deciles_enum,
+        )
+    entity_class = Menages
+    label = u"Décile de consommation totale"
+
+    def function(self, simulation, period):
+        return period, get_weighted_quantiles(simulation, 'depenses_totales', period).partition(10)
+
+
+class depenses_totales_vingtile(Variable):
+    column = IntCol
+    entity_class = Menages
+    label = u"Vingtile de consommation totale"
+
+    def function(self, simulation, period):
+        return period, get_weighted_quantiles(simulation, 'depenses_totales', period).partition(20)
+
+
 class depenses_tva_taux_intermediaire(Variable):
     column = FloatCol
     entity_class = Menages
@@ -6,42 +6,164 @@ from __future__ import division
 
 from datetime import date
 
+import numpy
+from scipy import sparse
+
+from openfisca_core import periods
 from openfisca_core.columns import FloatCol
 from openfisca_core.formulas import Variable
 
 
 from openfisca_france_indirect_taxation.model.base import *
-from openfisca_france_indirect_taxation.utils import get_parametres_fiscalite_data_frame
+from openfisca_france_indirect_taxation.model.consommation.variables_registry import get_registry
+
+
+postes_coicop_generated = False
+
+
+class PostesCoicopBlock(object):
+    """
+    Dépenses de tous les postes COICOP stockées dans un seul tableau contigu (ménages x postes), dans le type de
+    stockage des postes (voir le module precision).
+    """
+    depenses = None  # Fortran-ordered, so that each poste column is a contiguous view
+    index_by_poste = None
+    postes_coicop = None
+
+    def __init__(self, postes_coicop, depenses, dtype = numpy.float32):
+        self.postes_coicop = tuple(str(poste) for poste in postes_coicop)
+        self.depenses = numpy.asfortranarray(depenses, dtype = dtype)
+        assert self.depenses.ndim == 2 and self.depenses.shape[1] == len(self.postes_coicop)
+        self.index_by_poste = dict((poste, index) for index, poste in enumerate(self.postes_coicop))
+        self._matrice_by_key = dict()
+
+    def column(self, poste):
+        return self.depenses[:, self.index_by_poste[str(poste)]]
+
+    def dot(self, matrice, postes_coicop):
+        """
+        Multiplie une matrice (lignes x postes_coicop) par le bloc transposé.
+
+        Renvoie aussi les postes absents du bloc et la sous-matrice correspondante, à traiter par l'appelant.
+        """
+        key = (id(matrice), postes_coicop)
+        cached = self._matrice_by_key.get(key)
+        if cached is None:
+            matrice_reference = matrice
+            matrice = matrice.tocoo()
+            in_block = numpy.array([poste in self.index_by_poste for poste in postes_coicop], dtype = bool)
+            block_index = numpy.array([self.index_by_poste.get(poste, -1) for poste in postes_coicop])
+            selection = in_block[matrice.col]
+            block_matrice = sparse.csr_matrix(
+                (matrice.data[selection], (matrice.row[selection], block_index[matrice.col[selection]])),
+                shape = (matrice.shape[0], len(self.postes_coicop)),
+                )
+            missing_postes = tuple(poste for poste, present in zip(postes_coicop, in_block) if not present)
+            missing_matrice = matrice.tocsc()[:, numpy.flatnonzero(~in_block)].tocsr()
+            # Keep a reference to the original matrix, so that its id can't be reused by another one.
+            cached = self._matrice_by_key[key] = (matrice_reference, block_matrice, missing_postes, missing_matrice)
+        _, block_matrice, missing_postes, missing_matrice = cached
+        return block_matrice.dot(self.depenses.T), missing_postes, missing_matrice
+
+
+def build_postes_coicop_block(data_frame, postes_coicop = None, dtype = numpy.float32):
+    """Copie en une seule fois les colonnes poste_coicop_* d'une table de ménages dans un PostesCoicopBlock."""
+    if postes_coicop is None:
+        postes_coicop = [
+            column_name[len('poste_coicop_'):]
+            for column_name in data_frame.columns
+            if column_name.startswith('poste_coicop_')
+            ]
+    columns = ['poste_coicop_{}'.format(poste) for poste in postes_coicop]
+    if 'role_menage' in data_frame.columns:
+        data_frame = data_frame.loc[data_frame['role_menage'].values == 0, columns]
+    else:
+        data_frame = data_frame[columns]
+    depenses = numpy.array(data_frame.values, dtype = dtype, order = 'F')
+    return PostesCoicopBlock(postes_coicop, depenses, dtype = dtype)
+
+
+def dot_postes_coicop(simulation, period, matrice, postes_coicop):
+    """
+    Calcule le produit d'une matrice creuse (lignes x postes_coicop) par les dépenses des ménages sur ces postes.
+
+    Les postes présents dans le bloc contigu de la simulation sont lus dans le bloc, les autres dans leur holder.
+    Renvoie un tableau (lignes x ménages), accumulé en float64 quel que soit le type de stockage des postes.
+    """
+    postes_coicop_block = get_postes_coicop_block(simulation, period)
+    if postes_coicop_block is None:
+        result = None
+    else:
+        result, postes_coicop, matrice = postes_coicop_block.dot(matrice, postes_coicop)
+    if postes_coicop:
+        menages = simulation.entity_by_key_plural['menages']
+        column_by_name = simulation.tax_benefit_system.column_by_name
+        depenses = numpy.empty(
+            (len(postes_coicop), menages.count),
+            dtype = column_by_name['poste_coicop_' + postes_coicop[0]].dtype,
+            )
+        for index, poste in enumerate(postes_coicop):
+            depenses[index] = simulation.calculate('poste_coicop_' + poste, period)
+        if result is None:
+            result = matrice.dot(depenses)
+        else:
+            result += matrice.dot(depenses)
+    return result
+
+
+def get_postes_coicop_block(simulation, period = None):
+    if period is None:
+        period = simulation.period
+    postes_coicop_block_by_period = getattr(simulation, 'postes_coicop_block_by_period', None)
+    if not postes_coicop_block_by_period:
+        return None
+    return postes_coicop_block_by_period.get(periods.period(period))
+
 
+def set_postes_coicop_block(simulation, postes_coicop_block, period = None):
+    """
+    Attache un PostesCoicopBlock à la simulation et expose ses colonnes comme valeurs des poste_coicop_*.
 
-postes_coicop_data_frame = None
+    Les valeurs déjà présentes dans un holder sans être une vue du bloc (après une inflation par exemple) sont
+    recopiées dans le bloc : on peut rappeler cette fonction pour resynchroniser le bloc.
+    """
+    if period is None:
+        period = simulation.period
+    period = periods.period(period)
+    assert postes_coicop_block.depenses.shape[0] == simulation.entity_by_key_plural['menages'].count
+    column_by_name = simulation.tax_benefit_system.column_by_name
+    for poste in postes_coicop_block.postes_coicop:
+        column_name = 'poste_coicop_{}'.format(poste)
+        if column_name not in column_by_name:
+            continue
+        holder = simulation.get_or_new_holder(column_name)
+        column = postes_coicop_block.column(poste)
+        array = holder.get_array(period)
+        if array is not None and not numpy.may_share_memory(array, postes_coicop_block.depenses):
+            column[:] = array
+        if column.dtype != holder.column.dtype:
+            # The precision policy changed after the block was built: the holder gets a copy.
+            column = column.astype(holder.column.dtype)
+        holder.put_in_cache(column, period)
+    if getattr(simulation, 'postes_coicop_block_by_period', None) is None:
+        simulation.postes_coicop_block_by_period = dict()
+    simulation.postes_coicop_block_by_period[period] = postes_coicop_block
+    return postes_coicop_block
 
 
-def generate_variables():
-    postes_coicop_list = [element for element in postes_coicop_data_frame.posteCOICOP.values]
-    for poste in postes_coicop_list:
-        extraction_condition = postes_coicop_data_frame.posteCOICOP == int(poste)
-        liste_annees = postes_coicop_data_frame.loc[
-            extraction_condition,
-            'annee'].copy()
-        # assert liste_annees.shape == (21L,), "Some goods do not exist during certain years"
-        label = postes_coicop_data_frame.loc[
-            extraction_condition,
-            'description'].values.squeeze().tolist()
+def generate_variables(postes_coicop):
+    for poste, label in postes_coicop:
         class_name = u'poste_coicop_{}'.format(poste)
         # Trick to create a class with a dynamic name.
         type(class_name.encode('utf-8'), (Variable,), dict(
             column = FloatCol,
             entity_class = Menages,
-            label = label.decode('utf-8'),
+            label = label,
             ))
 
 
 def preload_postes_coicop_data_frame():
-    global postes_coicop_data_frame
-    if postes_coicop_data_frame is None:
-        postes_coicop_data_frame = get_parametres_fiscalite_data_frame()
-        postes_coicop_data_frame = postes_coicop_data_frame[
-            ['posteCOICOP', 'annee', 'description', 'categoriefiscale']].copy()
-        postes_coicop_data_frame.drop_duplicates('posteCOICOP', keep = 'last', inplace = True)
-        generate_variables()
+    global postes_coicop_generated
+    if not postes_coicop_generated:
+        generate_variables(get_registry()['postes_coicop'])
+        postes_coicop_generated = True
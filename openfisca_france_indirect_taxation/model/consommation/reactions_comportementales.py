@@ -24,12 +24,12 @@ class depenses_essence_ajustees(Variable):
 
     def function(self, simulation, period):
         depenses_essence = simulation.calculate('depenses_essence', period)
-        super_95_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.super_95_ttc
+        super_95_ttc = get_legislation_snapshot(simulation, period.start).prix_super_95_ttc
         reforme_essence = 30
         # simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.reforme_essence
         carburants_elasticite_prix = simulation.calculate('carburants_elasticite_prix')
-        depenses_essence_ajustees = \
-            depenses_essence * (1 + (1 + carburants_elasticite_prix) * reforme_essence / super_95_ttc)
+        depenses_essence_ajustees = depenses_apres_reaction(
+            depenses_essence, carburants_elasticite_prix, reforme_essence / super_95_ttc)
         return period, depenses_essence_ajustees
 
 
@@ -40,9 +40,10 @@ class depenses_diesel_ajustees(Variable):
 
     def function(self, simulation, period):
         depenses_diesel = simulation.calculate('depenses_diesel', period)
-        diesel_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.diesel_ttc
-        reforme_diesel = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.reforme_diesel
+        legislation = get_legislation_snapshot(simulation, period.start)
+        diesel_ttc = legislation.prix_diesel_ttc
+        reforme_diesel = legislation.parameter('prix_carburants.reforme_diesel')
         carburants_elasticite_prix = simulation.calculate('carburants_elasticite_prix')
-        depenses_essence_ajustees = \
-            depenses_diesel * (1 + (1 + carburants_elasticite_prix) * reforme_diesel / diesel_ttc)
-        return period, depenses_essence_ajustees
+        depenses_diesel_ajustees = depenses_apres_reaction(
+            depenses_diesel, carburants_elasticite_prix, reforme_diesel / diesel_ttc)
+        return period, depenses_diesel_ajustees
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Registre précompilé des variables poste_coicop_* et categorie_fiscale_* générées à partir de
+"Parametres fiscalite indirecte.csv".
+
+Le registre est construit par scripts/build_variables_registry.py et chargé en une seule lecture au démarrage. Il est
+ignoré (et reconstruit en mémoire à partir du CSV) dès que l'empreinte du CSV ne correspond plus.
+"""
+
+
+from __future__ import division
+
+import json
+import logging
+import os
+
+from openfisca_france_indirect_taxation.utils import (
+    assets_directory,
+    get_file_hash,
+    get_parametres_fiscalite_data_frame,
+    parametres_fiscalite_csv_file_path,
+    )
+
+
+log = logging.getLogger(__name__)
+
+registry = None
+registry_file_path = os.path.join(assets_directory, 'legislation', 'variables_registry.json')
+registry_version = 1
+year_start = 1994
+year_final_stop = 2014
+
+
+def build_dated_intervals(postes_coicop_by_year):
+    """
+    Renvoie les intervalles d'années [(year_start, year_stop)] pendant lesquels une catégorie fiscale regroupe des
+    postes COICOP, un nouvel intervalle commençant à chaque changement de la liste de ses postes.
+    """
+    intervals = []
+    interval_start = year_start
+    previous_postes_coicop = postes_coicop_by_year[year_start]
+    for year in range(year_start + 1, year_final_stop + 1):
+        postes_coicop = postes_coicop_by_year[year]
+        if previous_postes_coicop == postes_coicop and year != year_final_stop:
+            continue
+        year_stop = year - 1 if year != year_final_stop else year_final_stop
+        if len(previous_postes_coicop) != 0:
+            intervals.append((interval_start, year_stop))
+        interval_start = year
+        previous_postes_coicop = postes_coicop
+    return intervals
+
+
+def build_registry(parametres_fiscalite_data_frame = None, csv_hash = None):
+    if parametres_fiscalite_data_frame is None:
+        parametres_fiscalite_data_frame = get_parametres_fiscalite_data_frame()
+
+    postes_coicop_data_frame = parametres_fiscalite_data_frame[['posteCOICOP', 'description']].drop_duplicates(
+        'posteCOICOP', keep = 'last')
+    postes_coicop = [
+        [str(poste), description.decode('utf-8') if isinstance(description, str) else description]
+        for poste, description in postes_coicop_data_frame.itertuples(index = False)
+        ]
+
+    nomenclature_by_year = dict()
+    for year, year_data_frame in parametres_fiscalite_data_frame.groupby('annee'):
+        year_data_frame = year_data_frame.sort_values('posteCOICOP')
+        nomenclature_by_year[str(int(year))] = [
+            [str(poste), int(categorie_fiscale)]
+            for poste, categorie_fiscale in year_data_frame[['posteCOICOP', 'categoriefiscale']].itertuples(
+                index = False)
+            ]
+
+    intervals_by_categorie_fiscale = []
+    for categorie_fiscale in sorted(set(parametres_fiscalite_data_frame['categoriefiscale'])):
+        postes_coicop_by_year = dict(
+            (
+                year,
+                sorted(
+                    poste
+                    for poste, categorie in nomenclature_by_year.get(str(year), [])
+                    if categorie == categorie_fiscale
+                    ),
+                )
+            for year in range(year_start, year_final_stop + 1)
+            )
+        intervals_by_categorie_fiscale.append([
+            int(categorie_fiscale),
+            [list(interval) for interval in build_dated_intervals(postes_coicop_by_year)],
+            ])
+
+    return dict(
+        csv_hash = csv_hash,
+        intervals_by_categorie_fiscale = intervals_by_categorie_fiscale,
+        nomenclature_by_year = nomenclature_by_year,
+        postes_coicop = postes_coicop,
+        version = registry_version,
+        )
+
+
+def get_csv_hash():
+    if not os.path.exists(parametres_fiscalite_csv_file_path):
+        return None
+    return get_file_hash(parametres_fiscalite_csv_file_path)
+
+
+def get_registry():
+    """Charge le registre une fois par processus, en le reconstruisant à partir du CSV s'il est périmé."""
+    global registry
+    if registry is None:
+        csv_hash = get_csv_hash()
+        if csv_hash is not None and os.path.exists(registry_file_path):
+            with open(registry_file_path) as registry_file:
+                loaded_registry = json.load(registry_file)
+            if loaded_registry.get('version') == registry_version and loaded_registry.get('csv_hash') == csv_hash:
+                registry = loaded_registry
+            else:
+                log.info(u'Variables registry {} is outdated: rebuilding it from the CSV'.format(registry_file_path))
+        if registry is None:
+            registry = build_registry(csv_hash = csv_hash)
+    return registry
+
+
+def write_registry(file_path = None):
+    if file_path is None:
+        file_path = registry_file_path
+    registry = build_registry(csv_hash = get_csv_hash())
+    with open(file_path, 'w') as registry_file:
+        json.dump(registry, registry_file, separators = (',', ':'), sort_keys = True)
+    return registry
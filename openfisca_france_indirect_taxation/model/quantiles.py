@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Quantiles pondérés partagés : chaque concept (niveau de vie, revenu disponible, consommation...) n'est trié qu'une
+fois par simulation et par période, puis toutes les partitions (déciles, vingtiles, centiles...) sont calculées à
+partir de ce tri.
+"""
+
+
+from __future__ import division
+
+import numpy
+
+from openfisca_core import periods
+from openfisca_core.enumerations import Enum
+
+
+# Weights of the households: a formula reading them compares or aggregates households, so its value for one household
+# depends on the whole population simulated (see get_weighted_quantiles).
+population_weights_variables = set(['pondmen'])
+
+deciles_enum = Enum([
+    u"Hors champ",
+    u"1er décile",
+    u"2nd décile",
+    u"3e décile",
+    u"4e décile",
+    u"5e décile",
+    u"6e décile",
+    u"7e décile",
+    u"8e décile",
+    u"9e décile",
+    u"10e décile"
+    ])
+
+
+class WeightedQuantiles(object):
+    """
+    Tri pondéré d'une variable : permutation, valeurs triées et poids cumulés.
+
+    Les seuils sont ceux de wquantiles.quantile_1D (utilisé par weighted_quantiles) : interpolation linéaire des
+    valeurs triées aux positions (poids cumulés - poids / 2) / poids total.
+    """
+    cumulative_weights = None
+    data = None  # Array the sort was computed from, to detect a new value of the variable
+    order = None
+    positions = None
+    sorted_data = None
+    weights = None
+
+    def __init__(self, data, weights):
+        self.data = data
+        self.weights = weights
+        self.order = numpy.argsort(data, kind = 'mergesort')
+        self.sorted_data = numpy.asarray(data, dtype = numpy.float64)[self.order]
+        sorted_weights = numpy.asarray(weights, dtype = numpy.float64)[self.order]
+        if len(sorted_weights) and sorted_weights.sum() <= 0:
+            # Unweighted test cases: every observation has the same weight.
+            sorted_weights = numpy.ones_like(sorted_weights)
+        self.cumulative_weights = numpy.cumsum(sorted_weights)
+        if len(sorted_weights):
+            self.positions = (self.cumulative_weights - .5 * sorted_weights) / self.cumulative_weights[-1]
+        else:
+            self.positions = sorted_weights
+
+    def partition(self, count):
+        """
+        Renvoie le numéro (de 1 à count) du quantile de chaque observation, dans l'ordre des données.
+
+        Une observation égale à un seuil appartient au quantile supérieur. Le calcul est linéaire : les valeurs étant
+        déjà triées, il suffit de localiser les count - 1 seuils.
+        """
+        boundaries = numpy.searchsorted(self.sorted_data, self.quantiles(count), side = 'left')
+        sizes = numpy.diff(numpy.concatenate(([0], boundaries, [len(self.sorted_data)])))
+        labels = numpy.empty(len(self.sorted_data), dtype = numpy.int32)
+        labels[self.order] = numpy.repeat(numpy.arange(1, count + 1, dtype = numpy.int32), sizes)
+        return labels
+
+    def quantiles(self, count):
+        """Renvoie les count - 1 seuils séparant count quantiles de même poids."""
+        if len(self.sorted_data) == 0:
+            return numpy.zeros(count - 1)
+        return numpy.interp(numpy.arange(1, count) / count, self.positions, self.sorted_data)
+
+
+def get_weighted_quantiles(simulation, variable, period, weights_variable = 'pondmen'):
+    """
+    Renvoie le WeightedQuantiles de la variable, mis en cache sur la simulation.
+
+    Le tri est recalculé seulement si la variable ou les poids ont changé de valeur dans la simulation.
+    """
+    period = periods.period(period)
+    population_weights_variables.add(weights_variable)
+    data = simulation.calculate(variable, period)
+    weights = simulation.calculate(weights_variable, period)
+    weighted_quantiles_by_key = getattr(simulation, 'weighted_quantiles_by_key', None)
+    if weighted_quantiles_by_key is None:
+        simulation.weighted_quantiles_by_key = weighted_quantiles_by_key = dict()
+    key = (variable, weights_variable, period)
+    weighted_quantiles = weighted_quantiles_by_key.get(key)
+    if weighted_quantiles is None or weighted_quantiles.data is not data or weighted_quantiles.weights is not weights:
+        weighted_quantiles = weighted_quantiles_by_key[key] = WeightedQuantiles(data, weights)
+    return weighted_quantiles
@@ -25,8 +25,6 @@
 from __future__ import division
 
 
-import numpy
-
 from ..base import *  # noqa analysis:ignore
 
 
@@ -49,33 +47,14 @@ class niveau_de_vie(Variable):
 
 class niveau_vie_decile(Variable):
     column = EnumCol(
-        enum = Enum([
-            u"Hors champ",
-            u"1er décile",
-            u"2nd décile",
-            u"3e décile",
-            u"4e décile",
-            u"5e décile",
-            u"6e décile",
-            u"7e décile",
-            u"8e décile",
-            u"9e décile",
-            u"10e décile"
-            ])
+        enum = deciles_enum,
         )
     entity_class = Menages
     label = u"Décile de niveau de vie"
 
     def function(self, simulation, period):
-        niveau_de_vie = simulation.calculate('niveau_de_vie', period)
-        pondmen = simulation.calculate('pondmen', period)
-        labels = numpy.arange(1, 11)
-        # Alternative method
-        # method = 2
-        # niveau_vie_decile, values = mark_weighted_percentiles(
-        # niveau_de_vie, labels, pondmen, method, return_quantiles = True)
-        niveau_vie_decile, values = weighted_quantiles(niveau_de_vie, labels, pondmen, return_quantiles = True)
-        return period, niveau_vie_decile
+        # The sort of niveau_de_vie is shared with every other quantile of niveau_de_vie.
+        return period, get_weighted_quantiles(simulation, 'niveau_de_vie', period).partition(10)
 
 
 class rev_disp_loyerimput(Variable):
@@ -92,6 +71,35 @@ class rev_disponible(Variable):
     label = u"Revenu disponible du ménage"
 
 
+class rev_disponible_centile(Variable):
+    column = IntCol
+    entity_class = Menages
+    label = u"Centile de revenu disponible"
+
+    def function(self, simulation, period):
+        return period, get_weighted_quantiles(simulation, 'rev_disponible', period).partition(100)
+
+
+class rev_disponible_decile(Variable):
+    column = EnumCol(
+        enum = deciles_enum,
+        )
+    entity_class = Menages
+    label = u"Décile de revenu disponible"
+
+    def function(self, simulation, period):
+        return period, get_weighted_quantiles(simulation, 'rev_disponible', period).partition(10)
+
+
+class rev_disponible_vingtile(Variable):
+    column = IntCol
+    entity_class = Menages
+    label = u"Vingtile de revenu disponible"
+
+    def function(self, simulation, period):
+        return period, get_weighted_quantiles(simulation, 'rev_disponible', period).partition(20)
+
+
 class revtot(Variable):
     column = IntCol
     entity_class = Menages
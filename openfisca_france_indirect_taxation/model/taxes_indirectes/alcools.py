@@ -14,10 +14,10 @@ class alcools_forts_droit_d_accise(Variable):
 
     def function(self, simulation, period):
         depenses_alcools_forts = simulation.calculate('depenses_alcools_forts', period)
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-        alcool_conso_et_vin = simulation.legislation_at(period.start).imposition_indirecte.alcool_conso_et_vin
-        droit_cn = alcool_conso_et_vin.alcools_forts.droit_cn_alcools_total
-        consommation_cn = alcool_conso_et_vin.alcools_forts.masse_conso_cn_alcools
+        legislation = get_legislation_snapshot(simulation, period.start)
+        taux_plein_tva = legislation.taux_plein_tva
+        droit_cn = legislation.droit_cn_alcools_forts
+        consommation_cn = legislation.consommation_cn_alcools_forts
         return period, droit_d_accise(depenses_alcools_forts, droit_cn, consommation_cn, taux_plein_tva)
 
 
@@ -28,10 +28,10 @@ class biere_droit_d_accise(Variable):
 
     def function(self, simulation, period):
         depenses_biere = simulation.calculate('depenses_biere', period)
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-        alcool_conso_et_vin = simulation.legislation_at(period.start).imposition_indirecte.alcool_conso_et_vin
-        droit_cn = alcool_conso_et_vin.biere.droit_cn_biere
-        consommation_cn = alcool_conso_et_vin.biere.masse_conso_cn_biere
+        legislation = get_legislation_snapshot(simulation, period.start)
+        taux_plein_tva = legislation.taux_plein_tva
+        droit_cn = legislation.droit_cn_biere
+        consommation_cn = legislation.consommation_cn_biere
         return period, droit_d_accise(depenses_biere, droit_cn, consommation_cn, taux_plein_tva)
 
 
@@ -54,8 +54,8 @@ class vin_droit_d_accise(Variable):
 
     def function(self, simulation, period):
         depenses_vin = simulation.calculate('depenses_vin', period)
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-        alcool_conso_et_vin = simulation.legislation_at(period.start).imposition_indirecte.alcool_conso_et_vin
-        droit_cn = alcool_conso_et_vin.vin.droit_cn_vin
-        consommation_cn = alcool_conso_et_vin.vin.masse_conso_cn_vin
+        legislation = get_legislation_snapshot(simulation, period.start)
+        taux_plein_tva = legislation.taux_plein_tva
+        droit_cn = legislation.droit_cn_vin
+        consommation_cn = legislation.consommation_cn_vin
         return period, droit_d_accise(depenses_vin, droit_cn, consommation_cn, taux_plein_tva)
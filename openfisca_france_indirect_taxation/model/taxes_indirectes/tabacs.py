@@ -18,7 +18,7 @@ class cigares_droit_d_accise(Variable):
 
     def function(self, simulation, period):
         depenses_cigares = simulation.calculate('depenses_cigares', period)
-        taux_normal_cigare = simulation.legislation_at(period.start).imposition_indirecte.tabac.taux_normal.cigares
+        taux_normal_cigare = get_legislation_snapshot(simulation, period.start).taux_normal_cigares
         return period, tax_from_expense_including_tax(depenses_cigares, taux_normal_cigare)
 
 
@@ -29,8 +29,7 @@ class cigarette_droit_d_accise(Variable):
 
     def function(self, simulation, period):
         depenses_cigarettes = simulation.calculate('depenses_cigarettes', period)
-        taux_normal_cigarette = \
-            simulation.legislation_at(period.start).imposition_indirecte.tabac.taux_normal.cigarettes
+        taux_normal_cigarette = get_legislation_snapshot(simulation, period.start).taux_normal_cigarettes
         return period, tax_from_expense_including_tax(depenses_cigarettes, taux_normal_cigarette)
 
 
@@ -41,8 +40,7 @@ class tabac_a_rouler_droit_d_accise(Variable):
 
     def function(self, simulation, period):
         depenses_tabac_a_rouler = simulation.calculate('depenses_tabac_a_rouler', period)
-        taux_normal_tabac_a_rouler = \
-            simulation.legislation_at(period.start).imposition_indirecte.tabac.taux_normal.tabac_a_rouler
+        taux_normal_tabac_a_rouler = get_legislation_snapshot(simulation, period.start).taux_normal_tabac_a_rouler
         return period, tax_from_expense_including_tax(depenses_tabac_a_rouler, taux_normal_tabac_a_rouler)
 
 
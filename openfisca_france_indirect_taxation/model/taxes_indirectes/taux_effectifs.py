@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Voie rapide par taux effectifs : chaque taxe indirecte est un taux effectif appliqué à une dépense TTC, donc toutes les
+taxes d'une législation s'obtiennent par un seul produit d'une matrice de taux effectifs (taxes x postes COICOP) par
+les dépenses des ménages.
+"""
+
+
+from __future__ import division
+
+import collections
+import datetime
+import itertools
+import weakref
+
+import numpy
+from scipy import sparse
+
+from openfisca_core import periods
+
+from ..base import droit_d_accise, get_legislation_snapshot, tax_from_expense_including_tax
+from ..consommation import categories_fiscales as categories_fiscales_module
+from ..consommation.postes_coicop import dot_postes_coicop
+
+
+categories_fiscales_by_depenses_variable = {
+    'depenses_alcools_forts': (10,),
+    'depenses_assurance_sante': (16,),
+    'depenses_assurance_transport': (15,),
+    'depenses_autres_assurances': (17,),
+    'depenses_biere': (13,),
+    'depenses_cigares': (8,),
+    'depenses_cigarettes': (7,),
+    'depenses_tabac_a_rouler': (9,),
+    'depenses_tva_taux_intermediaire': (4,),
+    'depenses_tva_taux_plein': (3, 11),
+    'depenses_tva_taux_reduit': (2,),
+    'depenses_tva_taux_super_reduit': (1,),
+    'depenses_vin': (12,),
+    }
+# Fuel expenses are split between diesel and essence household by household: their taxes can't be expressed as rates
+# on postes COICOP.
+depenses_carburants_variables = ('depenses_carburants', 'depenses_diesel', 'depenses_essence')
+taux_effectifs_by_legislation = weakref.WeakKeyDictionary()
+
+taxes_by_total = collections.OrderedDict([
+    ('tva_total', (
+        'tva_taux_super_reduit',
+        'tva_taux_reduit',
+        'tva_taux_intermediaire',
+        'tva_taux_plein',
+        )),
+    ('essence_ticpe', (
+        'sp95_ticpe',
+        'sp98_ticpe',
+        'sp_e10_ticpe',
+        'super_plombe_ticpe',
+        )),
+    ('ticpe_totale', (
+        'diesel_ticpe',
+        'sp95_ticpe',
+        'sp98_ticpe',
+        'sp_e10_ticpe',
+        'super_plombe_ticpe',
+        )),
+    ('total_alcool_droit_d_accise', (
+        'vin_droit_d_accise',
+        'biere_droit_d_accise',
+        'alcools_forts_droit_d_accise',
+        )),
+    ('total_tabac_droit_d_accise', (
+        'cigarette_droit_d_accise',
+        'cigares_droit_d_accise',
+        'tabac_a_rouler_droit_d_accise',
+        )),
+    ('total_assurances_taxe', (
+        'assurance_transport_taxe',
+        'assurance_sante_taxe',
+        'autres_assurances_taxe',
+        )),
+    ])
+taxes_by_total['taxes_indirectes_total_hors_tva'] = tuple(itertools.chain(
+    taxes_by_total['ticpe_totale'],
+    taxes_by_total['total_alcool_droit_d_accise'],
+    taxes_by_total['total_tabac_droit_d_accise'],
+    taxes_by_total['total_assurances_taxe'],
+    ))
+taxes_by_total['taxes_indirectes_total'] = taxes_by_total['tva_total'] + \
+    taxes_by_total['taxes_indirectes_total_hors_tva']
+
+
+def build_coefficient_by_taxe(legislation):
+    """
+    Décrit chaque taxe indirecte comme un taux effectif appliqué à une variable de dépense TTC.
+
+    Renvoie un OrderedDict taxe -> (variable de dépense, taux effectif) pour les taxes en vigueur à l'instant de la
+    LegislationSnapshot. Les taux reproduisent les formules de model/taxes_indirectes.
+    """
+    instant = legislation.instant
+    taux_plein_tva = legislation.taux_plein_tva
+    part_htva = 1 - tax_from_expense_including_tax(1, taux_plein_tva)
+    coefficient_by_taxe = collections.OrderedDict()
+
+    # TVA
+    coefficient_by_taxe['tva_taux_super_reduit'] = (
+        'depenses_tva_taux_super_reduit',
+        tax_from_expense_including_tax(1, legislation.taux_super_reduit_tva),
+        )
+    coefficient_by_taxe['tva_taux_reduit'] = (
+        'depenses_tva_taux_reduit',
+        tax_from_expense_including_tax(1, legislation.taux_reduit_tva),
+        )
+    if instant >= periods.instant(datetime.date(2012, 1, 1)):
+        coefficient_by_taxe['tva_taux_intermediaire'] = (
+            'depenses_tva_taux_intermediaire',
+            tax_from_expense_including_tax(1, legislation.taux_intermediaire_tva),
+            )
+    coefficient_by_taxe['tva_taux_plein'] = (
+        'depenses_tva_taux_plein',
+        tax_from_expense_including_tax(1, taux_plein_tva),
+        )
+
+    # TICPE
+    coefficient_by_taxe['diesel_ticpe'] = (
+        'depenses_diesel',
+        part_htva * tax_from_expense_including_tax(1, legislation.taux_implicite_diesel),
+        )
+    if periods.instant(datetime.date(1990, 1, 1)) <= instant <= periods.instant(datetime.date(2015, 12, 31)):
+        supercarburants = ['sp95', 'sp98']
+        if instant <= periods.instant(datetime.date(2006, 12, 31)):
+            supercarburants.append('super_plombe')
+        elif instant >= periods.instant(datetime.date(2009, 1, 1)):
+            supercarburants.append('sp_e10')
+        for supercarburant in supercarburants:
+            coefficient_by_taxe['{}_ticpe'.format(supercarburant)] = (
+                'depenses_essence',
+                getattr(legislation, 'part_{}'.format(supercarburant)) * part_htva * tax_from_expense_including_tax(
+                    1, getattr(legislation, 'taux_implicite_{}'.format(supercarburant))),
+                )
+
+    # Alcools
+    for alcool in ('vin', 'biere', 'alcools_forts'):
+        coefficient_by_taxe['{}_droit_d_accise'.format(alcool)] = (
+            'depenses_{}'.format(alcool),
+            droit_d_accise(
+                1,
+                getattr(legislation, 'droit_cn_{}'.format(alcool)),
+                getattr(legislation, 'consommation_cn_{}'.format(alcool)),
+                taux_plein_tva,
+                ),
+            )
+
+    # Tabacs
+    coefficient_by_taxe['cigarette_droit_d_accise'] = (
+        'depenses_cigarettes',
+        tax_from_expense_including_tax(1, legislation.taux_normal_cigarettes),
+        )
+    coefficient_by_taxe['cigares_droit_d_accise'] = (
+        'depenses_cigares',
+        tax_from_expense_including_tax(1, legislation.taux_normal_cigares),
+        )
+    coefficient_by_taxe['tabac_a_rouler_droit_d_accise'] = (
+        'depenses_tabac_a_rouler',
+        tax_from_expense_including_tax(1, legislation.taux_normal_tabac_a_rouler),
+        )
+
+    # Assurances
+    if periods.instant(datetime.date(1984, 1, 1)) <= instant <= periods.instant(datetime.date(2015, 12, 31)):
+        taux_assurance_transport = legislation.taux_assurance_vtm
+        if instant >= periods.instant(datetime.date(2002, 1, 1)):
+            taux_assurance_transport += legislation.taux_contrib_secu_vtm
+        if instant >= periods.instant(datetime.date(2004, 8, 5)):
+            taux_assurance_transport += legislation.taux_contrib_fgao
+        coefficient_by_taxe['assurance_transport_taxe'] = (
+            'depenses_assurance_transport',
+            tax_from_expense_including_tax(1, taux_assurance_transport),
+            )
+    coefficient_by_taxe['assurance_sante_taxe'] = (
+        'depenses_assurance_sante',
+        tax_from_expense_including_tax(1, legislation.taux_assurance_sante),
+        )
+    coefficient_by_taxe['autres_assurances_taxe'] = (
+        'depenses_autres_assurances',
+        tax_from_expense_including_tax(1, legislation.taux_autres_assurances),
+        )
+    return coefficient_by_taxe
+
+
+def calculate_taxes_indirectes(simulation, period):
+    """
+    Calcule taxes_indirectes_total, ses composantes et les catégories fiscales par un seul produit matriciel creux.
+
+    Met en cache les valeurs calculées et renvoie un dict variable -> tableau.
+    """
+    legislation = get_legislation_snapshot(simulation, period.start)
+    postes_coicop, taxes, categories_fiscales, matrice, taxes_carburants = get_taux_effectifs(legislation)
+    result = dot_postes_coicop(simulation, period, matrice, postes_coicop)
+
+    for index, categorie_fiscale in enumerate(categories_fiscales):
+        put_in_cache(simulation, u'categorie_fiscale_{}'.format(categorie_fiscale), result[len(taxes) + index], period)
+
+    array_by_variable = dict(zip(taxes, result[:len(taxes)]))
+    for taxe, depenses_variable, coefficient in taxes_carburants:
+        array_by_variable[taxe] = coefficient * simulation.calculate(depenses_variable, period)
+    for total, total_taxes in taxes_by_total.iteritems():
+        array_by_variable[total] = sum(
+            (array_by_variable[taxe] for taxe in total_taxes if taxe in array_by_variable),
+            numpy.zeros(result.shape[1], dtype = result.dtype),
+            )
+    return dict(
+        (variable, put_in_cache(simulation, variable, array, period))
+        for variable, array in array_by_variable.iteritems()
+        )
+
+
+def get_taux_effectifs(legislation):
+    """
+    Renvoie, pour une LegislationSnapshot, les postes COICOP de l'année, les taxes calculées sur ces postes, les
+    catégories fiscales, la matrice creuse ((taxes + catégories fiscales) x postes) et les taxes sur les carburants
+    (taxe, variable de dépense, taux effectif).
+    """
+    taux_effectifs = taux_effectifs_by_legislation.get(legislation)
+    if taux_effectifs is not None:
+        return taux_effectifs
+
+    postes_coicop, categories_fiscales, matrice_passage = \
+        categories_fiscales_module.matrice_passage_by_year[legislation.instant.year]
+    taxes = []
+    taux_by_categorie_fiscale = []
+    taxes_carburants = []
+    for taxe, (depenses_variable, coefficient) in build_coefficient_by_taxe(legislation).iteritems():
+        if depenses_variable not in categories_fiscales_by_depenses_variable:
+            taxes_carburants.append((taxe, depenses_variable, coefficient))
+            continue
+        taux = numpy.zeros(len(categories_fiscales), dtype = numpy.float64)
+        for categorie_fiscale in categories_fiscales_by_depenses_variable[depenses_variable]:
+            if categorie_fiscale in categories_fiscales:
+                taux[categories_fiscales.index(categorie_fiscale)] = coefficient
+        taxes.append(taxe)
+        taux_by_categorie_fiscale.append(taux)
+    matrice = sparse.vstack([
+        sparse.csr_matrix(numpy.array(taux_by_categorie_fiscale)).dot(matrice_passage),
+        matrice_passage,
+        ]).tocsr()
+    taux_effectifs = taux_effectifs_by_legislation[legislation] = (
+        postes_coicop,
+        tuple(taxes),
+        categories_fiscales,
+        matrice,
+        tuple(taxes_carburants),
+        )
+    return taux_effectifs
+
+
+def put_in_cache(simulation, variable, array, period):
+    holder = simulation.get_or_new_holder(variable)
+    cached_array = holder.get_array(period)
+    if cached_array is not None:
+        return cached_array
+    array = array.astype(holder.column.dtype)
+    holder.put_in_cache(array, period)
+    return array
+
+
+def taux_effectifs_applicables(simulation, period):
+    """
+    Indique si calculate_taxes_indirectes donne le même résultat que les formules.
+
+    Ce n'est pas le cas si la simulation est tracée (ou si ses dépendances sont relevées, voir
+    dependencies.build_dependency_graph), si une réforme remplace une des formules concernées ou si une variable
+    intermédiaire a déjà une valeur (donnée en entrée ou déjà calculée) pour la période.
+    """
+    if simulation.trace or getattr(simulation, 'recording_dependencies', False) or \
+            period.start.year not in categories_fiscales_module.matrice_passage_by_year:
+        return False
+    taxes = set(itertools.chain.from_iterable(taxes_by_total.itervalues()))
+    categories_fiscales = [
+        u'categorie_fiscale_{}'.format(categorie_fiscale)
+        for categorie_fiscale in categories_fiscales_module.matrice_passage_by_year[period.start.year][1]
+        ]
+    intermediate_variables = set(itertools.chain(
+        taxes,
+        taxes_by_total,
+        categories_fiscales_by_depenses_variable,
+        categories_fiscales,
+        ))
+    intermediate_variables.discard('taxes_indirectes_total')
+
+    tax_benefit_system = simulation.tax_benefit_system
+    reference_tax_benefit_system = tax_benefit_system
+    while reference_tax_benefit_system.reference is not None:
+        reference_tax_benefit_system = reference_tax_benefit_system.reference
+    if tax_benefit_system is not reference_tax_benefit_system:
+        for variable in itertools.chain(intermediate_variables, depenses_carburants_variables,
+                ['taxes_indirectes_total']):
+            if tax_benefit_system.column_by_name.get(variable) is not \
+                    reference_tax_benefit_system.column_by_name.get(variable):
+                return False
+
+    for variable in intermediate_variables:
+        holder = simulation.holder_by_name.get(variable)
+        if holder is not None and holder.get_array(period) is not None:
+            return False
+    return True
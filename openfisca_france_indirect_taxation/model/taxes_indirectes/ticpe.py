@@ -19,13 +19,9 @@ class depenses_diesel(Variable):
     label = u"Construction par pondération des dépenses spécifiques au diesel"
 
     def function(self, simulation, period):
-        conso_totale_vp_diesel = simulation.legislation_at(period.start).imposition_indirecte.quantite_carbu_vp.diesel
-        conso_totale_vp_essence = simulation.legislation_at(period.start).imposition_indirecte.quantite_carbu_vp.essence
-        taille_parc_diesel = simulation.legislation_at(period.start).imposition_indirecte.parc_vp.diesel
-        taille_parc_essence = simulation.legislation_at(period.start).imposition_indirecte.parc_vp.essence
-
-        conso_moyenne_vp_diesel = conso_totale_vp_diesel / taille_parc_diesel
-        conso_moyenne_vp_essence = conso_totale_vp_essence / taille_parc_essence
+        legislation = get_legislation_snapshot(simulation, period.start)
+        conso_moyenne_vp_diesel = legislation.conso_moyenne_vp_diesel
+        conso_moyenne_vp_essence = legislation.conso_moyenne_vp_essence
 
         nombre_vehicules_diesel = simulation.calculate('veh_diesel', period)
         nombre_vehicules_essence = simulation.calculate('veh_essence', period)
@@ -42,9 +38,7 @@ class depenses_diesel(Variable):
         depenses_carburants = simulation.calculate('depenses_carburants', period)
 
         depenses_diesel = depenses_carburants * (
-            (nombre_vehicules_total == 0) * (
-                conso_totale_vp_diesel / (conso_totale_vp_diesel + conso_totale_vp_essence)
-                ) +
+            (nombre_vehicules_total == 0) * legislation.part_conso_totale_vp_diesel +
             (nombre_vehicules_total != 0) * part_conso_diesel
             )
 
@@ -57,21 +51,9 @@ class diesel_ticpe(Variable):
     label = u"Calcul du montant de TICPE sur le diesel"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-
-        try:
-            majoration_ticpe_diesel = \
-                simulation.legislation_at(period.start).imposition_indirecte.major_regionale_ticpe_gazole.alsace
-            accise_diesel = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_gazole
-            accise_diesel_ticpe = accise_diesel + majoration_ticpe_diesel
-        except:
-            accise_diesel_ticpe = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_gazole
-
-        prix_diesel_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.diesel_ttc
-        taux_implicite_diesel = (
-            (accise_diesel_ticpe * (1 + taux_plein_tva)) /
-            (prix_diesel_ttc - accise_diesel_ticpe * (1 + taux_plein_tva))
-            )
+        legislation = get_legislation_snapshot(simulation, period.start)
+        taux_plein_tva = legislation.taux_plein_tva
+        taux_implicite_diesel = legislation.taux_implicite_diesel
 
         depenses_diesel = simulation.calculate('depenses_diesel', period)
         depenses_diesel_htva = depenses_diesel - tax_from_expense_including_tax(depenses_diesel, taux_plein_tva)
@@ -131,24 +113,11 @@ class sp_e10_ticpe(Variable):
     label = u"Calcul du montant de la TICPE sur le SP E10"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-        try:
-            accise_super_e10 = \
-                simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super_e10
-            majoration_ticpe_super_e10 = \
-                simulation.legislation_at(period.start).imposition_indirecte.major_regionale_ticpe_super.alsace
-            accise_ticpe_super_e10 = accise_super_e10 + majoration_ticpe_super_e10
-        except:
-            accise_super_e10 = \
-                simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super_e10
-
-        super_95_e10_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.super_95_e10_ttc
-        taux_implicite_sp_e10 = (
-            (accise_ticpe_super_e10 * (1 + taux_plein_tva)) /
-            (super_95_e10_ttc - accise_ticpe_super_e10 * (1 + taux_plein_tva))
-            )
+        legislation = get_legislation_snapshot(simulation, period.start)
+        taux_plein_tva = legislation.taux_plein_tva
+        taux_implicite_sp_e10 = legislation.taux_implicite_sp_e10
         depenses_essence = simulation.calculate('depenses_essence', period)
-        part_sp_e10 = simulation.legislation_at(period.start).imposition_indirecte.part_type_supercarburants.sp_e10
+        part_sp_e10 = legislation.part_sp_e10
         sp_e10_depenses = depenses_essence * part_sp_e10
         sp_e10_depenses_htva = \
             sp_e10_depenses - tax_from_expense_including_tax(sp_e10_depenses, taux_plein_tva)
@@ -164,23 +133,11 @@ class sp95_ticpe(Variable):
     label = u"Calcul du montant de TICPE sur le sp_95"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-
-        try:
-            accise_super95 = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super9598
-            majoration_ticpe_super95 = \
-                simulation.legislation_at(period.start).imposition_indirecte.major_regionale_ticpe_super.alsace
-            accise_ticpe_super95 = accise_super95 + majoration_ticpe_super95
-        except:
-            accise_ticpe_super95 = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super9598
-
-        super_95_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.super_95_ttc
-        taux_implicite_sp95 = (
-            (accise_ticpe_super95 * (1 + taux_plein_tva)) /
-            (super_95_ttc - accise_ticpe_super95 * (1 + taux_plein_tva))
-            )
+        legislation = get_legislation_snapshot(simulation, period.start)
+        taux_plein_tva = legislation.taux_plein_tva
+        taux_implicite_sp95 = legislation.taux_implicite_sp95
         depenses_essence = simulation.calculate('depenses_essence', period)
-        part_sp95 = simulation.legislation_at(period.start).imposition_indirecte.part_type_supercarburants.sp_95
+        part_sp95 = legislation.part_sp95
         sp95_depenses = depenses_essence * part_sp95
         sp95_depenses_htva = sp95_depenses - tax_from_expense_including_tax(sp95_depenses, taux_plein_tva)
         montant_sp95_ticpe = tax_from_expense_including_tax(sp95_depenses_htva, taux_implicite_sp95)
@@ -194,23 +151,11 @@ class sp98_ticpe(Variable):
     label = u"Calcul du montant de TICPE sur le sp_98"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-
-        try:
-            accise_super98 = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super9598
-            majoration_ticpe_super98 = \
-                simulation.legislation_at(period.start).imposition_indirecte.major_regionale_ticpe_super.alsace
-            accise_ticpe_super98 = accise_super98 + majoration_ticpe_super98
-        except:
-            accise_ticpe_super98 = simulation.legislation_at(period.start).imposition_indirecte.ticpe.ticpe_super9598
-
-        super_98_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.super_98_ttc
-        taux_implicite_sp98 = (
-            (accise_ticpe_super98 * (1 + taux_plein_tva)) /
-            (super_98_ttc - accise_ticpe_super98 * (1 + taux_plein_tva))
-            )
+        legislation = get_legislation_snapshot(simulation, period.start)
+        taux_plein_tva = legislation.taux_plein_tva
+        taux_implicite_sp98 = legislation.taux_implicite_sp98
         depenses_essence = simulation.calculate('depenses_essence', period)
-        part_sp98 = simulation.legislation_at(period.start).imposition_indirecte.part_type_supercarburants.sp_98
+        part_sp98 = legislation.part_sp98
         sp98_depenses = depenses_essence * part_sp98
         sp98_depenses_htva = sp98_depenses - tax_from_expense_including_tax(sp98_depenses, taux_plein_tva)
         montant_sp98_ticpe = tax_from_expense_including_tax(sp98_depenses_htva, taux_implicite_sp98)
@@ -224,17 +169,11 @@ class super_plombe_ticpe(Variable):
     label = u"Calcul du montant de la TICPE sur le super plombé"
 
     def function(self, simulation, period):
-        taux_plein_tva = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
-        accise_super_plombe_ticpe = \
-            simulation.legislation_at(period.start).imposition_indirecte.ticpe.super_plombe_ticpe
-        super_plombe_ttc = simulation.legislation_at(period.start).imposition_indirecte.prix_carburants.super_plombe_ttc
-        taux_implicite_super_plombe = (
-            (accise_super_plombe_ticpe * (1 + taux_plein_tva)) /
-            (super_plombe_ttc - accise_super_plombe_ticpe * (1 + taux_plein_tva))
-            )
+        legislation = get_legislation_snapshot(simulation, period.start)
+        taux_plein_tva = legislation.taux_plein_tva
+        taux_implicite_super_plombe = legislation.taux_implicite_super_plombe
         depenses_essence = simulation.calculate('depenses_essence', period)
-        part_super_plombe = \
-            simulation.legislation_at(period.start).imposition_indirecte.part_type_supercarburants.super_plombe
+        part_super_plombe = legislation.part_super_plombe
         super_plombe_depenses = depenses_essence * part_super_plombe
         super_plombe_depenses_htva = \
             super_plombe_depenses - tax_from_expense_including_tax(super_plombe_depenses, taux_plein_tva)
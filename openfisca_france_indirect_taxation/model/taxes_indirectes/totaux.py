@@ -26,6 +26,7 @@ from __future__ import division
 
 
 from ..base import *  # noqa analysis:ignore
+from .taux_effectifs import calculate_taxes_indirectes, taux_effectifs_applicables
 
 
 class taxes_indirectes_total(Variable):
@@ -34,6 +35,8 @@ class taxes_indirectes_total(Variable):
     label = u"Montant total de taxes indirectes payées"
 
     def function(self, simulation, period):
+        if taux_effectifs_applicables(simulation, period):
+            return period, calculate_taxes_indirectes(simulation, period)['taxes_indirectes_total']
         tva_total = simulation.calculate('tva_total', period)
         taxes_indirectes_total_hors_tva = simulation.calculate('taxes_indirectes_total_hors_tva', period)
         return period, (
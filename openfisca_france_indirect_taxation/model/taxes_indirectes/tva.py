@@ -21,7 +21,7 @@ class tva_taux_intermediaire(DatedVariable):
     @dated_function(start = datetime.date(2012, 1, 1))
     def function(self, simulation, period):
         depenses_tva_taux_intermediaire = simulation.calculate('depenses_tva_taux_intermediaire')
-        taux_intermediaire = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_intermediaire
+        taux_intermediaire = get_legislation_snapshot(simulation, period.start).taux_intermediaire_tva
         return period, tax_from_expense_including_tax(depenses_tva_taux_intermediaire, taux_intermediaire)
 
 
@@ -32,7 +32,7 @@ class tva_taux_plein(Variable):
 
     def function(self, simulation, period):
         depenses_tva_taux_plein = simulation.calculate('depenses_tva_taux_plein', period)
-        taux_plein = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_plein
+        taux_plein = get_legislation_snapshot(simulation, period.start).taux_plein_tva
         return period, tax_from_expense_including_tax(depenses_tva_taux_plein, taux_plein)
 
 
@@ -43,7 +43,7 @@ class tva_taux_reduit(Variable):
 
     def function(self, simulation, period):
         depenses_tva_taux_reduit = simulation.calculate('depenses_tva_taux_reduit', period)
-        taux_reduit = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_reduit
+        taux_reduit = get_legislation_snapshot(simulation, period.start).taux_reduit_tva
         return period, tax_from_expense_including_tax(depenses_tva_taux_reduit, taux_reduit)
 
 
@@ -54,7 +54,7 @@ class tva_taux_super_reduit(Variable):
 
     def function(self, simulation, period):
         depenses_tva_taux_super_reduit = simulation.calculate('depenses_tva_taux_super_reduit', period)
-        taux_super_reduit = simulation.legislation_at(period.start).imposition_indirecte.tva.taux_super_reduit
+        taux_super_reduit = get_legislation_snapshot(simulation, period.start).taux_super_reduit_tva
         return period, tax_from_expense_including_tax(depenses_tva_taux_super_reduit, taux_super_reduit)
 
 
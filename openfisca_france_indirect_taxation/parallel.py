@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Calcul concurrent, sur un pool de threads, des branches indépendantes du graphe des dépendances.
+
+Chaque variable n'est soumise au pool qu'une fois toutes ses dépendances calculées. Un verrou par variable
+protège le cache des holders : deux threads qui atteignent la même variable (par une dépendance absente du graphe,
+par exemple) la calculent une seule fois, le second attendant le résultat du premier.
+"""
+
+
+from __future__ import division
+
+import multiprocessing
+import Queue
+import sys
+import threading
+from multiprocessing.pool import ThreadPool
+
+from openfisca_core import periods
+
+from .dependencies import build_dependency_graph, wrapped_compute_methods
+
+
+def calculate_in_parallel(simulation, variables, period = None, dependency_graph = None, workers = None):
+    """
+    Calcule les variables données et toutes celles dont elles dépendent en évaluant les branches indépendantes en
+    parallèle. Renvoie un dict variable -> tableau.
+
+    Le graphe des dépendances est relevé sur une simulation témoin s'il n'est pas donné. Les branches prêtes sont
+    soumises par coût cumulé décroissant, pour commencer par le chemin critique. Le gain dépend des formules qui
+    relâchent le GIL (calculs numpy sur de grands tableaux).
+    """
+    assert not simulation.debug and not simulation.trace, \
+        "The computation stack of debug and trace modes isn't thread-safe"
+    if period is None:
+        period = simulation.period
+    period = periods.period(period)
+    if dependency_graph is None:
+        dependency_graph = build_dependency_graph(simulation.tax_benefit_system, period, variables)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    column_by_name = simulation.tax_benefit_system.column_by_name
+    pending_variables = []
+    for variable in dependency_graph.topological_order(variables):
+        column = column_by_name.get(variable)
+        if column is None or column.is_input_variable():
+            continue
+        # Create the holders before starting the threads.
+        holder = simulation.get_or_new_holder(variable)
+        if holder.get_array(period) is None:
+            pending_variables.append(variable)
+    pending_variables_set = set(pending_variables)
+    remaining_count_by_variable = dict(
+        (variable, len(dependency_graph.dependencies_by_variable[variable] & pending_variables_set))
+        for variable in pending_variables
+        )
+
+    global_lock = threading.Lock()
+    lock_by_variable = dict()
+
+    def locking(compute):
+        def locking_compute(column_name, period = None, **parameters):
+            with global_lock:
+                lock = lock_by_variable.get(column_name)
+                if lock is None:
+                    # Reentrant, as formulas may be called again for other periods of the same variable.
+                    lock = lock_by_variable[column_name] = threading.RLock()
+            with lock:
+                return compute(column_name, period = period, **parameters)
+        return locking_compute
+
+    def get_or_new_holder(column_name, get_or_new_holder = simulation.get_or_new_holder):
+        with global_lock:
+            return get_or_new_holder(column_name)
+
+    results = Queue.Queue()
+
+    def calculate(variable):
+        try:
+            simulation.calculate(variable, period)
+        except Exception:
+            results.put((variable, sys.exc_info()))
+        else:
+            results.put((variable, None))
+
+    def submit(variables):
+        for variable in sorted(variables, key = dependency_graph.cumulative_cost, reverse = True):
+            pool.apply_async(calculate, (variable,))
+
+    if pending_variables:
+        pool = ThreadPool(max(1, min(workers, len(pending_variables))))
+        simulation.get_or_new_holder = get_or_new_holder
+        try:
+            with wrapped_compute_methods(simulation, locking):
+                ready_variables = [
+                    variable
+                    for variable in pending_variables
+                    if remaining_count_by_variable[variable] == 0
+                    ]
+                running_count = len(ready_variables)
+                submit(ready_variables)
+                error = None
+                while running_count:
+                    variable, exc_info = results.get()
+                    running_count -= 1
+                    if exc_info is not None:
+                        # Wait for the running formulas, but don't start new ones.
+                        error = error or exc_info
+                        continue
+                    if error is not None:
+                        continue
+                    ready_variables = []
+                    for dependent in dependency_graph.dependents_by_variable[variable]:
+                        if dependent in pending_variables_set:
+                            remaining_count_by_variable[dependent] -= 1
+                            if remaining_count_by_variable[dependent] == 0:
+                                ready_variables.append(dependent)
+                    running_count += len(ready_variables)
+                    submit(ready_variables)
+                if error is not None:
+                    raise error[0], error[1], error[2]
+        finally:
+            pool.close()
+            pool.join()
+            del simulation.get_or_new_holder
+
+    return dict(
+        (variable, simulation.calculate(variable, period))
+        for variable in variables
+        )
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Cache sur disque de la législation prétraitée (parameters.xml + preprocess_legislation).
+
+La clé du cache est l'empreinte de parameters.xml, des fichiers d'assets lus par le prétraitement, du code du
+prétraitement et de la version d'OpenFisca-Core : un démarrage à chaud ne lit ni le XML ni les CSV.
+"""
+
+
+import cPickle
+import glob
+import hashlib
+import inspect
+import logging
+import os
+import tempfile
+
+import pkg_resources
+
+from openfisca_core import conv, legislationsxml
+
+from . import preprocessing
+from ..utils import get_cache_directory, get_file_hash
+
+
+log = logging.getLogger(__name__)
+
+cache_file_name_template = 'legislation-{}.pickle'
+
+
+def build_legislation_json(legislation_xml_file_path, preprocess_legislation = None):
+    legislation_json = conv.check(legislationsxml.xml_legislation_file_path_to_json)(
+        legislation_xml_file_path, state = conv.default_state)
+    if preprocess_legislation is not None:
+        legislation_json = preprocess_legislation(legislation_json)
+    return legislation_json
+
+
+def get_legislation_hash(legislation_xml_file_path):
+    sha1 = hashlib.sha1(get_file_hash(
+        legislation_xml_file_path,
+        inspect.getsourcefile(preprocessing),
+        *preprocessing.asset_file_paths
+        ))
+    sha1.update(pkg_resources.get_distribution('OpenFisca-Core').version)
+    return sha1.hexdigest()
+
+
+def load_legislation_json(legislation_xml_file_path, preprocess_legislation = None):
+    """
+    Renvoie la législation prétraitée, lue dans le cache de l'utilisateur si possible, construite puis mise en
+    cache sinon.
+    """
+    cache_directory = get_cache_directory()
+    if cache_directory is None:
+        return build_legislation_json(legislation_xml_file_path, preprocess_legislation)
+
+    cache_file_path = os.path.join(
+        cache_directory,
+        cache_file_name_template.format(get_legislation_hash(legislation_xml_file_path)),
+        )
+    if os.path.exists(cache_file_path):
+        try:
+            with open(cache_file_path, 'rb') as cache_file:
+                return cPickle.load(cache_file)
+        except Exception:
+            log.warning(u'Unable to read legislation cache {}: rebuilding it'.format(cache_file_path))
+
+    legislation_json = build_legislation_json(legislation_xml_file_path, preprocess_legislation)
+    try:
+        # Write to a temporary file then rename it, so that concurrent processes never read a partial file.
+        with tempfile.NamedTemporaryFile(dir = cache_directory, delete = False) as cache_file:
+            cPickle.dump(legislation_json, cache_file, cPickle.HIGHEST_PROTOCOL)
+        os.rename(cache_file.name, cache_file_path)
+        for outdated_file_path in glob.glob(os.path.join(cache_directory, cache_file_name_template.format('*'))):
+            if outdated_file_path != cache_file_path:
+                os.remove(outdated_file_path)
+    except (IOError, OSError):
+        log.warning(u'Unable to write legislation cache {}'.format(cache_file_path))
+    return legislation_json
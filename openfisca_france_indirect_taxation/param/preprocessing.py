@@ -23,8 +23,21 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import os
+
 from openfisca_core import reforms
 
+from ..utils import assets_directory
+
+
+# Asset files read by preprocess_legislation: the on-disk legislation cache is invalidated when one of them changes.
+asset_file_paths = [
+    os.path.join(assets_directory, 'prix', 'prix_annuel_carburants.csv'),
+    os.path.join(assets_directory, 'quantites', 'parc_annuel_moyen_vp.csv'),
+    os.path.join(assets_directory, 'quantites', 'quantite_carbu_vp_france.csv'),
+    os.path.join(assets_directory, 'part_des_types_de_supercarburants.csv'),
+    ]
+
 
 def preprocess_legislation(legislation_json):
     '''
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Politique de précision des variables monétaires : type de stockage, float32 ou float64, par famille de variables.
+
+Les FloatCol d'OpenFisca-Core sont stockées en float32, ce qui suffit aux agrégats pondérés publiés et divise par
+deux la mémoire du bloc des dépenses par rapport au float64. Les sommes finales sont de toute façon accumulées en
+float64 (agrégats et réductions pondérés, produits par les matrices creuses des catégories fiscales et des taux
+effectifs) avant d'être arrondies au type de stockage. Une famille peut passer en float64 quand une analyse a
+besoin de plus de précision.
+
+Les colonnes sont partagées par tous les systèmes socio-fiscaux du processus : la politique s'applique à tous, et
+doit être fixée avant de créer les simulations.
+"""
+
+
+from __future__ import division
+
+import collections
+
+import numpy
+
+from openfisca_core.columns import FloatCol
+
+
+family_test_by_name = collections.OrderedDict([
+    ('postes_coicop', lambda name, column: name.startswith('poste_coicop_')),
+    ('categories_fiscales', lambda name, column: name.startswith('categorie_fiscale_')),
+    ('depenses', lambda name, column: name.startswith('depenses_')),
+    ('taxes', lambda name, column: column.formula_class is not None and column.formula_class.__module__.startswith(
+        'openfisca_france_indirect_taxation.model.taxes_indirectes.')),
+    ])
+precision_dtypes = (numpy.dtype(numpy.float32), numpy.dtype(numpy.float64))
+
+
+def get_dtype_by_variable(tax_benefit_system, families = None):
+    """Renvoie le type de stockage des FloatCol des familles données (par défaut de toutes les familles)."""
+    return dict(
+        (name, numpy.dtype(column.dtype))
+        for name, column in tax_benefit_system.column_by_name.iteritems()
+        if isinstance(column, FloatCol) and get_variable_family(name, column) in (families or family_test_by_name)
+        )
+
+
+def get_family_dtype(tax_benefit_system, family):
+    """Renvoie le type de stockage d'une famille, float32 si elle n'a aucune variable."""
+    dtypes = set(get_dtype_by_variable(tax_benefit_system, [family]).itervalues())
+    assert len(dtypes) <= 1, "Variables of family {} have several dtypes: {}".format(family, dtypes)
+    return dtypes.pop() if dtypes else numpy.dtype(numpy.float32)
+
+
+def get_variable_family(name, column):
+    for family, test in family_test_by_name.iteritems():
+        if test(name, column):
+            return family
+    return None
+
+
+def set_dtype_by_variable(tax_benefit_system, dtype_by_variable):
+    column_by_name = tax_benefit_system.column_by_name
+    for name, dtype in dtype_by_variable.iteritems():
+        dtype = numpy.dtype(dtype)
+        assert dtype in precision_dtypes, "Unsupported dtype {} for variable {}".format(dtype, name)
+        column_by_name[name].dtype = dtype.type
+
+
+def set_precision_policy(tax_benefit_system, dtype_by_family):
+    """
+    Donne aux FloatCol de chaque famille (postes_coicop, categories_fiscales, depenses, taxes) le type de stockage
+    donné, float32 ou float64.
+
+    Renvoie les types précédents des variables de ces familles, à redonner à set_dtype_by_variable pour revenir à la
+    politique précédente.
+    """
+    unknown_families = set(dtype_by_family).difference(family_test_by_name)
+    assert not unknown_families, "Unknown families: {}".format(sorted(unknown_families))
+    previous_dtype_by_variable = get_dtype_by_variable(tax_benefit_system, dtype_by_family.keys())
+    column_by_name = tax_benefit_system.column_by_name
+    set_dtype_by_variable(tax_benefit_system, dict(
+        (name, dtype_by_family[get_variable_family(name, column_by_name[name])])
+        for name in previous_dtype_by_variable
+        ))
+    return previous_dtype_by_variable
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Profil des calculs d'une simulation, variable par variable : nombre d'appels, résultats lus dans le cache, temps
+inclusif et exclusif, et taille des résultats calculés.
+
+Le profil s'exporte en table (une ligne par variable et période) et en piles repliées ("collapsed stacks") lues par
+les outils de flame graph (flamegraph.pl, speedscope...).
+"""
+
+
+from __future__ import division
+
+import collections
+import threading
+import time
+import weakref
+
+import pandas
+
+from openfisca_core import periods
+
+from .dependencies import restore_compute_methods, wrap_compute_methods
+
+
+statistics = ('calls', 'cache_hits', 'inclusive_time', 'exclusive_time', 'bytes')
+
+
+class VariableProfiler(object):
+    """
+    Profileur des appels de simulation.calculate* (et compute*), à attacher à une ou plusieurs simulations.
+
+    Les temps sont en secondes, mesurés en temps réel ; le temps exclusif d'un appel est son temps inclusif moins celui
+    des variables qu'il a calculées. bytes est la taille des tableaux des résultats calculés (hors lectures du
+    cache), pas celle des tableaux intermédiaires des formules.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Weak keys, so that the profiler doesn't keep the simulations of a chunked run alive.
+        self._original_compute_by_name_by_simulation = weakref.WeakKeyDictionary()
+        self.exclusive_time_by_stack = collections.defaultdict(float)
+        self.statistics_by_key = collections.OrderedDict()  # (variable, period) -> [calls, cache hits, ...]
+
+    def attach(self, simulation):
+        """Profile les calculs de la simulation jusqu'à l'appel de detach."""
+        assert simulation not in self._original_compute_by_name_by_simulation, "Simulation is already profiled"
+        self._original_compute_by_name_by_simulation[simulation] = wrap_compute_methods(
+            simulation,
+            lambda compute: self.wrap(simulation, compute),
+            )
+        return simulation
+
+    def clear(self):
+        with self._lock:
+            self.exclusive_time_by_stack.clear()
+            self.statistics_by_key.clear()
+
+    def detach(self, simulation):
+        restore_compute_methods(simulation, self._original_compute_by_name_by_simulation.pop(simulation))
+        return simulation
+
+    def record(self, key, stack, cache_hit, inclusive_time, exclusive_time, nbytes):
+        with self._lock:
+            key_statistics = self.statistics_by_key.get(key)
+            if key_statistics is None:
+                key_statistics = self.statistics_by_key[key] = [0, 0, 0.0, 0.0, 0]
+            key_statistics[0] += 1
+            key_statistics[1] += cache_hit
+            key_statistics[2] += inclusive_time
+            key_statistics[3] += exclusive_time
+            key_statistics[4] += nbytes
+            self.exclusive_time_by_stack[stack] += exclusive_time
+
+    def to_data_frame(self):
+        """Renvoie la table des statistiques par variable et période, triée par temps exclusif décroissant."""
+        with self._lock:
+            rows = [
+                [variable, str(period)] + list(key_statistics)
+                for (variable, period), key_statistics in self.statistics_by_key.iteritems()
+                ]
+        data_frame = pandas.DataFrame(rows, columns = ['variable', 'period'] + list(statistics))
+        return data_frame.sort_values('exclusive_time', ascending = False).reset_index(drop = True)
+
+    def wrap(self, simulation, compute):
+        def profiled_compute(column_name, period = None, **parameters):
+            if period is None:
+                period = simulation.period
+            elif not isinstance(period, periods.Period):
+                period = periods.period(period)
+            cache_hit = simulation.get_or_new_holder(column_name).get_from_cache(
+                period, parameters.get('extra_params')).array is not None
+            # Frames of the variables being computed by this thread: [key, time spent in dependencies]
+            stack = getattr(self._local, 'stack', None)
+            if stack is None:
+                stack = self._local.stack = []
+            key = (column_name, period)
+            stack.append([key, 0.0])
+            keys = tuple(frame[0] for frame in stack)
+            dated_holder = None
+            start = time.time()
+            try:
+                dated_holder = compute(column_name, period = period, **parameters)
+                return dated_holder
+            finally:
+                inclusive_time = time.time() - start
+                _, children_time = stack.pop()
+                if stack:
+                    stack[-1][1] += inclusive_time
+                array = dated_holder.array if dated_holder is not None and not cache_hit else None
+                self.record(key, keys, cache_hit, inclusive_time, inclusive_time - children_time,
+                    array.nbytes if array is not None else 0)
+        return profiled_compute
+
+    def write_stacks(self, file_path):
+        """
+        Écrit le temps exclusif de chaque pile d'appels, en microsecondes, au format des piles repliées :
+        une ligne "variable[période];variable[période]... durée" par pile.
+        """
+        with self._lock:
+            lines = [
+                u'{} {}\n'.format(
+                    u';'.join(u'{}[{}]'.format(variable, period) for variable, period in stack),
+                    int(round(exclusive_time * 1e6)),
+                    )
+                for stack, exclusive_time in sorted(self.exclusive_time_by_stack.iteritems())
+                ]
+        with open(file_path, 'w') as stacks_file:
+            stacks_file.writelines(line.encode('utf-8') for line in lines)
+
+    def write_table(self, file_path):
+        """Écrit la table des statistiques par variable et période en CSV."""
+        self.to_data_frame().to_csv(file_path, index = False)
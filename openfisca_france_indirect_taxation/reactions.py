@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Réactions comportementales vectorisées : dépenses ajustées et recettes des taxes indirectes après réaction des
+ménages, pour toute une grille de variations de prix, en une seule évaluation.
+"""
+
+
+from __future__ import division
+
+import numpy
+
+from openfisca_core import periods
+
+from .model.base import depenses_apres_reaction
+from .model.taxes_indirectes.taux_effectifs import taxes_by_total
+from .sweeps import build_passage, build_taxes_selection, build_variants_coefficients
+
+
+# Excises levied per unit (litre of fuel, hectolitre of alcohol): their revenue follows the volumes, not the expenses.
+taxes_unitaires = frozenset(taxes_by_total['ticpe_totale'] + taxes_by_total['total_alcool_droit_d_accise'])
+
+
+def sweep_reactions(simulation, price_changes, elasticity_by_depenses = None, variants = None, period = None,
+        variables = None):
+    """
+    Calcule les dépenses ajustées et les taxes indirectes après réaction des ménages pour plusieurs scénarios de
+    variations de prix, en une seule évaluation vectorisée.
+
+    price_changes est une liste de scénarios, chacun un dict variable de dépenses servant d'assiette aux taxes
+    (depenses_essence, depenses_diesel, depenses_tva_taux_plein...) -> variation relative du prix TTC ; les dépenses
+    absentes d'un scénario ne changent pas de prix. elasticity_by_depenses associe à ces dépenses une élasticité
+    prix : un nom de variable par ménage (par exemple 'carburants_elasticite_prix') ou un scalaire ; les dépenses
+    sans élasticité sont inélastiques en quantités. La réaction est celle des variables *_ajustees :
+    depenses * (1 + (1 + elasticite) * variation). sweeps.build_variants_grid construit une grille de
+    scénarios à partir des variations de chaque bien.
+
+    variants est une liste facultative de variantes de paramètres (voir sweeps.sweep), une par scénario, qui fixe
+    les taux appliqués aux dépenses ajustées de chaque scénario (par défaut, la législation de la période).
+
+    Les taxes ad valorem (TVA, tabacs, assurances) sont leur taux effectif appliqué aux dépenses ajustées. Les droits
+    d'accise unitaires (TICPE, alcools, voir taxes_unitaires) sont leur taux effectif au prix de la période appliqué
+    aux volumes, c'est-à-dire aux dépenses ajustées divisées par (1 + variation) : quand le prix d'un bien augmente,
+    leur recette baisse avec les quantités même si la dépense en euros augmente.
+
+    Renvoie un dict variable -> tableau float64 de forme (scénarios, ménages), avec les taxes demandées et, pour
+    chaque dépense dont le prix varie, la variable <depenses>_ajustees.
+    """
+    if period is None:
+        period = simulation.period
+    period = periods.period(period)
+    if elasticity_by_depenses is None:
+        elasticity_by_depenses = dict()
+    if variables is None:
+        variables = ['tva_total', 'ticpe_totale', 'taxes_indirectes_total']
+    if variants is None:
+        variants = [dict()] * len(price_changes)
+    assert len(variants) == len(price_changes), \
+        "There must be one variant per price changes scenario ({} != {})".format(len(variants), len(price_changes))
+
+    coefficient_by_taxe, coefficients = build_variants_coefficients(simulation, variants, period)
+    taxes = coefficient_by_taxe.keys()
+    depenses_variables, passage = build_passage(coefficient_by_taxe)
+    unknown_depenses = set(
+        depenses_variable
+        for price_change in price_changes
+        for depenses_variable in price_change
+        ).union(elasticity_by_depenses).difference(depenses_variables)
+    assert not unknown_depenses, "Unknown expense bases: {}".format(', '.join(sorted(unknown_depenses)))
+
+    menages_count = simulation.entity_by_key_plural['menages'].count
+    depenses = numpy.array(
+        [simulation.calculate(depenses_variable, period) for depenses_variable in depenses_variables],
+        dtype = numpy.float64,
+        ).reshape(len(depenses_variables), menages_count)
+    elasticites = numpy.zeros((len(depenses_variables), menages_count), dtype = numpy.float64)
+    for index, depenses_variable in enumerate(depenses_variables):
+        elasticity = elasticity_by_depenses.get(depenses_variable, 0)
+        if isinstance(elasticity, basestring):
+            elasticity = simulation.calculate(elasticity, period)
+        elasticites[index] = elasticity
+    variations = numpy.array(
+        [
+            [price_change.get(depenses_variable, 0) for depenses_variable in depenses_variables]
+            for price_change in price_changes
+            ],
+        dtype = numpy.float64,
+        ).reshape(len(price_changes), len(depenses_variables))
+
+    # (scénarios, dépenses, ménages)
+    depenses_ajustees = depenses_apres_reaction(depenses[None, :, :], elasticites[None, :, :], variations[:, :, None])
+    # Expenses at the prices of the period, whose changes are those of the volumes.
+    volumes = depenses_ajustees / (1 + variations[:, :, None])
+    unitaires = numpy.array([taxe in taxes_unitaires for taxe in taxes], dtype = numpy.float64)
+
+    result_by_variable = dict()
+    for variable in variables:
+        # (scénarios, dépenses): taux effectifs de la variable appliqués à chaque assiette.
+        coefficients_by_taxe = coefficients * build_taxes_selection(variable, taxes)
+        result_by_variable[variable] = numpy.einsum(
+            'sd,sdm->sm',
+            (coefficients_by_taxe * (1 - unitaires)).dot(passage),
+            depenses_ajustees,
+            ) + numpy.einsum('sd,sdm->sm', (coefficients_by_taxe * unitaires).dot(passage), volumes)
+    for index, depenses_variable in enumerate(depenses_variables):
+        if variations[:, index].any():
+            result_by_variable['{}_ajustees'.format(depenses_variable)] = depenses_ajustees[:, index, :]
+    return result_by_variable
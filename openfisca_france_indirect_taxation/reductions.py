@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Réductions fusionnables : agrégats pondérés calculés bloc de ménages par bloc de ménages.
+
+Chaque réduction est mise à jour avec les valeurs et les poids d'un bloc, puis les réductions de plusieurs blocs (ou
+de plusieurs processus) sont fusionnées par merge. Le résultat ne dépend pas du découpage en blocs, à la précision du
+résumé près pour les quantiles.
+"""
+
+
+from __future__ import division
+
+import numpy
+
+from .model.quantiles import WeightedQuantiles
+
+
+class WeightedSum(object):
+    """Somme pondérée d'une variable et somme des poids, dont on déduit la moyenne pondérée."""
+    count = 0
+    reference = False  # Computed on the reference simulation of a reform
+    total = 0
+    variable = None
+    weights_total = 0
+
+    def __init__(self, variable = None, reference = False):
+        self.reference = reference
+        self.variable = variable
+
+    @property
+    def mean(self):
+        return self.total / self.weights_total if self.weights_total else numpy.nan
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.weights_total += other.weights_total
+        return self
+
+    def update(self, values, weights):
+        weights = numpy.asarray(weights, dtype = numpy.float64)
+        assert len(values) == len(weights), "Values and weights must belong to the same entity"
+        self.count += len(weights)
+        # Accumulate in float64: the sum of millions of float32 products would lose the cents.
+        self.total += numpy.dot(weights, numpy.asarray(values, dtype = numpy.float64))
+        self.weights_total += weights.sum()
+        return self
+
+
+class WeightedQuantileSketch(object):
+    """
+    Résumé de taille bornée de la distribution pondérée d'une variable, pour en estimer les quantiles.
+
+    Le résumé est une liste de centroïdes (valeur moyenne, poids) triés. Quand il dépasse deux fois sa taille, les
+    observations sont regroupées en size paquets de même poids : l'erreur sur le rang d'un quantile est d'au plus
+    1 / size du poids total, quels que soient le nombre et la taille des blocs. Le minimum et le maximum sont exacts.
+    """
+    count = 0
+    maximum = None
+    minimum = None
+    reference = False  # Computed on the reference simulation of a reform
+    size = None
+    values = None
+    variable = None
+    weights = None
+
+    def __init__(self, variable = None, reference = False, size = 1000):
+        assert size > 0
+        self.reference = reference
+        self.size = size
+        self.values = numpy.zeros(0)
+        self.variable = variable
+        self.weights = numpy.zeros(0)
+
+    def compress(self):
+        bucket_weights = self.weights
+        if bucket_weights.sum() <= 0:
+            # Unweighted test cases: every observation has the same weight, as in WeightedQuantiles.
+            bucket_weights = numpy.ones_like(bucket_weights)
+        cumulative_weights = numpy.cumsum(bucket_weights)
+        # Bucket of each centroid, by the middle of its cumulative weight.
+        buckets = numpy.minimum(
+            ((cumulative_weights - .5 * bucket_weights) / cumulative_weights[-1] * self.size).astype(numpy.int64),
+            self.size - 1,
+            )
+        sizes = numpy.bincount(buckets, weights = bucket_weights, minlength = self.size)
+        values = numpy.bincount(buckets, weights = bucket_weights * self.values, minlength = self.size)
+        filled = sizes > 0
+        self.values = values[filled] / sizes[filled]
+        self.weights = numpy.bincount(buckets, weights = self.weights, minlength = self.size)[filled]
+
+    def merge(self, other):
+        self.count += other.count
+        return self._add(other.values, other.weights, other.minimum, other.maximum)
+
+    def partition(self, values, count):
+        """Renvoie le numéro (de 1 à count) du quantile estimé de chaque valeur."""
+        return numpy.searchsorted(self.quantiles(count), values, side = 'right').astype(numpy.int32) + 1
+
+    def quantiles(self, count):
+        """Renvoie les count - 1 seuils estimés séparant count quantiles de même poids."""
+        thresholds = WeightedQuantiles(self.values, self.weights).quantiles(count)
+        if self.minimum is not None:
+            thresholds = thresholds.clip(self.minimum, self.maximum)
+        return thresholds
+
+    def update(self, values, weights):
+        values = numpy.asarray(values, dtype = numpy.float64)
+        weights = numpy.asarray(weights, dtype = numpy.float64)
+        assert len(values) == len(weights), "Values and weights must belong to the same entity"
+        self.count += len(values)
+        if len(values) == 0:
+            return self
+        return self._add(values, weights, values.min(), values.max())
+
+    def _add(self, values, weights, minimum, maximum):
+        if len(values) == 0:
+            return self
+        self.minimum = minimum if self.minimum is None else min(self.minimum, minimum)
+        self.maximum = maximum if self.maximum is None else max(self.maximum, maximum)
+        values = numpy.concatenate((self.values, values))
+        weights = numpy.concatenate((self.weights, weights))
+        order = numpy.argsort(values, kind = 'mergesort')
+        self.values = values[order]
+        self.weights = weights[order]
+        if len(self.values) > 2 * self.size:
+            self.compress()
+        return self
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Cache sur disque des résultats des scénarios, avec éviction des résultats les moins récemment lus au-delà d'une
+taille maximale.
+
+Un résultat est le tableau d'une variable pour une période. Sa clé est l'empreinte de l'année des données, de la
+période, de la législation du système socio-fiscal (réforme comprise), des arguments de calibration et d'inflation,
+des données d'entrée, du nom de la variable et du code des formules de la variable et de ses dépendances : modifier
+une formule n'invalide que les résultats des variables qui en dépendent. Le registre des postes COICOP et des
+catégories fiscales et la politique de précision, qui changent les résultats sans changer le code, en font partie.
+"""
+
+
+from __future__ import division
+
+import glob
+import hashlib
+import inspect
+import json
+import logging
+import os
+import tempfile
+
+import numpy
+import pkg_resources
+
+from .dependencies import build_dependency_graph
+from .model.consommation.variables_registry import get_registry
+from .precision import get_dtype_by_variable
+from .utils import get_cache_directory, get_file_hash
+
+
+log = logging.getLogger(__name__)
+
+default_max_size = 2 ** 30  # bytes
+max_size_environment_variable = 'OPENFISCA_INDIRECT_TAXATION_RESULT_CACHE_SIZE'
+package_directory = os.path.dirname(os.path.abspath(__file__))
+registry_hash_by_id = dict()
+result_cache_version = 1
+
+
+class ResultCache(object):
+    """
+    Tableaux numpy rangés dans un répertoire, un fichier .npy par clé.
+
+    La date de modification d'un fichier est mise à jour à chaque lecture : quand le cache dépasse max_size octets,
+    les fichiers les plus anciens sont supprimés en premier.
+    """
+    directory = None
+    max_size = None
+
+    def __init__(self, directory = None, max_size = None):
+        if directory is None:
+            cache_directory = get_cache_directory()
+            assert cache_directory is not None, "The result cache needs a writable cache directory"
+            directory = os.path.join(cache_directory, 'results')
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        if max_size is None:
+            max_size = int(os.environ.get(max_size_environment_variable) or default_max_size)
+        self.max_size = max_size
+
+    def clear(self):
+        for file_path in self.get_file_paths():
+            os.remove(file_path)
+
+    def evict(self):
+        """Supprime les résultats les moins récemment utilisés jusqu'à ce que le cache tienne dans max_size."""
+        stat_by_file_path = dict()
+        for file_path in self.get_file_paths():
+            try:
+                stat_by_file_path[file_path] = os.stat(file_path)
+            except OSError:
+                # Removed by another process.
+                continue
+        size = sum(stat.st_size for stat in stat_by_file_path.itervalues())
+        for file_path in sorted(stat_by_file_path, key = lambda file_path: stat_by_file_path[file_path].st_mtime):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(file_path)
+            except OSError:
+                continue
+            size -= stat_by_file_path[file_path].st_size
+
+    def get(self, key):
+        """Renvoie le tableau de la clé, ou None s'il n'est pas dans le cache."""
+        file_path = self.get_file_path(key)
+        try:
+            array = numpy.load(file_path)
+            os.utime(file_path, None)
+        except (IOError, OSError, ValueError):
+            return None
+        return array
+
+    def get_file_path(self, key):
+        return os.path.join(self.directory, key + '.npy')
+
+    def get_file_paths(self):
+        return glob.glob(os.path.join(self.directory, '*.npy'))
+
+    def set(self, key, array):
+        try:
+            # Write to a temporary file then rename it, so that concurrent processes never read a partial file.
+            with tempfile.NamedTemporaryFile(dir = self.directory, suffix = '.tmp', delete = False) as cache_file:
+                numpy.save(cache_file, numpy.asarray(array))
+            os.rename(cache_file.name, self.get_file_path(key))
+        except (IOError, OSError):
+            log.warning(u'Unable to write result {} in cache {}'.format(key, self.directory))
+            return
+        self.evict()
+
+
+def get_formula_source_file_paths(column):
+    """
+    Renvoie les fichiers du paquet qui définissent la formule de la colonne et les fonctions, classes et modules du
+    paquet qu'elle appelle directement.
+    """
+    formula_classes = [column.formula_class]
+    file_paths = set()
+    while formula_classes:
+        formula_class = formula_classes.pop()
+        for dated_formula in getattr(formula_class, 'dated_formulas_class', None) or []:
+            formula_classes.append(dated_formula['formula_class'])
+        for value in vars(formula_class).itervalues():
+            function = getattr(value, '__func__', value)
+            code = getattr(function, '__code__', None)
+            if code is None:
+                continue
+            file_paths.add(code.co_filename)
+            for name in code.co_names:
+                helper = function.__globals__.get(name)
+                if not any(test(helper) for test in (inspect.isclass, inspect.isfunction, inspect.ismodule)):
+                    continue
+                try:
+                    file_paths.add(inspect.getsourcefile(helper))
+                except TypeError:
+                    # Built-in module or class
+                    continue
+    return sorted(
+        file_path
+        for file_path in file_paths
+        if file_path is not None and os.path.abspath(file_path).startswith(package_directory)
+        )
+
+
+def get_legislation_hash(tax_benefit_system):
+    legislation_hash = getattr(tax_benefit_system, 'legislation_hash', None)
+    if legislation_hash is None:
+        legislation_hash = tax_benefit_system.legislation_hash = hashlib.sha1(json.dumps(
+            tax_benefit_system.legislation_json, default = repr, sort_keys = True)).hexdigest()
+    return legislation_hash
+
+
+def get_precision_hash(tax_benefit_system):
+    """
+    Renvoie l'empreinte de la politique de précision : le type de stockage de n'importe quelle dépendance d'une
+    variable change son résultat.
+    """
+    return hashlib.sha1(json.dumps(sorted(
+        (name, str(dtype))
+        for name, dtype in get_dtype_by_variable(tax_benefit_system).iteritems()
+        ))).hexdigest()
+
+
+def get_registry_hash():
+    """
+    Renvoie l'empreinte du registre des variables poste_coicop_* et categorie_fiscale_*, qui contient celle de
+    "Parametres fiscalite indirecte.csv" dont il est tiré.
+    """
+    registry = get_registry()
+    registry_hash = registry_hash_by_id.get(id(registry))
+    if registry_hash is None:
+        registry_hash_by_id.clear()
+        registry_hash = registry_hash_by_id[id(registry)] = hashlib.sha1(json.dumps(
+            registry, sort_keys = True)).hexdigest()
+    return registry_hash
+
+
+def get_result_key(**items):
+    """Renvoie l'empreinte des éléments donnés, qui doivent pouvoir être sérialisés en JSON (ou par repr)."""
+    items['result_cache_version'] = result_cache_version
+    return hashlib.sha1(json.dumps(items, default = repr, sort_keys = True)).hexdigest()
+
+
+def get_variable_code_hash(tax_benefit_system, variable, period):
+    """
+    Renvoie l'empreinte du code des formules de la variable et de toutes les variables dont elle dépend, ainsi que de
+    la version d'OpenFisca-Core.
+    """
+    code_hash_by_key = getattr(tax_benefit_system, 'code_hash_by_key', None)
+    if code_hash_by_key is None:
+        code_hash_by_key = tax_benefit_system.code_hash_by_key = dict()
+    code_hash = code_hash_by_key.get((variable, period))
+    if code_hash is not None:
+        return code_hash
+    dependency_graph_by_period = getattr(tax_benefit_system, 'dependency_graph_by_period', None)
+    if dependency_graph_by_period is None:
+        dependency_graph_by_period = tax_benefit_system.dependency_graph_by_period = dict()
+    dependency_graph = dependency_graph_by_period.get(period)
+    if dependency_graph is None:
+        dependency_graph = dependency_graph_by_period[period] = build_dependency_graph(tax_benefit_system, period)
+    column_by_name = tax_benefit_system.column_by_name
+    file_paths = set()
+    variables = dependency_graph.ancestors(variable) | set([variable]) if variable in dependency_graph else [variable]
+    for name in variables:
+        column = column_by_name.get(name)
+        if column is not None and not column.is_input_variable():
+            file_paths.update(get_formula_source_file_paths(column))
+    sha1 = hashlib.sha1(get_file_hash(*sorted(file_paths)))
+    sha1.update(pkg_resources.get_distribution('OpenFisca-Core').version)
+    code_hash = code_hash_by_key[(variable, period)] = sha1.hexdigest()
+    return code_hash
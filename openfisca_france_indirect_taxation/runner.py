@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Exécution sur un pool de processus de scénarios de plusieurs années et réformes.
+
+Chaque tâche est un dict d'arguments de SurveyScenario.create (year, data_year, reform, calibration_kwargs,
+inflation_kwargs...). Le système socio-fiscal et les réformes des tâches sont construits une fois dans le processus
+principal, avant la création du pool : les processus fils en héritent, déjà chauds, par fork, avec les tâches.
+"""
+
+
+from __future__ import division
+
+import logging
+import multiprocessing
+
+from . import get_tax_benefit_system
+from .aggregates import statistics
+
+
+log = logging.getLogger(__name__)
+
+# Jobs of the running run_jobs: the forked workers inherit them instead of receiving them pickled, as reforms can't
+# be pickled.
+current_jobs = None
+# Keys of the jobs copied in each row of their result table (the full key of the reform for "reform").
+job_label_keys = ('data_year', 'year', 'reform')
+
+
+def compute_job_pivot_tables(job, values = None, columns = None, aggfunc = 'mean', **aggregates_kwargs):
+    """
+    Crée le scénario de la tâche et renvoie la table longue de ses agrégats (voir SurveyScenario.compute_aggregates) :
+    une ligne par variable de values et par modalité de columns, la statistique aggfunc étant dans la colonne value.
+    """
+    from .surveys import SurveyScenario
+
+    assert values and columns, "The variables to aggregate and the columns of the pivot tables are required"
+    assert aggfunc in statistics
+    job = dict(job)
+    job.setdefault('output_variables', list(values) + list(columns))
+    survey_scenario = SurveyScenario.create(**job)
+    data_frame = survey_scenario.compute_aggregates(values, columns, **aggregates_kwargs)
+    data_frame['value'] = data_frame[aggfunc]
+    return data_frame
+
+
+def run_job(arguments):
+    function, index, kwargs = arguments
+    return index, function(current_jobs[index], **kwargs)
+
+
+def run_jobs(jobs, function = None, processes = None, **kwargs):
+    """
+    Exécute les tâches sur un pool de processus et renvoie les couples (tâche, table de résultats) au fur et à mesure
+    qu'elles se terminent : pandas.concat réunit les tables.
+
+    function(job, **kwargs) calcule la table d'une tâche, par défaut compute_job_pivot_tables. Elle doit être
+    définie au niveau d'un module, pour être transmise aux processus fils. Chaque table reçoit les colonnes job
+    (rang de la tâche) et celles de job_label_keys. Chaque processus fils ne traite qu'une tâche, pour rendre au
+    système la mémoire de ses données d'enquête.
+    """
+    if function is None:
+        function = compute_job_pivot_tables
+    jobs = list(jobs)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = max(1, min(processes, len(jobs)))
+
+    # Warm up the tax and benefit system in the main process, so that the forked workers inherit it.
+    get_tax_benefit_system()
+
+    global current_jobs
+    previous_jobs = current_jobs
+    current_jobs = jobs
+    tasks = [
+        (function, index, kwargs)
+        for index in range(len(jobs))
+        ]
+    if processes == 1:
+        results = (run_job(task) for task in tasks)
+        pool = None
+    else:
+        log.info(u'Running {} jobs on {} processes'.format(len(jobs), processes))
+        pool = multiprocessing.Pool(processes, maxtasksperchild = 1)
+        results = pool.imap_unordered(run_job, tasks)
+    try:
+        for index, data_frame in results:
+            job = jobs[index]
+            label_by_key = dict((key, job.get(key)) for key in job_label_keys)
+            if label_by_key.get('data_year') is None:
+                label_by_key['data_year'] = job.get('year')
+            if label_by_key.get('reform') is not None:
+                label_by_key['reform'] = label_by_key['reform'].full_key
+            label_by_key['job'] = index
+            for position, key in enumerate(('job',) + job_label_keys):
+                data_frame.insert(position, key, label_by_key[key])
+            yield job, data_frame
+    finally:
+        current_jobs = previous_jobs
+        if pool is not None:
+            pool.terminate()
+            pool.join()
@@ -0,0 +1,69 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Build a synthetic input table similar to the Budget des Familles one, and store it in the
+openfisca_indirect_taxation_synthetic survey collection, or in a CSV file.
+
+The Budget des Familles collection is never modified: set OPENFISCA_INDIRECT_TAXATION_INPUT_COLLECTION to
+openfisca_indirect_taxation_synthetic to run the survey scenarios on the synthetic table.
+"""
+
+
+import argparse
+import logging
+import sys
+
+from openfisca_france_indirect_taxation.synthetic import build_synthetic_input_data_frame, write_synthetic_survey
+
+
+log = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('-c', '--config-files-directory',
+        help = 'directory of the survey manager configuration (default: the user one)')
+    parser.add_argument('-n', '--households', default = 10000, type = int, help = 'number of households')
+    parser.add_argument('-o', '--output', help = 'path of a CSV file to write instead of the survey collection')
+    parser.add_argument('-s', '--seed', default = 0, type = int, help = 'seed of the random draws')
+    parser.add_argument('-v', '--verbose', action = 'store_true', default = False, help = "increase output verbosity")
+    parser.add_argument('-y', '--year', default = 2011, type = int, help = 'year of the survey')
+    args = parser.parse_args()
+    logging.basicConfig(level = logging.DEBUG if args.verbose else logging.INFO, stream = sys.stdout)
+
+    data_frame = build_synthetic_input_data_frame(args.households, args.year, seed = args.seed)
+    if args.output is not None:
+        data_frame.to_csv(args.output, index = False)
+        log.info(u'Wrote {} synthetic households to {}'.format(len(data_frame), args.output))
+    else:
+        survey = write_synthetic_survey(data_frame, args.year, config_files_directory = args.config_files_directory)
+        log.info(u'Wrote {} synthetic households to {}'.format(len(data_frame), survey.hdf5_file_path))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Export the dependency graph of the variables for a year, as JSON or Graphviz (.dot) file."""
+
+
+import argparse
+import logging
+import sys
+
+from openfisca_france_indirect_taxation import get_tax_benefit_system
+from openfisca_france_indirect_taxation.dependencies import build_dependency_graph
+
+
+log = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('variables', nargs = '*',
+        help = 'variables whose dependencies are exported (default: every variable with a formula)')
+    parser.add_argument('-o', '--output', default = 'dependencies.json',
+        help = 'path of the graph file to write (.json or .dot)')
+    parser.add_argument('-v', '--verbose', action = 'store_true', default = False, help = "increase output verbosity")
+    parser.add_argument('-y', '--year', default = 2011, type = int, help = 'year of the graph')
+    args = parser.parse_args()
+    logging.basicConfig(level = logging.DEBUG if args.verbose else logging.WARNING, stream = sys.stdout)
+
+    dependency_graph = build_dependency_graph(get_tax_benefit_system(), args.year, variables = args.variables or None)
+    dependency_graph.write(args.output)
+    log.info(u'Wrote {} variables ({} inputs) to {}'.format(
+        len(dependency_graph), len(dependency_graph.input_variables), args.output))
+    for variable, error in sorted(dependency_graph.error_by_variable.iteritems()):
+        log.warning(u'Dependencies of {} are incomplete: {}'.format(variable, error))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
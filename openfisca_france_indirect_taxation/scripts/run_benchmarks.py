@@ -0,0 +1,98 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Run the performance benchmarks on synthetic households and write a JSON report, compared to a previous one."""
+
+
+import argparse
+import json
+import logging
+import sys
+
+from openfisca_france_indirect_taxation.benchmarks import (
+    benchmark_variables,
+    compare_reports,
+    default_sizes,
+    run_benchmarks,
+    )
+
+
+log = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('-b', '--benchmark', action = 'append', dest = 'names',
+        help = 'name of a benchmark to run (tax_benefit_system, calculate:ticpe_totale...), can be repeated '
+            '(default: all)')
+    parser.add_argument('-c', '--compare', help = 'path of a previous JSON report to compare with')
+    parser.add_argument('-o', '--output', default = 'benchmarks.json', help = 'path of the JSON report to write')
+    parser.add_argument('-r', '--repeat', default = 3, type = int, help = 'number of runs of each benchmark')
+    parser.add_argument('-s', '--size', action = 'append', dest = 'sizes', type = int,
+        help = 'number of synthetic households, can be repeated (default: {})'.format(
+            ' '.join(str(size) for size in default_sizes)))
+    parser.add_argument('-t', '--threshold', default = .1, type = float,
+        help = 'relative slowdown above which a benchmark is reported as a regression')
+    parser.add_argument('--variable', action = 'append', dest = 'variables',
+        help = 'variable whose calculation is benchmarked, can be repeated (default: {})'.format(
+            ' '.join(benchmark_variables)))
+    parser.add_argument('-v', '--verbose', action = 'store_true', default = False, help = "increase output verbosity")
+    parser.add_argument('-y', '--year', default = 2011, type = int, help = 'year of the simulations')
+    args = parser.parse_args()
+    logging.basicConfig(level = logging.DEBUG if args.verbose else logging.INFO, stream = sys.stdout)
+
+    report = run_benchmarks(
+        names = args.names,
+        repeat = args.repeat,
+        sizes = args.sizes or default_sizes,
+        variables = args.variables or benchmark_variables,
+        year = args.year,
+        )
+    with open(args.output, 'w') as report_file:
+        json.dump(report, report_file, indent = 2)
+    log.info(u'Wrote benchmarks report to {}'.format(args.output))
+
+    if args.compare is None:
+        return 0
+    with open(args.compare) as reference_report_file:
+        reference_report = json.load(reference_report_file)
+    comparisons = compare_reports(reference_report, report, threshold = args.threshold)
+    for comparison in comparisons:
+        log.log(
+            logging.WARNING if comparison['regression'] else logging.INFO,
+            u'{} ({} households): {:.3f} s -> {:.3f} s ({})'.format(
+                comparison['name'],
+                comparison['households'],
+                comparison['reference_best'],
+                comparison['best'],
+                u'x{:.2f}'.format(comparison['ratio']) if comparison['ratio'] is not None else u'n/a',
+                ),
+            )
+    return 1 if any(comparison['regression'] for comparison in comparisons) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,50 +23,227 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 
+import collections
+import hashlib
+import json
 import logging
+import os
 
+import numpy
 
-from openfisca_survey_manager.survey_collections import SurveyCollection
+from openfisca_core import periods
 from openfisca_survey_manager.scenarios import AbstractSurveyScenario
-from openfisca_france_indirect_taxation.tests import base
+from openfisca_france_indirect_taxation import get_tax_benefit_system
+from openfisca_france_indirect_taxation.utils import get_hdf_columns, read_hdf_columns
 
 
 log = logging.getLogger(__name__)
 
+# Survey collection of the input tables: the Budget des Familles one built by build_survey_data.run_all, or the one
+# given by this environment variable, as synthetic_input_collection written by synthetic.write_synthetic_survey.
+input_collection_environment_variable = 'OPENFISCA_INDIRECT_TAXATION_INPUT_COLLECTION'
+default_input_collection = 'openfisca_indirect_taxation'
+synthetic_input_collection = 'openfisca_indirect_taxation_synthetic'
 
-def get_input_data_frame(year):
-    openfisca_survey_collection = SurveyCollection.load(collection = "openfisca_indirect_taxation")
-    openfisca_survey = openfisca_survey_collection.get_survey("openfisca_indirect_taxation_data_{}".format(year))
-    input_data_frame = openfisca_survey.get_values(table = "input")
+
+def align_elasticities(elasticities, ident_men):
+    """
+    Aligne les colonnes d'une table d'élasticités sur les ménages, par leur identifiant entier ident_men.
+
+    Renvoie le dict ordonné colonne -> tableau au niveau des ménages, sans copier la table d'entrée. Les ménages
+    absents de la table d'élasticités ont la valeur NaN.
+    """
+    assert 'ident_men' in elasticities.columns, "Elasticities must have an ident_men column"
+    keys = elasticities['ident_men'].values.astype(numpy.int64)
+    assert len(numpy.unique(keys)) == len(keys), "Some households have several elasticities"
+    household_keys = numpy.asarray(ident_men).astype(numpy.int64)
+    order = numpy.argsort(keys)
+    sorted_keys = keys[order]
+    positions = numpy.searchsorted(sorted_keys, household_keys).clip(0, max(len(keys) - 1, 0))
+    matched = sorted_keys[positions] == household_keys if len(keys) else numpy.zeros(len(household_keys), bool)
+    if not matched.all():
+        log.info(u'{} households have no elasticities'.format((~matched).sum()))
+    rows = order[positions]
+    array_by_column = collections.OrderedDict()
+    for column in elasticities.columns:
+        if column == 'ident_men':
+            continue
+        values = elasticities[column].values[rows].astype(numpy.float64)
+        values[~matched] = numpy.nan
+        array_by_column[column] = values
+    return array_by_column
+
+
+def check_chunkable_variables(variables, year, tax_benefit_systems):
+    """
+    Lève ValueError si des variables dépendent des poids de tous les ménages : calculées bloc par bloc, elles ne
+    porteraient que sur les ménages du bloc.
+    """
+    from openfisca_france_indirect_taxation.dependencies import get_population_wide_variables
+
+    population_wide_variables = set()
+    for tax_benefit_system in set(tax_benefit_systems):
+        population_wide_variables.update(get_population_wide_variables(tax_benefit_system, year, variables))
+    if population_wide_variables:
+        raise ValueError(
+            "Variables {} depend on the weights of every household and can't be computed by chunks: use "
+            "reductions.WeightedQuantileSketch and its partition method for population quantiles".format(
+                ', '.join(sorted(population_wide_variables))))
+
+
+def get_required_input_columns(data_year, year, variables, tax_benefit_systems):
+    """
+    Renvoie les colonnes de la table d'entrée nécessaires au calcul des variables données par chacun des systèmes
+    socio-fiscaux, plus les colonnes de structure.
+    """
+    from openfisca_france_indirect_taxation.dependencies import get_required_input_variables
+
+    available_variables = get_input_columns(data_year)
+    input_columns = set(['ident_men', 'pondmen', 'role_menage'])
+    for tax_benefit_system in set(tax_benefit_systems):
+        input_columns.update(get_required_input_variables(
+            tax_benefit_system, variables, year, available_variables = available_variables))
+    input_columns = sorted(input_columns.intersection(available_variables))
+    log.info(u'Loading {} input columns out of {}'.format(len(input_columns), len(available_variables)))
+    return input_columns
+
+
+def get_input_columns(year):
+    """Renvoie les noms (en minuscules) des colonnes de la table d'entrée, sans la lire."""
+    return [column.lower() for column in get_hdf_columns(get_input_survey(year).hdf5_file_path, 'input')]
+
+
+def get_input_data_hash(year):
+    """Renvoie l'empreinte du fichier HDF5 des données d'entrée de l'année : chemin, taille et date de modification."""
+    hdf5_file_path = get_input_survey(year).hdf5_file_path
+    hdf5_stat = os.stat(hdf5_file_path)
+    return hashlib.sha1(json.dumps(
+        [os.path.abspath(hdf5_file_path), hdf5_stat.st_size, hdf5_stat.st_mtime])).hexdigest()
+
+
+def get_input_data_frame(year, columns = None):
+    """
+    Renvoie la table d'entrée de l'année, réduite aux colonnes données (en minuscules) si columns n'est pas None :
+    seules ces colonnes sont alors lues sur le disque.
+    """
+    openfisca_survey = get_input_survey(year)
+    if columns is None:
+        input_data_frame = openfisca_survey.get_values(table = "input")
+    else:
+        stored_column_by_column = dict(
+            (column.lower(), column)
+            for column in get_hdf_columns(openfisca_survey.hdf5_file_path, 'input')
+            )
+        input_data_frame = read_hdf_columns(
+            openfisca_survey.hdf5_file_path,
+            'input',
+            [stored_column_by_column[column] for column in columns],
+            )
+        input_data_frame.columns = [column.lower() for column in input_data_frame.columns]
     input_data_frame.reset_index(inplace = True)
     return input_data_frame
 
 
+def set_elasticities(simulation, array_by_column):
+    """Donne aux holders des variables d'élasticité les valeurs alignées par align_elasticities."""
+    column_by_name = simulation.tax_benefit_system.column_by_name
+    for column_name, values in array_by_column.iteritems():
+        column = column_by_name.get(column_name)
+        if column is None:
+            continue
+        values = numpy.where(numpy.isnan(values), column.default, values).astype(column.dtype)
+        simulation.get_or_new_holder(column_name).set_input(simulation.period, values)
+
+
+def get_tax_benefit_systems(reference_tax_benefit_system = None, reform = None, tax_benefit_system = None):
+    """Renvoie le système socio-fiscal simulé et le système de référence d'un scénario."""
+    if reform is None:
+        assert reference_tax_benefit_system is None, "No need of reference_tax_benefit_system if no reform"
+        reference_tax_benefit_system = get_tax_benefit_system()
+    else:
+        tax_benefit_system = reform
+        reference_tax_benefit_system = get_tax_benefit_system()
+    return tax_benefit_system or reference_tax_benefit_system, reference_tax_benefit_system
+
+
+def get_input_collection():
+    """Renvoie le nom de la collection des tables d'entrée, $OPENFISCA_INDIRECT_TAXATION_INPUT_COLLECTION s'il est
+    défini, celle de l'enquête Budget des Familles sinon."""
+    return os.environ.get(input_collection_environment_variable) or default_input_collection
+
+
+def get_input_survey(year):
+    from openfisca_survey_manager.survey_collections import SurveyCollection
+    collection = get_input_collection()
+    openfisca_survey_collection = SurveyCollection.load(collection = collection)
+    return openfisca_survey_collection.get_survey(get_input_survey_name(collection, year))
+
+
+def get_input_survey_name(collection, year):
+    return "{}_data_{}".format(collection, year)
+
+
 class SurveyScenario(AbstractSurveyScenario):
+    elasticities_by_key = None  # Elasticities sets aligned on the households, by key
+    elasticities_hash_by_key = None
+    elasticities_key = None  # Key of the elasticities set of the simulations created without elasticities_key
+    input_array_by_variable = None  # Memory-mapped input arrays
+    postes_coicop_block = None
+    profiler = None  # profiling.VariableProfiler attached to the simulations created by new_simulation
+    result_cache = None
+    result_cache_items = None  # Items of the keys of the cached results, shared by every variable
+
+    def calculate(self, variable, period = None, reference = False):
+        """
+        Renvoie la valeur de la variable, lue dans le cache de résultats s'il est activé (voir create) ou calculée puis
+        mise en cache sinon.
+        """
+        simulation = self.reference_simulation if reference else self.simulation
+        assert simulation is not None
+        period = periods.period(period or simulation.period)
+        holder = simulation.get_or_new_holder(variable)
+        if self.result_cache is None or holder.column.is_input_variable():
+            return simulation.calculate(variable, period)
+        array = holder.get_array(period)
+        if array is not None:
+            return array
+        key = self.get_result_key(variable, period, reference = reference)
+        array = self.result_cache.get(key)
+        if array is None:
+            array = simulation.calculate(variable, period)
+            self.result_cache.set(key, array)
+        else:
+            holder.put_in_cache(array, period)
+        return array
+
     @classmethod
     def create(cls, calibration_kwargs = None, data_year = None, elasticities = None, inflation_kwargs = None,
-            reference_tax_benefit_system = None, reform = None, reform_key = None, tax_benefit_system = None,
+            memory_map = False, output_variables = None, postes_coicop_block = False, profiler = None,
+            reference_tax_benefit_system = None, reform = None, result_cache = None, tax_benefit_system = None,
             year = None):  # Add debug parameters debug, debug_all trace for simulation)
+        # When output_variables is given, only the input columns needed to compute these variables are loaded.
+        # When memory_map is True, the input variables are read-only maps of arrays shared by every process.
+        # elasticities is a data frame indexed by its ident_men column, or a dict key -> data frame of several
+        # elasticities sets (see new_simulation).
+        # result_cache is True or a result_cache.ResultCache, to read the results of the calculate method from disk.
+        # profiler is True or a profiling.VariableProfiler, to profile the calculations of the simulations.
         assert year is not None
         if data_year is None:
             data_year = year
 
-        assert not(
-            (reform is not None) and (reform_key is not None)
+        # Imported here to keep this module cheap to import: the model is only built when a scenario is created.
+        from openfisca_france_indirect_taxation.model.consommation.postes_coicop import (
+            build_postes_coicop_block,
+            set_postes_coicop_block,
             )
+        from openfisca_france_indirect_taxation.memory_mapped_inputs import get_input_arrays
+        from openfisca_france_indirect_taxation.precision import get_family_dtype
 
-        if reform_key is not None:
-            reform = base.get_cached_reform(
-                reform_key = reform_key,
-                tax_benefit_system = reference_tax_benefit_system or base.tax_benefit_system,
-                )
-
-        if reform is None:
-            assert reference_tax_benefit_system is None, "No need of reference_tax_benefit_system if no reform"
-            reference_tax_benefit_system = base.tax_benefit_system
-        else:
-            tax_benefit_system = reform
-            reference_tax_benefit_system = base.tax_benefit_system
+        tax_benefit_system, reference_tax_benefit_system = get_tax_benefit_systems(
+            reference_tax_benefit_system = reference_tax_benefit_system,
+            reform = reform,
+            tax_benefit_system = tax_benefit_system,
+            )
 
         if calibration_kwargs is not None:
             print calibration_kwargs
@@ -76,25 +253,84 @@ class SurveyScenario(AbstractSurveyScenario):
         if inflation_kwargs is not None:
             assert set(inflation_kwargs.keys()).issubset(set(['inflator_by_variable', 'target_by_variable']))
 
-        input_data_frame = get_input_data_frame(data_year)
-        if elasticities is not None:
-            assert 'ident_men' in elasticities.columns
-            print input_data_frame.ident_men.dtype
-            print elasticities.dtypes
-            input_data_frame['ident_men'] = input_data_frame.ident_men.astype(int)
-            input_data_frame = input_data_frame.merge(elasticities, how = "left", on = 'ident_men')
-            for col in elasticities.columns:
-                assert col in input_data_frame.columns
+        if output_variables is None:
+            input_columns = None
+        else:
+            required_variables = list(output_variables)
+            if calibration_kwargs is not None:
+                required_variables.extend(calibration_kwargs.get('target_margins_by_variable', dict()))
+            if inflation_kwargs is not None:
+                required_variables.extend(inflation_kwargs.get('inflator_by_variable', dict()))
+                required_variables.extend(inflation_kwargs.get('target_by_variable', dict()))
+            input_columns = get_required_input_columns(
+                data_year, year, required_variables, [tax_benefit_system, reference_tax_benefit_system])
+
+        if memory_map:
+            assert not postes_coicop_block, "Memory-mapped inputs can't be copied in a postes COICOP block"
+            # Only the structure columns go through the data frame, the other inputs are set after the simulations
+            # are created.
+            input_data_frame, input_array_by_variable = get_input_arrays(
+                data_year,
+                columns = input_columns,
+                tax_benefit_system = reference_tax_benefit_system,
+                )
+        else:
+            input_data_frame = get_input_data_frame(data_year, columns = input_columns)
+            input_array_by_variable = None
+        if elasticities is None:
+            elasticities_by_key = None
+        else:
+            if not isinstance(elasticities, dict):
+                elasticities = collections.OrderedDict([(None, elasticities)])
+            ident_men = input_data_frame['ident_men'].values[input_data_frame['role_menage'].values == 0]
+            elasticities_by_key = collections.OrderedDict(
+                (key, align_elasticities(elasticities[key], ident_men))
+                for key in (
+                    elasticities.keys() if isinstance(elasticities, collections.OrderedDict) else sorted(elasticities)
+                    )
+                )
+
+        if postes_coicop_block:
+            # Load every poste_coicop_* input in one contiguous block instead of one holder array per poste.
+            postes_coicop_block = build_postes_coicop_block(
+                input_data_frame,
+                dtype = get_family_dtype(reference_tax_benefit_system, 'postes_coicop'),
+                )
+            input_data_frame.drop(
+                ['poste_coicop_{}'.format(poste) for poste in postes_coicop_block.postes_coicop],
+                axis = 1,
+                inplace = True,
+                )
+        else:
+            postes_coicop_block = None
 
         survey_scenario = cls().init_from_data_frame(
             input_data_frame = input_data_frame,
-            tax_benefit_system = tax_benefit_system or reference_tax_benefit_system,
+            tax_benefit_system = tax_benefit_system,
             reference_tax_benefit_system = reference_tax_benefit_system,
             year = year,
             )
+        survey_scenario.input_array_by_variable = input_array_by_variable
+        survey_scenario.postes_coicop_block = postes_coicop_block
+        if profiler is not None:
+            from openfisca_france_indirect_taxation.profiling import VariableProfiler
+            survey_scenario.profiler = VariableProfiler() if profiler is True else profiler
+        if result_cache is not None:
+            from openfisca_france_indirect_taxation.result_cache import ResultCache
+            survey_scenario.result_cache = ResultCache() if result_cache is True else result_cache
+            survey_scenario.result_cache_items = dict(
+                calibration_kwargs = calibration_kwargs,
+                data_year = data_year,
+                inflation_kwargs = inflation_kwargs,
+                input_data_hash = get_input_data_hash(data_year),
+                reform = getattr(reform, 'full_key', None),
+                )
+        if elasticities_by_key is not None:
+            survey_scenario.elasticities_by_key = elasticities_by_key
+            survey_scenario.elasticities_key = elasticities_by_key.keys()[0]
 
-        survey_scenario.new_simulation()
-        if reform or reform_key:
+        simulation = survey_scenario.new_simulation()
+        if reform:
             survey_scenario.new_simulation(reference = True)
 
         if calibration_kwargs:
@@ -102,9 +338,205 @@ class SurveyScenario(AbstractSurveyScenario):
 
         if inflation_kwargs:
             survey_scenario.inflate(**inflation_kwargs)
+            if postes_coicop_block is not None:
+                # Inflated postes are new arrays: copy them back into the block.
+                set_postes_coicop_block(simulation, postes_coicop_block)
 
         return survey_scenario
 
+    def compute_aggregates(self, values, by, filter_by = None, period = None, reference = False):
+        """
+        Renvoie en une seule passe la table longue des agrégats pondérés (poids, effectif, somme, moyenne, part) des
+        variables de values par groupe des variables de by. Voir aggregates.compute_weighted_aggregates.
+        """
+        from openfisca_france_indirect_taxation.aggregates import compute_weighted_aggregates
+
+        simulation = self.reference_simulation if reference else self.simulation
+        assert simulation is not None
+        if self.result_cache is not None:
+            variables = [values] if isinstance(values, basestring) else list(values)
+            variables.extend([by] if isinstance(by, basestring) else by)
+            if filter_by is not None:
+                variables.append(filter_by)
+            self.load_cached_results(variables, period = period, reference = reference)
+        return compute_weighted_aggregates(
+            simulation,
+            values,
+            by,
+            filter_by = filter_by,
+            period = period,
+            weights_variable = self.weight_column_name_by_entity_key_plural['menages'],
+            )
+
+    def get_result_key(self, variable, period, reference = False):
+        from openfisca_france_indirect_taxation.result_cache import (
+            get_legislation_hash,
+            get_precision_hash,
+            get_registry_hash,
+            get_result_key,
+            get_variable_code_hash,
+            )
+
+        simulation = self.reference_simulation if reference else self.simulation
+        tax_benefit_system = simulation.tax_benefit_system
+        elasticities_key = getattr(simulation, 'elasticities_key', None)
+        if self.elasticities_by_key is None:
+            elasticities_hash = None
+        else:
+            if self.elasticities_hash_by_key is None:
+                self.elasticities_hash_by_key = dict()
+            elasticities_hash = self.elasticities_hash_by_key.get(elasticities_key)
+            if elasticities_hash is None:
+                sha1 = hashlib.sha1()
+                for column, array in sorted(self.elasticities_by_key[elasticities_key].iteritems()):
+                    sha1.update(column)
+                    sha1.update(numpy.ascontiguousarray(array).view(numpy.uint8))
+                elasticities_hash = self.elasticities_hash_by_key[elasticities_key] = sha1.hexdigest()
+        items = dict(self.result_cache_items or dict())
+        items.update(
+            code_hash = get_variable_code_hash(tax_benefit_system, variable, period),
+            elasticities_hash = elasticities_hash,
+            dtype = str(numpy.dtype(tax_benefit_system.column_by_name[variable].dtype)),
+            legislation_hash = get_legislation_hash(tax_benefit_system),
+            period = str(period),
+            precision_hash = get_precision_hash(tax_benefit_system),
+            registry_hash = get_registry_hash(),
+            variable = variable,
+            )
+        return get_result_key(**items)
+
+    @classmethod
+    def iter_chunks(cls, chunk_size = 100000, data_year = None, elasticities = None, inflator_by_variable = None,
+            input_arrays_directory = None, output_variables = None, reference_tax_benefit_system = None,
+            reform = None, tax_benefit_system = None, year = None):
+        """
+        Renvoie, bloc après bloc, les scénarios de blocs d'au plus chunk_size ménages, simulations créées.
+
+        Les entrées sont lues dans les tableaux projetés en mémoire de l'année (ou du répertoire
+        input_arrays_directory, écrit par memory_mapped_inputs.materialize_input_arrays) : seules les pages du bloc
+        courant sont chargées, la mémoire est donc bornée par la taille des blocs et non par celle de la population.
+        Chaque scénario doit être abandonné avant de passer au suivant. La calibration et l'inflation vers des
+        cibles, qui portent sur toute la population, ne sont pas possibles par blocs.
+
+        Pour la même raison, les variables qui lisent les poids des ménages (déciles de niveau de vie, de
+        dépenses..., voir dependencies.get_population_wide_variables) seraient calculées sur chaque bloc seulement :
+        ValueError est levée si output_variables en contient. Les quantiles de la population s'obtiennent par
+        reductions.WeightedQuantileSketch, puis sa méthode partition sur chaque bloc.
+        """
+        from openfisca_france_indirect_taxation.memory_mapped_inputs import (
+            get_input_arrays,
+            iter_household_chunks,
+            load_input_arrays,
+            )
+
+        assert year is not None
+        if data_year is None:
+            data_year = year
+        tax_benefit_system, reference_tax_benefit_system = get_tax_benefit_systems(
+            reference_tax_benefit_system = reference_tax_benefit_system,
+            reform = reform,
+            tax_benefit_system = tax_benefit_system,
+            )
+        with_reference = tax_benefit_system is not reference_tax_benefit_system
+        if output_variables is not None:
+            check_chunkable_variables(output_variables, year, [tax_benefit_system, reference_tax_benefit_system])
+
+        if output_variables is None or input_arrays_directory is not None:
+            input_columns = None
+        else:
+            input_columns = get_required_input_columns(
+                data_year,
+                year,
+                list(output_variables) + list(inflator_by_variable or []),
+                [tax_benefit_system, reference_tax_benefit_system],
+                )
+        if input_arrays_directory is None:
+            structure_data_frame, input_array_by_variable = get_input_arrays(
+                data_year,
+                columns = input_columns,
+                tax_benefit_system = reference_tax_benefit_system,
+                )
+        else:
+            structure_data_frame, input_array_by_variable = load_input_arrays(input_arrays_directory)
+
+        for chunk_structure_data_frame, chunk_input_array_by_variable in iter_household_chunks(
+                structure_data_frame, input_array_by_variable, chunk_size, reference_tax_benefit_system):
+            survey_scenario = cls().init_from_data_frame(
+                input_data_frame = chunk_structure_data_frame,
+                tax_benefit_system = tax_benefit_system,
+                reference_tax_benefit_system = reference_tax_benefit_system,
+                year = year,
+                )
+            survey_scenario.input_array_by_variable = chunk_input_array_by_variable
+            if elasticities is not None:
+                ident_men = chunk_structure_data_frame['ident_men'].values[
+                    chunk_structure_data_frame['role_menage'].values == 0]
+                survey_scenario.elasticities_by_key = collections.OrderedDict([
+                    (None, align_elasticities(elasticities, ident_men)),
+                    ])
+            survey_scenario.new_simulation()
+            if with_reference:
+                survey_scenario.new_simulation(reference = True)
+            if inflator_by_variable:
+                survey_scenario.inflate(inflator_by_variable = inflator_by_variable)
+            yield survey_scenario
+
+    def load_cached_results(self, variables, period = None, reference = False):
+        """
+        Met dans la simulation les résultats en cache des variables et calcule les autres : les méthodes qui
+        calculent directement sur la simulation (compute_pivot_table...) les trouvent alors déjà calculées.
+        """
+        for variable in variables:
+            self.calculate(variable, period = period, reference = reference)
+
+    def new_simulation(self, elasticities_key = None, **kwargs):
+        """
+        Crée une simulation et lui attache les tableaux partagés du scénario : entrées projetées en mémoire, bloc des
+        postes COICOP et jeu d'élasticités de clé elasticities_key (par défaut le premier jeu donné à create), ainsi
+        que le profileur du scénario.
+        """
+        from openfisca_france_indirect_taxation.model.consommation.postes_coicop import set_postes_coicop_block
+        from openfisca_france_indirect_taxation.memory_mapped_inputs import set_input_arrays
+
+        simulation = super(SurveyScenario, self).new_simulation(**kwargs)
+        if self.input_array_by_variable is not None:
+            set_input_arrays(simulation, self.input_array_by_variable,
+                used_as_input_variables = self.used_as_input_variables)
+        if self.elasticities_by_key is not None:
+            if elasticities_key is None:
+                elasticities_key = self.elasticities_key
+            set_elasticities(simulation, self.elasticities_by_key[elasticities_key])
+            simulation.elasticities_key = elasticities_key
+        if self.postes_coicop_block is not None:
+            set_postes_coicop_block(simulation, self.postes_coicop_block)
+        if self.profiler is not None:
+            self.profiler.attach(simulation)
+        return simulation
+
+    @classmethod
+    def stream(cls, reductions, chunk_callback = None, output_variables = None, **kwargs):
+        """
+        Met à jour les réductions fusionnables données (voir le module reductions) bloc de ménages par bloc de
+        ménages, et les renvoie.
+
+        Chaque réduction reçoit les valeurs de sa variable dans le bloc, pondérées par pondmen, calculées par la
+        simulation de référence si son attribut reference est vrai. chunk_callback, s'il est donné, reçoit le
+        scénario de chaque bloc, pour écrire ses sorties par exemple : il ne doit pas calculer de variables qui lisent
+        les poids des ménages, calculées sur le bloc seulement (voir iter_chunks). Les autres arguments sont ceux de
+        iter_chunks.
+        """
+        output_variables = sorted(set(output_variables or []).union(reduction.variable for reduction in reductions))
+        for survey_scenario in cls.iter_chunks(output_variables = output_variables, **kwargs):
+            for reduction in reductions:
+                if reduction.reference and survey_scenario.reference_simulation is not None:
+                    simulation = survey_scenario.reference_simulation
+                else:
+                    simulation = survey_scenario.simulation
+                reduction.update(simulation.calculate(reduction.variable), simulation.calculate('pondmen'))
+            if chunk_callback is not None:
+                chunk_callback(survey_scenario)
+        return reductions
+
     def initialize_weights(self):
         self.weight_column_name_by_entity_key_plural['menages'] = 'pondmen'
         # self.weight_column_name_by_entity__key_plural['individus'] = 'weight_ind'
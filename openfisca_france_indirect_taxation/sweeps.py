@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Évaluation vectorisée de plusieurs variantes de taux de taxes indirectes sur une même simulation."""
+
+
+from __future__ import division
+
+import itertools
+
+import numpy
+
+from openfisca_core import periods
+
+from .model.base import get_legislation_snapshot, LegislationSnapshot
+from .model.taxes_indirectes.taux_effectifs import build_coefficient_by_taxe, taxes_by_total
+
+
+# Parameters used to split depenses_carburants between diesel and essence: the expense bases of the taxes depend on
+# them, so they can't be swept.
+depenses_parameters_prefixes = ('parc_vp.', 'quantite_carbu_vp.')
+
+
+def build_variants_grid(values_by_path):
+    """
+    Construit la liste des variantes correspondant au produit cartésien des valeurs de chaque paramètre.
+
+    >>> build_variants_grid({'tva.taux_plein': [.196, .2]})
+    [{'tva.taux_plein': 0.196}, {'tva.taux_plein': 0.2}]
+    """
+    paths = sorted(values_by_path)
+    return [
+        dict(zip(paths, values))
+        for values in itertools.product(*[values_by_path[path] for path in paths])
+        ]
+
+
+def normalize_parameter_path(path):
+    prefix = 'imposition_indirecte.'
+    return path[len(prefix):] if path.startswith(prefix) else path
+
+
+def build_passage(coefficient_by_taxe):
+    """
+    Renvoie la liste triée des variables de dépenses servant d'assiette aux taxes et la matrice (taxes x dépenses)
+    qui somme chaque taxe sur son assiette.
+    """
+    depenses_variables = sorted(set(depenses_variable for depenses_variable, _ in coefficient_by_taxe.itervalues()))
+    passage = numpy.zeros((len(coefficient_by_taxe), len(depenses_variables)), dtype = numpy.float64)
+    for index, (depenses_variable, _) in enumerate(coefficient_by_taxe.itervalues()):
+        passage[index, depenses_variables.index(depenses_variable)] = 1
+    return depenses_variables, passage
+
+
+def build_taxes_selection(variable, taxes):
+    """Renvoie l'indicatrice (float64) des taxes élémentaires dont la somme donne la variable."""
+    if variable in taxes_by_total:
+        selected_taxes = taxes_by_total[variable]
+    else:
+        assert variable in taxes or any(variable in total_taxes for total_taxes in taxes_by_total.itervalues()), \
+            "Unable to sweep variable {}".format(variable)
+        selected_taxes = (variable,)
+    return numpy.array([taxe in selected_taxes for taxe in taxes], dtype = numpy.float64)
+
+
+def build_variants_coefficients(simulation, variants, period):
+    """
+    Renvoie les coefficients des taxes de la législation de la période et la matrice (variantes x taxes) de leurs
+    coefficients pour chaque variante.
+    """
+    legislation = get_legislation_snapshot(simulation, period.start)
+    coefficient_by_taxe = build_coefficient_by_taxe(legislation)
+
+    legislations = []
+    for variant in variants:
+        parameter_by_path = dict(
+            (normalize_parameter_path(path), value)
+            for path, value in variant.iteritems()
+            )
+        for path in parameter_by_path:
+            if path.startswith(depenses_parameters_prefixes):
+                raise ValueError(u"Parameter {} modifies expenses and can't be swept".format(path).encode('utf-8'))
+            # Fail early on unknown parameters.
+            legislation.parameter(path)
+        legislations.append(LegislationSnapshot(simulation.legislation_at(period.start), parameter_by_path))
+
+    coefficients = numpy.array(
+        [
+            [coefficient for _, coefficient in build_coefficient_by_taxe(variant_legislation).itervalues()]
+            for variant_legislation in legislations
+            ],
+        dtype = numpy.float64,
+        ).reshape(len(legislations), len(coefficient_by_taxe))
+    return coefficient_by_taxe, coefficients
+
+
+def sweep(simulation, variants, period = None, variables = None):
+    """
+    Calcule des taxes indirectes pour plusieurs variantes de paramètres en une seule évaluation vectorisée.
+
+    Chaque variante est un dict chemin de paramètre -> valeur, par exemple {'tva.taux_plein': .2} (le préfixe
+    "imposition_indirecte." est facultatif). Les dépenses sont calculées une seule fois par la simulation, puis
+    toutes les variantes sont évaluées par un produit matriciel.
+
+    Renvoie un dict variable -> tableau float64 de forme (variantes, ménages). Les variables possibles sont les
+    taxes élémentaires (tva_taux_plein, diesel_ticpe...) et leurs totaux (tva_total, ticpe_totale,
+    taxes_indirectes_total...).
+    """
+    if period is None:
+        period = simulation.period
+    period = periods.period(period)
+    if variables is None:
+        variables = ['tva_total', 'ticpe_totale', 'taxes_indirectes_total']
+
+    coefficient_by_taxe, coefficients = build_variants_coefficients(simulation, variants, period)
+    taxes = coefficient_by_taxe.keys()
+    depenses_variables, passage = build_passage(coefficient_by_taxe)
+    depenses = numpy.array(
+        [simulation.calculate(depenses_variable, period) for depenses_variable in depenses_variables],
+        dtype = numpy.float64,
+        )
+
+    result_by_variable = dict()
+    for variable in variables:
+        selection = build_taxes_selection(variable, taxes)
+        result_by_variable[variable] = (coefficients * selection).dot(passage).dot(depenses)
+    return result_by_variable
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Populations synthétiques de ménages semblables à celles de l'enquête Budget des Familles, pour tester et mesurer le
+modèle sans les données confidentielles de l'enquête.
+
+Les ménages sont tirés avec remise parmi les ménages des marges fournies avec le paquet
+(assets/quaids/data_frame_energy_*.csv) : dépenses totales, parts budgétaires du carburant, de l'énergie du logement,
+de l'alimentation et du reste, véhicules et caractéristiques du ménage, ce qui conserve leur distribution jointe. Le
+budget de chaque groupe est ensuite réparti entre ses postes COICOP (liste de "Parametres fiscalite indirecte.csv")
+selon une loi de Dirichlet, avec des dépenses nulles sur une partie des postes comme dans l'enquête.
+"""
+
+
+from __future__ import division
+
+import collections
+import os
+
+import numpy
+import pandas
+
+from .utils import assets_directory, read_asset_table
+
+
+chunk_size = 100000  # Households generated at once, to bound the memory used by the random draws
+# Share of the households with no expense on a poste, for postes outside of the food and fuel groups.
+depenses_nulles_part = .3
+marginals_years = (2000, 2005, 2011)
+# Number of households in France, used to scale the weights of the synthetic populations.
+menages_france_count = 26500000
+postes_coicop_by_groupe = collections.OrderedDict([
+    # Groups of the QUAIDS estimation (almost_ideal_demand_system.aids_dataframe_builder_energy): w1 to w4.
+    ('carburants', ('722',)),
+    ('energie_logement', ('451', '4511', '452', '4522', '453', '454', '455', '4552')),
+    ('alimentation', ('111', '112', '113', '114', '115', '1151', '116', '117', '118', '1181', '119', '121', '122')),
+    ('autres', None),  # Every other poste
+    ])
+# Postes excluded from the total expenses of the marginals (taxes, transfers...): they stay empty.
+postes_coicop_exclus_prefixes = ('13', '99')
+# Disposable income over total expenses: savings rate of about 13 %.
+revenu_depenses_ratio_log_mean = numpy.log(1.15)
+revenu_depenses_ratio_log_std = .25
+# Household characteristics copied from the marginals.
+variables_menages = ('agepr', 'nenfants', 'situacj', 'situapr', 'typmen', 'vag', 'veh_diesel', 'veh_essence')
+# Number of adults by typmen: single person, single parent, couple without children, couple with children, other.
+nadultes_by_typmen = {1: 1, 2: 1, 3: 2, 4: 2, 5: 3}
+
+
+def build_synthetic_input_data_frame(menages_count, year, seed = 0):
+    """
+    Renvoie la table d'entrée d'une population synthétique de menages_count ménages pour l'année, au format de la
+    table "input" de la collection openfisca_indirect_taxation (voir build_survey_data.run_all) : une ligne par
+    ménage, identifiée par ident_men, avec pondmen, les véhicules, les caractéristiques du ménage, rev_disponible et
+    les dépenses poste_coicop_* de tous les postes de la nomenclature de l'année.
+
+    Le tirage est reproductible : la même graine donne la même population.
+    """
+    from .model.consommation.variables_registry import get_registry
+
+    marginals = get_marginals(year)
+    postes_coicop = sorted(set(str(poste) for poste, _ in get_registry()['nomenclature_by_year'][str(year)]))
+    index_by_groupe = build_index_by_groupe(postes_coicop)
+    random_state = numpy.random.RandomState(seed)
+    # Mean share of each poste in its group, common to every household.
+    parts_moyennes_by_groupe = dict(
+        (groupe, random_state.dirichlet(numpy.ones(len(index)) * 2))
+        for groupe, index in index_by_groupe.iteritems()
+        )
+
+    depenses = numpy.zeros((menages_count, len(postes_coicop)), dtype = numpy.float32)
+    column_by_name = collections.OrderedDict((name, numpy.empty(menages_count)) for name in variables_menages)
+    depenses_totales = numpy.empty(menages_count)
+    for start in xrange(0, menages_count, chunk_size):
+        stop = min(start + chunk_size, menages_count)
+        count = stop - start
+        rows = random_state.randint(0, len(marginals), count)
+        for name, values in column_by_name.iteritems():
+            values[start:stop] = marginals[name].values[rows]
+        # Jitter the total expenses so that households drawn from the same row differ.
+        depenses_totales[start:stop] = marginals['depenses_tot'].values[rows] * \
+            random_state.lognormal(0, .1, count)
+        for groupe_index, (groupe, index) in enumerate(index_by_groupe.iteritems()):
+            # A few shares of the marginals are slightly negative.
+            parts_groupe = numpy.clip(marginals['w{}'.format(groupe_index + 1)].values[rows], 0, None)
+            budget = depenses_totales[start:stop] * parts_groupe
+            if len(index) == 1:
+                depenses[start:stop, index[0]] = budget
+                continue
+            # Dirichlet draws, as normalized gamma draws.
+            parts = random_state.gamma(parts_moyennes_by_groupe[groupe] * len(index), size = (count, len(index)))
+            if groupe == 'autres':
+                parts[random_state.uniform(size = parts.shape) < depenses_nulles_part] = 0
+            sommes = parts.sum(axis = 1)
+            sommes[sommes == 0] = 1
+            depenses[start:stop, index] = parts * (budget / sommes)[:, None]
+
+    data_frame = pandas.DataFrame(collections.OrderedDict([
+        ('ident_men', numpy.arange(1, menages_count + 1).astype(str)),
+        # One person by household, the household reference person.
+        ('role_menage', numpy.zeros(menages_count, dtype = numpy.int16)),
+        ('pondmen', numpy.round(menages_france_count / menages_count * random_state.uniform(.5, 1.5, menages_count))),
+        ]))
+    for name, values in column_by_name.iteritems():
+        data_frame[name] = values
+    data_frame['nadultes'] = data_frame['typmen'].map(nadultes_by_typmen).fillna(2).values
+    data_frame['ocde10'] = 1 + .5 * (data_frame['nadultes'].values - 1) + .3 * data_frame['nenfants'].values
+    data_frame['veh_tot'] = data_frame['veh_diesel'].values + data_frame['veh_essence'].values
+    data_frame['pourcentage_vehicule_essence'] = numpy.where(
+        data_frame['veh_tot'].values > 0,
+        data_frame['veh_essence'].values / numpy.maximum(data_frame['veh_tot'].values, 1),
+        0,
+        )
+    data_frame['rev_disponible'] = depenses_totales * random_state.lognormal(
+        revenu_depenses_ratio_log_mean, revenu_depenses_ratio_log_std, menages_count)
+    for index, poste in enumerate(postes_coicop):
+        data_frame['poste_coicop_{}'.format(poste)] = depenses[:, index]
+    return data_frame
+
+
+def build_index_by_groupe(postes_coicop):
+    """Renvoie les indices, dans la liste des postes, des postes de chaque groupe des marges."""
+    index_by_groupe = collections.OrderedDict()
+    groupe_postes = set()
+    for groupe, postes in postes_coicop_by_groupe.iteritems():
+        if postes is None:
+            postes = [
+                poste
+                for poste in postes_coicop
+                if poste not in groupe_postes and not poste.startswith(postes_coicop_exclus_prefixes)
+                ]
+        index_by_groupe[groupe] = numpy.array([
+            index
+            for index, poste in enumerate(postes_coicop)
+            if poste in postes
+            ])
+        assert len(index_by_groupe[groupe]) > 0, "No poste of group {} in the nomenclature".format(groupe)
+        groupe_postes.update(postes)
+    return index_by_groupe
+
+
+def get_marginals(year):
+    """Renvoie les ménages des marges de l'année disponible la plus proche (la plus récente antérieure si possible)."""
+    anterior_years = [marginals_year for marginals_year in marginals_years if marginals_year <= year]
+    marginals_year = max(anterior_years) if anterior_years else min(marginals_years)
+    marginals = read_asset_table(
+        os.path.join(assets_directory, 'quaids', 'data_frame_energy_{}.csv'.format(marginals_year)))
+    return marginals.dropna(subset = ['depenses_tot', 'w1', 'w2', 'w3', 'w4'] + list(variables_menages))
+
+
+def new_synthetic_simulation(tax_benefit_system, input_data_frame, year):
+    """
+    Crée une simulation de l'année à partir d'une table d'entrée d'une personne par ménage, sans passer par le survey
+    manager.
+    """
+    from openfisca_core import periods
+
+    period = periods.period(year)
+    column_by_name = tax_benefit_system.column_by_name
+    input_variables = dict(
+        (name, {period: serie.values.astype(column_by_name[name].dtype)})
+        for name, serie in input_data_frame.iteritems()
+        if name in column_by_name and name != 'ident_men'
+        )
+    # ident_men is the index of the household of each person.
+    input_variables['ident_men'] = {
+        period: numpy.arange(len(input_data_frame), dtype = column_by_name['ident_men'].dtype),
+        }
+    scenario = tax_benefit_system.new_scenario()
+    scenario.period = period
+    scenario.input_variables = input_variables
+    return scenario.new_simulation()
+
+
+def write_synthetic_survey(data_frame, year, config_files_directory = None):
+    """
+    Écrit la table d'entrée synthétique comme table "input" de l'enquête <collection>_data_<year> de la collection
+    surveys.synthetic_input_collection, distincte de celle de l'enquête Budget des Familles écrite par
+    build_survey_data.run_all, qui n'est donc jamais remplacée.
+
+    surveys.get_input_data_frame et SurveyScenario.create la lisent ensuite comme les données de l'enquête si
+    $OPENFISCA_INDIRECT_TAXATION_INPUT_COLLECTION vaut openfisca_indirect_taxation_synthetic.
+    """
+    from openfisca_survey_manager.survey_collections import SurveyCollection
+    from openfisca_survey_manager.surveys import Survey
+
+    from .surveys import get_input_survey_name, synthetic_input_collection
+
+    if config_files_directory is None:
+        from openfisca_survey_manager import default_config_files_directory as config_files_directory
+    try:
+        openfisca_survey_collection = SurveyCollection.load(
+            collection = synthetic_input_collection, config_files_directory = config_files_directory)
+    except Exception:
+        openfisca_survey_collection = SurveyCollection(
+            name = synthetic_input_collection, config_files_directory = config_files_directory)
+
+    output_data_directory = openfisca_survey_collection.config.get('data', 'output_directory')
+    survey_name = get_input_survey_name(synthetic_input_collection, year)
+    survey = Survey(
+        name = survey_name,
+        hdf5_file_path = os.path.join(output_data_directory, "{}.h5".format(survey_name)),
+        )
+    survey.insert_table(name = 'input', data_frame = data_frame)
+    openfisca_survey_collection.surveys = [
+        other_survey
+        for other_survey in openfisca_survey_collection.surveys
+        if other_survey.name != survey_name
+        ] + [survey]
+    openfisca_survey_collection.dump()
+    return survey
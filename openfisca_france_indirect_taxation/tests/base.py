@@ -23,18 +23,43 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import datetime
+
 from openfisca_core.tools import assert_near
 
-from .. import init_country
+from .. import get_tax_benefit_system
 
 
 __all__ = [
     'assert_near',
+    'depenses_by_poste',
+    'new_simulation',
     'tax_benefit_system',
     'TaxBenefitSystem',
     ]
 
 
-TaxBenefitSystem = init_country()
-tax_benefit_system = TaxBenefitSystem()
-tax_benefit_system.prefill_cache()
+# Expenses of a household on postes of every kind of tax: VAT, fuel, alcohol, tobacco and insurance.
+depenses_by_poste = dict(
+    poste_coicop_111 = 200,
+    poste_coicop_211 = 30,
+    poste_coicop_611 = 100,
+    poste_coicop_722 = 500,
+    poste_coicop_1151 = 300,
+    poste_coicop_1254 = 80,
+    poste_coicop_2201 = 60,
+    )
+tax_benefit_system = get_tax_benefit_system()
+TaxBenefitSystem = tax_benefit_system.__class__
+
+
+def new_simulation(year, menage = None, axes = None, debug = False):
+    """Crée la simulation d'un ménage d'une personne de 40 ans, ou d'une série de ménages le long des axes donnés."""
+    return tax_benefit_system.new_scenario().init_single_entity(
+        axes = axes,
+        period = year,
+        personne_de_reference = dict(
+            birth = datetime.date(year - 40, 1, 1),
+            ),
+        menage = menage,
+        ).new_simulation(debug = debug)
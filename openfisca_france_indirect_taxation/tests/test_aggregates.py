@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from __future__ import division
+
+
+import numpy
+import pandas
+
+from openfisca_core import periods
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation.aggregates import compute_weighted_aggregates
+from openfisca_france_indirect_taxation.tests import base
+
+
+def new_simulation(year = 2011, count = 40):
+    simulation = base.new_simulation(
+        year,
+        axes = [dict(count = count, max = 4000, min = 100, name = 'poste_coicop_111')],
+        menage = dict(poste_coicop_611 = 200),
+        )
+    pondmen = numpy.arange(1, count + 1, dtype = numpy.float32)
+    simulation.get_or_new_holder('pondmen').set_input(simulation.period, pondmen)
+    simulation.get_or_new_holder('strate').set_input(simulation.period, numpy.arange(count, dtype = numpy.float32) % 3)
+    return simulation
+
+
+def test_compute_weighted_aggregates():
+    simulation = new_simulation()
+    values = ['tva_total', 'depenses_totales']
+    by = ['depenses_totales_decile', 'strate']
+    data_frame = compute_weighted_aggregates(simulation, values, by)
+
+    menages = pandas.DataFrame(dict(
+        (variable, simulation.calculate(variable))
+        for variable in values + by + ['pondmen']
+        ))
+    assert len(data_frame) == len(values) * len(menages.groupby(by))
+    for variable in values:
+        menages['weighted'] = menages[variable].astype(numpy.float64) * menages['pondmen']
+        expected = menages.groupby(by).agg(dict(pondmen = 'sum', weighted = 'sum', tva_total = 'count'))
+        result = data_frame[data_frame['variable'] == variable].set_index(by).loc[expected.index]
+        assert_near(result['weight'].values, expected['pondmen'].values, absolute_error_margin = 1e-6)
+        assert (result['count'].values == expected['tva_total'].values).all()
+        assert_near(result['sum'].values, expected['weighted'].values, relative_error_margin = 1e-9)
+        assert_near(result['mean'].values, expected['weighted'].values / expected['pondmen'].values,
+            relative_error_margin = 1e-9)
+        assert_near(result['share'].sum(), 1, absolute_error_margin = 1e-9)
+
+
+def test_compute_weighted_aggregates_filter_by():
+    simulation = new_simulation()
+    data_frame = compute_weighted_aggregates(simulation, 'tva_total', [], filter_by = 'strate')
+    assert len(data_frame) == 1
+    strate = simulation.calculate('strate') != 0
+    pondmen = simulation.calculate('pondmen')
+    assert data_frame['count'][0] == strate.sum()
+    assert_near(data_frame['weight'][0], pondmen[strate].sum(), absolute_error_margin = 1e-6)
+    assert_near(
+        data_frame['mean'][0],
+        numpy.average(simulation.calculate('tva_total')[strate], weights = pondmen[strate]),
+        relative_error_margin = 1e-6,
+        )
+
+
+def test_compute_weighted_aggregates_empty():
+    simulation = new_simulation()
+    data_frame = compute_weighted_aggregates(simulation, ['tva_total'], ['strate'], filter_by = 'poste_coicop_952')
+    assert len(data_frame) == 0
+    assert list(data_frame.columns) == ['strate', 'variable', 'weight', 'count', 'sum', 'mean', 'share']
+
+
+def test_compute_weighted_aggregates_as_pivot_table():
+    # Same computation as AbstractSurveyScenario.compute_pivot_table, which sums the variables over the period.
+    simulation = new_simulation()
+    period = periods.period(2011)
+    data_frame = compute_weighted_aggregates(simulation, 'tva_total', ['strate'], period = period)
+    menages = pandas.DataFrame(dict(
+        (variable, simulation.calculate_add(variable, period = period))
+        for variable in ['pondmen', 'strate', 'tva_total']
+        ))
+    menages['tva_total'] = menages['tva_total'] * menages['pondmen']
+    pivot_sum = menages.pivot_table(columns = ['strate'], values = ['tva_total'], aggfunc = 'sum')
+    pivot_mass = menages.pivot_table(columns = ['strate'], values = 'pondmen', aggfunc = 'sum')
+    data_frame = data_frame.set_index('strate')
+    assert_near(data_frame['sum'].values, pivot_sum.values.ravel(), relative_error_margin = 1e-6)
+    assert_near(data_frame['mean'].values, (pivot_sum / pivot_mass).values.ravel(), relative_error_margin = 1e-6)
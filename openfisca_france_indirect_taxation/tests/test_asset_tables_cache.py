@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import glob
+import os
+import shutil
+import tempfile
+
+import numpy
+import pandas
+from pandas.util.testing import assert_frame_equal
+
+from openfisca_france_indirect_taxation import utils
+
+
+def test_asset_tables_cache():
+    cache_directory = tempfile.mkdtemp()
+    previous_cache_directory = os.environ.get('OPENFISCA_INDIRECT_TAXATION_CACHE_DIR')
+    os.environ['OPENFISCA_INDIRECT_TAXATION_CACHE_DIR'] = cache_directory
+    try:
+        csv_file_path = os.path.join(cache_directory, 'table.csv')
+        with open(csv_file_path, 'w') as csv_file:
+            csv_file.write('annee,posteCOICOP,description,taux\n')
+            csv_file.write('1994,111,Pain,.055\n1995,111,,.055\n1995,7221,Gazole,1\n')
+        data_frame = utils.read_asset_table(csv_file_path)
+        assert_frame_equal(data_frame, pandas.read_csv(csv_file_path))
+        assert len(glob.glob(os.path.join(cache_directory, 'assets', 'table-*.pickle'))) == 1
+
+        # Warm start: typed columns are read from the cache.
+        cached_data_frame = utils.read_asset_table(csv_file_path)
+        assert_frame_equal(cached_data_frame, data_frame)
+        columns, array_by_key = utils.data_frame_to_columns(data_frame)
+        assert [column['kind'] for column in columns] == ['integer', 'integer', 'categorical', 'array']
+        assert array_by_key['column_1'].dtype == numpy.int16
+        assert list(array_by_key['column_2']) == [0, -1, 1]
+
+        # Same content, new modification time: the cache is still used.
+        os.utime(csv_file_path, (0, 0))
+        assert_frame_equal(utils.read_asset_table(csv_file_path), data_frame)
+
+        # New content: the cache is rebuilt.
+        with open(csv_file_path, 'a') as csv_file:
+            csv_file.write('1996,111,Pain,.055\n')
+        assert len(utils.read_asset_table(csv_file_path)) == 4
+
+        # Tables with a non default index are read from their source, without cache.
+        indexed_csv_file_path = os.path.join(cache_directory, 'indexed_table.csv')
+        shutil.copy(csv_file_path, indexed_csv_file_path)
+        for _ in range(2):
+            assert_frame_equal(
+                utils.read_asset_table(indexed_csv_file_path, index_col = 1),
+                pandas.read_csv(indexed_csv_file_path, index_col = 1),
+                )
+        assert not glob.glob(os.path.join(cache_directory, 'assets', 'indexed_table-*.pickle'))
+    finally:
+        if previous_cache_directory is None:
+            del os.environ['OPENFISCA_INDIRECT_TAXATION_CACHE_DIR']
+        else:
+            os.environ['OPENFISCA_INDIRECT_TAXATION_CACHE_DIR'] = previous_cache_directory
+        shutil.rmtree(cache_directory)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import json
+
+from openfisca_france_indirect_taxation.benchmarks import compare_reports, run_benchmarks
+
+
+def test_run_benchmarks():
+    report = run_benchmarks(sizes = [50], repeat = 2, names = ['calculate:ticpe_totale'])
+    # Reports are JSON documents.
+    report = json.loads(json.dumps(report))
+    assert report['environment']['versions']['OpenFisca-Core'] is not None
+    [result] = report['results']
+    assert result['name'] == 'calculate:ticpe_totale'
+    assert result['households'] == 50
+    assert len(result['times']) == 2
+    assert result['best'] == min(result['times'])
+    assert result['peak_rss'] > 0
+
+    slower_report = json.loads(json.dumps(report))
+    slower_report['results'][0]['best'] *= 2
+    [comparison] = compare_reports(report, slower_report)
+    assert comparison['ratio'] == 2
+    assert comparison['regression']
+    [comparison] = compare_reports(slower_report, report)
+    assert not comparison['regression']
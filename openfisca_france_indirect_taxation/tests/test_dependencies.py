@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import collections
+import os
+import shutil
+import tempfile
+
+import numpy
+import pandas
+from nose.plugins.skip import SkipTest
+from pandas.util.testing import assert_frame_equal
+
+from openfisca_france_indirect_taxation.dependencies import (
+    build_dependency_graph,
+    DependencyGraph,
+    get_population_wide_variables,
+    get_required_input_variables,
+    record_dependencies,
+    )
+from openfisca_france_indirect_taxation import utils
+from openfisca_france_indirect_taxation.tests import base
+from openfisca_france_indirect_taxation.utils import get_hdf_columns, read_hdf_columns
+
+
+def test_record_dependencies():
+    dependencies_by_variable = record_dependencies(base.tax_benefit_system, ['depenses_carburants'], 2010)
+    assert dependencies_by_variable['depenses_carburants'] == set(['categorie_fiscale_14'])
+    # categorie_fiscale_14 is computed with every other categorie fiscale, but only depends on its own postes.
+    assert dependencies_by_variable['categorie_fiscale_14'] == set(['poste_coicop_722'])
+
+
+def test_population_wide_variables():
+    variables = ['depenses_totales_decile', 'niveau_vie_decile', 'pondmen', 'tva_total']
+    assert get_population_wide_variables(base.tax_benefit_system, 2011, variables) == set([
+        'depenses_totales_decile',
+        'niveau_vie_decile',
+        ])
+
+
+def test_required_input_variables():
+    assert get_required_input_variables(base.tax_benefit_system, ['ticpe_totale'], 2010) == set([
+        'poste_coicop_722',
+        'veh_diesel',
+        'veh_essence',
+        ])
+    # Available variables are read instead of being calculated.
+    assert get_required_input_variables(
+        base.tax_benefit_system,
+        ['ticpe_totale'],
+        2010,
+        available_variables = ['depenses_carburants', 'ident_men', 'poste_coicop_722', 'veh_diesel'],
+        ) == set(['depenses_carburants', 'veh_diesel'])
+
+
+def check_read_hdf_columns(format):
+    data_frame = pandas.DataFrame(collections.OrderedDict((
+        ('ident_men', numpy.arange(5)),
+        ('label', list('abcde')),
+        ('poste_coicop_111', numpy.linspace(0, 1, 5)),
+        ('poste_coicop_722', numpy.linspace(1, 2, 5)),
+        ('pondmen', numpy.linspace(1, 2, 5).astype(numpy.float32)),
+        ('veh_diesel', [True, False, True, False, True]),
+        ('birth', pandas.date_range('1970-01-01', periods = 5)),
+        )))
+    directory = tempfile.mkdtemp()
+    try:
+        hdf5_file_path = os.path.join(directory, 'survey.h5')
+        data_frame.to_hdf(hdf5_file_path, 'input', format = format)
+        assert get_hdf_columns(hdf5_file_path, 'input') == list(data_frame.columns)
+        columns = ['poste_coicop_722', 'label', 'birth', 'pondmen', 'ident_men', 'veh_diesel']
+        assert_frame_equal(read_hdf_columns(hdf5_file_path, 'input', columns), data_frame[columns])
+
+        if format == 'fixed':
+            # The block by block read is checked directly, as read_hdf_columns hides its failures.
+            store = pandas.HDFStore(hdf5_file_path, mode = 'r')
+            try:
+                assert_frame_equal(utils.read_fixed_format_columns(store.get_storer('input'), columns),
+                    data_frame[columns])
+            finally:
+                store.close()
+            # Tables with an unexpected layout are read entirely.
+            read_fixed_format_columns = utils.read_fixed_format_columns
+
+            def raise_value_error(storer, columns):
+                raise ValueError('Unexpected layout')
+
+            utils.read_fixed_format_columns = raise_value_error
+            try:
+                assert_frame_equal(read_hdf_columns(hdf5_file_path, 'input', columns), data_frame[columns])
+            finally:
+                utils.read_fixed_format_columns = read_fixed_format_columns
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_read_hdf_columns():
+    try:
+        import tables  # noqa
+    except ImportError:
+        raise SkipTest('PyTables is not installed')
+    for format in ('fixed', 'table'):
+        yield check_read_hdf_columns, format
+
+
+def test_dependency_graph():
+    dependency_graph = build_dependency_graph(base.tax_benefit_system, 2010, variables = ['ticpe_totale', 'tva_total'])
+    assert 'ticpe_totale' in dependency_graph
+    assert 'poste_coicop_722' in dependency_graph.ancestors('ticpe_totale')
+    assert 'ticpe_totale' in dependency_graph.descendants('poste_coicop_722')
+    assert 'tva_total' not in dependency_graph.descendants('veh_diesel')
+    assert 'veh_diesel' in dependency_graph.input_variables
+    assert all(not dependency_graph.dependencies_by_variable[variable] for variable in dependency_graph.input_variables)
+    topological_order = dependency_graph.topological_order()
+    position_by_variable = dict((variable, position) for position, variable in enumerate(topological_order))
+    for variable, dependencies in dependency_graph.dependencies_by_variable.iteritems():
+        assert all(position_by_variable[dependency] < position_by_variable[variable] for dependency in dependencies)
+    assert dependency_graph.cumulative_cost('ticpe_totale') >= dependency_graph.cost('ticpe_totale') > 0
+
+    directory = tempfile.mkdtemp()
+    try:
+        graph_file_path = os.path.join(directory, 'dependencies.json')
+        dependency_graph.write(graph_file_path)
+        loaded_dependency_graph = DependencyGraph.load(graph_file_path)
+        assert dict(loaded_dependency_graph.dependencies_by_variable) == dict(dependency_graph.dependencies_by_variable)
+        assert loaded_dependency_graph.topological_order() == topological_order
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_dependency_graph_does_not_depend_on_variables_order():
+    # taxes_indirectes_total may compute every tax in one go: the taxes listed after it must keep their dependencies.
+    dependency_graph = build_dependency_graph(base.tax_benefit_system, 2010,
+        variables = ['taxes_indirectes_total', 'tva_total', 'vin_droit_d_accise'])
+    for variable in ('tva_total', 'vin_droit_d_accise'):
+        ancestors = build_dependency_graph(base.tax_benefit_system, 2010, variables = [variable]).ancestors(variable)
+        assert ancestors
+        assert dependency_graph.ancestors(variable) == ancestors
+    assert 'tva_total' in dependency_graph.ancestors('taxes_indirectes_total')
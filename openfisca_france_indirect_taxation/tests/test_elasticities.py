@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import datetime
+
+import numpy
+import pandas
+
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation.surveys import align_elasticities, set_elasticities
+from openfisca_france_indirect_taxation.tests import base
+
+
+def test_align_elasticities():
+    elasticities = pandas.DataFrame(dict(
+        elas_exp_1 = [.3, .1, .2],
+        ident_men = numpy.array([30, 10, 20], dtype = numpy.float32),
+        year = 2011,
+        ))
+    array_by_column = align_elasticities(elasticities, [10, 20, 40, 30])
+    assert array_by_column.keys() == ['elas_exp_1', 'year']
+    assert_near(array_by_column['elas_exp_1'][[0, 1, 3]], [.1, .2, .3], 1e-6)
+    # Households without elasticities get NaN, like a left merge.
+    assert numpy.isnan(array_by_column['elas_exp_1'][2])
+
+
+def test_set_elasticities():
+    year = 2011
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        axes = [dict(count = 2, max = 2, min = 1, name = 'veh_diesel')],
+        period = year,
+        personne_de_reference = dict(birth = datetime.date(year - 40, 1, 1)),
+        ).new_simulation()
+    elasticities_by_key = dict(
+        (key, align_elasticities(pandas.DataFrame(dict(elas_exp_1 = [elasticity], ident_men = [1])), [1, 2]))
+        for key, elasticity in (('low', .5), ('high', 1.5))
+        )
+    set_elasticities(simulation, elasticities_by_key['high'])
+    # The second household has no elasticity: it gets the default value of the column.
+    assert_near(simulation.calculate('elas_exp_1'), [1.5, 0], 1e-6)
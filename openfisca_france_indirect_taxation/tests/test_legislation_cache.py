@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import glob
+import os
+import shutil
+import tempfile
+
+from numpy.testing import assert_equal
+
+from openfisca_france_indirect_taxation.param import legislation_cache
+from openfisca_france_indirect_taxation.tests import base
+
+
+def test_legislation_cache():
+    legislation_xml_file_path = base.TaxBenefitSystem.legislation_xml_file_path
+    preprocess_legislation = base.TaxBenefitSystem.preprocess_legislation
+    cache_directory = tempfile.mkdtemp()
+    previous_cache_directory = os.environ.get('OPENFISCA_INDIRECT_TAXATION_CACHE_DIR')
+    os.environ['OPENFISCA_INDIRECT_TAXATION_CACHE_DIR'] = cache_directory
+    try:
+        legislation_json = legislation_cache.load_legislation_json(legislation_xml_file_path, preprocess_legislation)
+        cache_file_paths = glob.glob(os.path.join(cache_directory, 'legislation-*.pickle'))
+        assert len(cache_file_paths) == 1
+        # Some preprocessed prices are NaN: compare with numpy, which considers NaN equal to NaN.
+        assert_equal(
+            legislation_json,
+            legislation_cache.build_legislation_json(legislation_xml_file_path, preprocess_legislation),
+            )
+
+        # Warm start: the XML isn't parsed anymore.
+        cached_legislation_json = legislation_cache.load_legislation_json(legislation_xml_file_path, None)
+        assert_equal(cached_legislation_json, legislation_json)
+        assert cached_legislation_json is not legislation_json
+    finally:
+        if previous_cache_directory is None:
+            del os.environ['OPENFISCA_INDIRECT_TAXATION_CACHE_DIR']
+        else:
+            os.environ['OPENFISCA_INDIRECT_TAXATION_CACHE_DIR'] = previous_cache_directory
+        shutil.rmtree(cache_directory)
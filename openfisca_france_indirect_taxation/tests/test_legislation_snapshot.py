@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from openfisca_core import periods
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation.model.base import get_legislation_snapshot, taux_implicite
+from openfisca_france_indirect_taxation.tests import base
+
+
+def test_legislation_snapshot():
+    instant = periods.instant(2010)
+    simulation = base.new_simulation(2010)
+    legislation_snapshot = get_legislation_snapshot(simulation, instant)
+    # Snapshots are shared by every simulation of the same tax-benefit system.
+    assert get_legislation_snapshot(base.new_simulation(2010), instant) is legislation_snapshot
+
+    imposition_indirecte = simulation.legislation_at(instant).imposition_indirecte
+    assert legislation_snapshot.taux_plein_tva == imposition_indirecte.tva.taux_plein
+    accise_diesel_ticpe = imposition_indirecte.ticpe.ticpe_gazole + \
+        imposition_indirecte.major_regionale_ticpe_gazole.alsace
+    assert_near(
+        legislation_snapshot.taux_implicite_diesel,
+        taux_implicite(accise_diesel_ticpe, imposition_indirecte.tva.taux_plein,
+            imposition_indirecte.prix_carburants.diesel_ttc),
+        1e-6,
+        )
+
+
+def test_legislation_snapshot_is_immutable():
+    legislation_snapshot = get_legislation_snapshot(base.new_simulation(2010), periods.instant(2010))
+    try:
+        legislation_snapshot.taux_plein_tva = 0
+    except AttributeError:
+        pass
+    else:
+        assert False, "LegislationSnapshot should be immutable"
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import datetime
+import os
+import shutil
+import tempfile
+
+import numpy
+import pandas
+
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation.memory_mapped_inputs import (
+    iter_household_chunks,
+    load_input_arrays,
+    materialize_input_arrays,
+    set_input_arrays,
+    )
+from openfisca_france_indirect_taxation.surveys import SurveyScenario
+from openfisca_france_indirect_taxation.synthetic import build_synthetic_input_data_frame
+from openfisca_france_indirect_taxation.tests import base
+
+
+def test_memory_mapped_inputs():
+    directory = os.path.join(tempfile.mkdtemp(), 'input_arrays')
+    try:
+        materialize_input_arrays(
+            pandas.DataFrame(dict(
+                age = [40, 10, 30, 50],
+                ident_men = [1, 1, 2, 3],
+                pondmen = [10, 10, 20, 30],
+                poste_coicop_722 = [1000, 0, numpy.nan, 500],
+                role_menage = [0, 2, 0, 0],
+                unknown_column = [0, 0, 0, 0],
+                )),
+            directory,
+            base.tax_benefit_system,
+            )
+        structure_data_frame, array_by_variable = load_input_arrays(directory)
+        assert list(structure_data_frame.columns) == ['ident_men', 'pondmen', 'role_menage']
+        assert sorted(array_by_variable) == ['age', 'poste_coicop_722']
+        # Households variables are stored at the households level, with NaN replaced by the default value.
+        assert list(array_by_variable['poste_coicop_722']) == [1000, 0, 500]
+        assert array_by_variable['poste_coicop_722'].dtype == numpy.float32
+        assert len(array_by_variable['age']) == 4
+        assert not array_by_variable['age'].flags.writeable
+
+        _, array_by_variable = load_input_arrays(directory, columns = ['poste_coicop_722'])
+        year = 2010
+        simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+            axes = [dict(count = 3, max = 3, min = 1, name = 'veh_diesel')],
+            period = year,
+            personne_de_reference = dict(birth = datetime.date(year - 40, 1, 1)),
+            ).new_simulation()
+        set_input_arrays(simulation, array_by_variable)
+        poste_coicop_722 = simulation.calculate('poste_coicop_722')
+        assert numpy.may_share_memory(poste_coicop_722, array_by_variable['poste_coicop_722'])
+        assert_near(simulation.calculate('depenses_carburants'), [1000, 0, 500], .01)
+    finally:
+        shutil.rmtree(os.path.dirname(directory))
+
+
+def test_iter_household_chunks():
+    # Individuals of a household are not necessarily contiguous.
+    structure_data_frame = pandas.DataFrame(dict(
+        ident_men = [5, 3, 5, 8, 1, 3, 8],
+        pondmen = [50, 30, 50, 80, 10, 30, 80],
+        role_menage = [0, 0, 2, 2, 0, 1, 0],
+        ))
+    array_by_variable = dict(
+        age = numpy.array([40, 30, 10, 5, 60, 35, 45]),
+        poste_coicop_722 = numpy.array([500, 300, 10, 100], dtype = numpy.float32),  # In the heads order
+        )
+    chunks = list(iter_household_chunks(structure_data_frame, array_by_variable, 2, base.tax_benefit_system))
+
+    assert len(chunks) == 2
+    (first_structure, first_arrays), (second_structure, second_arrays) = chunks
+    assert list(first_structure['ident_men']) == [5, 3, 5, 3]
+    assert list(first_arrays['age']) == [40, 30, 10, 35]
+    assert list(first_arrays['poste_coicop_722']) == [500, 300]
+    assert list(second_structure['ident_men']) == [8, 1, 8]
+    assert list(second_arrays['age']) == [5, 60, 45]
+    assert list(second_arrays['poste_coicop_722']) == [10, 100]
+
+
+def test_set_input_arrays_calculated_variables():
+    # Like the survey manager, set_input_arrays ignores the columns of the variables with a formula, as age.
+    age = numpy.array([99], dtype = base.tax_benefit_system.column_by_name['age'].dtype)
+    for used_as_input_variables, expected_age in ((None, 40), (['age'], 99)):
+        simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+            period = 2011,
+            personne_de_reference = dict(birth = datetime.date(1971, 1, 1)),
+            ).new_simulation()
+        set_input_arrays(simulation, dict(age = age), used_as_input_variables = used_as_input_variables)
+        assert list(simulation.calculate('age')) == [expected_age]
+
+
+def test_memory_mapped_inputs_like_data_frame_inputs():
+    year = 2011
+    input_data_frame = build_synthetic_input_data_frame(20, year)
+    # A survey column of a variable with a formula, computed by the survey manager instead of read.
+    input_data_frame['age'] = 99
+    directory = os.path.join(tempfile.mkdtemp(), 'input_arrays')
+    try:
+        materialize_input_arrays(input_data_frame, directory, base.tax_benefit_system)
+        structure_data_frame, input_array_by_variable = load_input_arrays(directory)
+        simulations = []
+        for data_frame, array_by_variable in (
+                (input_data_frame, None),
+                (structure_data_frame, input_array_by_variable),
+                ):
+            survey_scenario = SurveyScenario().init_from_data_frame(
+                input_data_frame = data_frame,
+                tax_benefit_system = base.tax_benefit_system,
+                reference_tax_benefit_system = base.tax_benefit_system,
+                year = year,
+                )
+            survey_scenario.input_array_by_variable = array_by_variable
+            simulations.append(survey_scenario.new_simulation())
+    finally:
+        shutil.rmtree(os.path.dirname(directory))
+
+    data_frame_simulation, memory_mapped_simulation = simulations
+    assert (memory_mapped_simulation.calculate('age') != 99).all()
+    for variable in ('age', 'poste_coicop_722', 'taxes_indirectes_total'):
+        assert_near(memory_mapped_simulation.calculate(variable), data_frame_simulation.calculate(variable), 0)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from nose.tools import raises
+
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation.dependencies import compute_methods_names
+from openfisca_france_indirect_taxation.parallel import calculate_in_parallel
+from openfisca_france_indirect_taxation.tests import base
+
+
+variables = ['taxes_indirectes_total', 'tva_total', 'ticpe_totale', 'depenses_totales_decile']
+
+
+axes = [dict(count = 50, max = 5000, min = 0, name = 'depenses_carburants')]
+menage = dict(
+    poste_coicop_111 = 300,
+    poste_coicop_611 = 200,
+    )
+
+
+def test_calculate_in_parallel():
+    simulation = base.new_simulation(2011, axes = axes, menage = menage)
+    expected_by_variable = dict(
+        (variable, simulation.calculate(variable))
+        for variable in variables
+        )
+
+    simulation = base.new_simulation(2011, axes = axes, menage = menage)
+    array_by_variable = calculate_in_parallel(simulation, variables, workers = 4)
+    for variable in variables:
+        # Totals may be summed in another order than by the sequential fast path.
+        assert_near(array_by_variable[variable], expected_by_variable[variable], relative_error_margin = 1e-6)
+    for method_name in compute_methods_names + ('get_or_new_holder',):
+        assert method_name not in simulation.__dict__
+
+
+def test_calculate_in_parallel_cached():
+    simulation = base.new_simulation(2011, axes = axes, menage = menage)
+    tva_total = simulation.calculate('tva_total')
+    assert calculate_in_parallel(simulation, ['tva_total'])['tva_total'] is tva_total
+
+
+@raises(AssertionError)
+def test_calculate_in_parallel_debug():
+    calculate_in_parallel(base.new_simulation(2011, axes = axes, debug = True, menage = menage), variables)
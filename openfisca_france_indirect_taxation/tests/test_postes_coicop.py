@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy
+from pandas import DataFrame
+
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation.model.consommation.postes_coicop import (
+    build_postes_coicop_block,
+    get_postes_coicop_block,
+    set_postes_coicop_block,
+    )
+from openfisca_france_indirect_taxation.tests import base
+
+
+def test_postes_coicop_block():
+    simulation = base.new_simulation(2010, debug = True)
+    postes_coicop_block = build_postes_coicop_block(DataFrame(dict(
+        poste_coicop_230 = [100],
+        poste_coicop_611 = [100],
+        poste_coicop_952 = [50],
+        )))
+    set_postes_coicop_block(simulation, postes_coicop_block)
+
+    assert get_postes_coicop_block(simulation) is postes_coicop_block
+    poste_coicop_611 = simulation.calculate('poste_coicop_611')
+    assert_near(poste_coicop_611, 100, 0)
+    assert numpy.may_share_memory(poste_coicop_611, postes_coicop_block.depenses)
+    assert_near(simulation.calculate('categorie_fiscale_0'), 100, .01)
+    assert_near(simulation.calculate('categorie_fiscale_1'), 150, .01)
+
+
+def test_postes_coicop_block_with_other_inputs():
+    # Postes absent from the block are still read from their own holders.
+    simulation = base.new_simulation(2010, menage = dict(poste_coicop_952 = 50), debug = True)
+    set_postes_coicop_block(simulation, build_postes_coicop_block(DataFrame(dict(poste_coicop_611 = [100]))))
+
+    assert_near(simulation.calculate('categorie_fiscale_1'), 150, .01)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy
+from pandas import DataFrame
+
+from openfisca_france_indirect_taxation.model.consommation.postes_coicop import (
+    build_postes_coicop_block,
+    set_postes_coicop_block,
+    )
+from openfisca_france_indirect_taxation.precision import (
+    get_dtype_by_variable,
+    get_family_dtype,
+    set_dtype_by_variable,
+    set_precision_policy,
+    )
+from openfisca_france_indirect_taxation.tests import base
+
+
+menage = dict(
+    # 2 ** 24 + 1 can't be represented in float32.
+    poste_coicop_611 = 2 ** 24,
+    poste_coicop_952 = 1,
+    )
+
+
+def test_default_precision():
+    dtype_by_variable = get_dtype_by_variable(base.tax_benefit_system)
+    assert set(dtype_by_variable.itervalues()) == set([numpy.dtype(numpy.float32)])
+    assert 'poste_coicop_611' in dtype_by_variable
+    assert 'categorie_fiscale_1' in dtype_by_variable
+    assert 'depenses_carburants' in dtype_by_variable
+    assert 'tva_total' in dtype_by_variable
+    assert 'rev_disponible' not in dtype_by_variable
+
+
+def test_precision_policy():
+    previous_dtype_by_variable = set_precision_policy(base.tax_benefit_system, dict(
+        categories_fiscales = 'float64',
+        postes_coicop = 'float64',
+        ))
+    try:
+        assert get_family_dtype(base.tax_benefit_system, 'postes_coicop') == numpy.float64
+        assert get_family_dtype(base.tax_benefit_system, 'taxes') == numpy.float32
+        simulation = base.new_simulation(2010, menage = menage)
+        categorie_fiscale_1 = simulation.calculate('categorie_fiscale_1')
+        assert categorie_fiscale_1.dtype == numpy.float64
+        # Accumulated and stored in float64.
+        assert categorie_fiscale_1[0] == 2 ** 24 + 1
+        assert simulation.calculate('tva_total').dtype == numpy.float32
+
+        simulation = base.new_simulation(2010, menage = menage)
+        postes_coicop_block = build_postes_coicop_block(
+            DataFrame(dict(poste_coicop_611 = [2 ** 24], poste_coicop_952 = [1])),
+            dtype = get_family_dtype(base.tax_benefit_system, 'postes_coicop'),
+            )
+        set_postes_coicop_block(simulation, postes_coicop_block)
+        assert numpy.may_share_memory(simulation.calculate('poste_coicop_611'), postes_coicop_block.depenses)
+        assert simulation.calculate('categorie_fiscale_1')[0] == 2 ** 24 + 1
+    finally:
+        set_dtype_by_variable(base.tax_benefit_system, previous_dtype_by_variable)
+    assert set(get_dtype_by_variable(base.tax_benefit_system).itervalues()) == set([numpy.dtype(numpy.float32)])
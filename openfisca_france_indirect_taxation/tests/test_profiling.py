@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import shutil
+import tempfile
+
+import pandas
+
+from openfisca_france_indirect_taxation.profiling import VariableProfiler
+from openfisca_france_indirect_taxation.synthetic import build_synthetic_input_data_frame, new_synthetic_simulation
+from openfisca_france_indirect_taxation.tests import base
+
+
+def test_variable_profiler():
+    simulation = new_synthetic_simulation(base.tax_benefit_system, build_synthetic_input_data_frame(100, 2011), 2011)
+    profiler = VariableProfiler()
+    profiler.attach(simulation)
+    simulation.calculate('taxes_indirectes_total')
+    simulation.calculate('taxes_indirectes_total')
+    profiler.detach(simulation)
+    simulation.calculate('tva_total')
+
+    data_frame = profiler.to_data_frame().set_index(['variable', 'period'])
+    taxes_indirectes_total = data_frame.loc[('taxes_indirectes_total', '2011')]
+    assert taxes_indirectes_total['calls'] == 2
+    assert taxes_indirectes_total['cache_hits'] == 1
+    assert taxes_indirectes_total['bytes'] == 100 * 4
+    assert taxes_indirectes_total['exclusive_time'] <= taxes_indirectes_total['inclusive_time']
+    # The root call includes the time of every other call.
+    assert taxes_indirectes_total['inclusive_time'] >= data_frame['exclusive_time'].sum() - 1e-6
+    # Input variables are always read from the cache.
+    assert (data_frame.loc[('poste_coicop_111', '2011'), ['calls', 'cache_hits']] > 0).all()
+    assert data_frame.loc[('poste_coicop_111', '2011'), 'bytes'] == 0
+    # tva_total was read after detach.
+    assert 'tva_total' not in data_frame.index.get_level_values('variable')
+
+    directory = tempfile.mkdtemp()
+    try:
+        table_file_path = os.path.join(directory, 'profile.csv')
+        profiler.write_table(table_file_path)
+        assert len(pandas.read_csv(table_file_path)) == len(data_frame)
+        stacks_file_path = os.path.join(directory, 'profile.stacks')
+        profiler.write_stacks(stacks_file_path)
+        with open(stacks_file_path) as stacks_file:
+            lines = stacks_file.read().splitlines()
+    finally:
+        shutil.rmtree(directory)
+    stacks = [line.rsplit(' ', 1)[0].split(';') for line in lines]
+    assert all(stack[0] == 'taxes_indirectes_total[2011]' for stack in stacks)
+    assert ['taxes_indirectes_total[2011]', 'depenses_diesel[2011]', 'depenses_carburants[2011]'] in stacks
+    assert all(int(line.rsplit(' ', 1)[1]) >= 0 for line in lines)
+
+    profiler.clear()
+    assert len(profiler.to_data_frame()) == 0
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import datetime
+
+import numpy
+
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation.model.quantiles import get_weighted_quantiles, WeightedQuantiles
+from openfisca_france_indirect_taxation.tests import base
+
+
+def test_weighted_quantiles():
+    weighted_quantiles = WeightedQuantiles(numpy.array([5., 1, 4, 2, 3]), numpy.array([1, 1, 1, 1, 2]))
+    assert_near(weighted_quantiles.cumulative_weights, [1, 2, 4, 5, 6], 0)
+    assert list(weighted_quantiles.partition(2)) == [2, 1, 2, 1, 2]
+    assert list(weighted_quantiles.partition(5)) == [5, 1, 4, 2, 3]
+    # The highest value belongs to the last quantile.
+    assert weighted_quantiles.partition(100)[0] == 100
+
+
+def test_quantiles_variables():
+    year = 2010
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        axes = [dict(count = 20, max = 39000, min = 1000, name = 'rev_disponible')],
+        period = year,
+        personne_de_reference = dict(birth = datetime.date(year - 40, 1, 1)),
+        ).new_simulation()
+
+    assert list(simulation.calculate('rev_disponible_decile')) == list(numpy.arange(20) // 2 + 1)
+    assert list(simulation.calculate('rev_disponible_vingtile')) == range(1, 21)
+    # Deciles, vingtiles and centiles share the same sort.
+    weighted_quantiles = get_weighted_quantiles(simulation, 'rev_disponible', year)
+    simulation.calculate('rev_disponible_centile')
+    assert get_weighted_quantiles(simulation, 'rev_disponible', year) is weighted_quantiles
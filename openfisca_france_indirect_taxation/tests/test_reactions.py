@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from __future__ import division
+
+
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation.model.base import get_legislation_snapshot
+from openfisca_france_indirect_taxation.reactions import sweep_reactions
+from openfisca_france_indirect_taxation.sweeps import build_variants_grid, sweep
+from openfisca_france_indirect_taxation.tests import base
+
+
+# Elasticity of the fuel expenses, read by the reactions.
+menage = dict(base.depenses_by_poste, carburants_elasticite_prix = -.4)
+
+
+def test_sweep_reactions_without_price_changes():
+    simulation = base.new_simulation(2010, menage = menage)
+    variables = ['tva_total', 'ticpe_totale', 'taxes_indirectes_total']
+    result_by_variable = sweep_reactions(
+        simulation,
+        [{}, {}],
+        elasticity_by_depenses = dict(depenses_essence = 'carburants_elasticite_prix'),
+        variants = [{}, {'tva.taux_plein': .25}],
+        variables = variables,
+        )
+    sweep_result_by_variable = sweep(simulation, [{}, {'tva.taux_plein': .25}], variables = variables)
+    assert sorted(result_by_variable) == sorted(variables)
+    for variable in variables:
+        assert result_by_variable[variable].shape == (2, 1)
+        assert_near(result_by_variable[variable][0], simulation.calculate(variable), .01)
+        assert_near(result_by_variable[variable], sweep_result_by_variable[variable], .01)
+
+
+def test_sweep_reactions_essence():
+    simulation = base.new_simulation(2010, menage = menage)
+    super_95_ttc = get_legislation_snapshot(simulation, simulation.period.start).prix_super_95_ttc
+    price_changes = build_variants_grid(dict(depenses_essence = [0, 30 / super_95_ttc, 2 * 30 / super_95_ttc]))
+    result_by_variable = sweep_reactions(
+        simulation,
+        price_changes,
+        elasticity_by_depenses = dict(depenses_essence = 'carburants_elasticite_prix'),
+        variables = ['essence_ticpe', 'tva_total'],
+        )
+    depenses_essence = simulation.calculate('depenses_essence')
+    depenses_essence_ajustees = result_by_variable['depenses_essence_ajustees']
+    assert depenses_essence_ajustees.shape == (3, 1)
+    assert_near(depenses_essence_ajustees[0], depenses_essence, .01)
+    # Same reaction as the depenses_essence_ajustees variable.
+    assert_near(depenses_essence_ajustees[1], simulation.calculate('depenses_essence_ajustees'), .01)
+    assert_near(
+        depenses_essence_ajustees[2] - depenses_essence_ajustees[1],
+        depenses_essence_ajustees[1] - depenses_essence_ajustees[0],
+        .01,
+        )
+    # TICPE is levied per litre: its revenue follows the volumes, which fall when the price rises.
+    essence_ticpe = result_by_variable['essence_ticpe']
+    assert_near(essence_ticpe[0], simulation.calculate('essence_ticpe'), .01)
+    for index, price_change in enumerate(price_changes):
+        volumes_variation = depenses_essence_ajustees[index] / (1 + price_change['depenses_essence']) / \
+            depenses_essence
+        assert_near(essence_ticpe[index], essence_ticpe[0] * volumes_variation, relative_error_margin = 1e-9)
+    assert (essence_ticpe[2] < essence_ticpe[1]).all() and (essence_ticpe[1] < essence_ticpe[0]).all()
+    # Fuel isn't part of the VAT bases.
+    assert_near(result_by_variable['tva_total'][2], simulation.calculate('tva_total'), .01)
+
+
+def test_sweep_reactions_excises_and_ad_valorem_taxes():
+    # With an elasticity of -0.4, a 10 % price rise increases the expenses by 6 % and decreases the volumes by 4 %.
+    simulation = base.new_simulation(2010, menage = menage)
+    result_by_variable = sweep_reactions(
+        simulation,
+        [{'depenses_essence': .1, 'depenses_tva_taux_plein': .1}],
+        elasticity_by_depenses = dict(depenses_essence = -.4, depenses_tva_taux_plein = -.4),
+        variables = ['essence_ticpe', 'tva_taux_plein'],
+        )
+    assert_near(result_by_variable['depenses_essence_ajustees'], simulation.calculate('depenses_essence') * 1.06,
+        relative_error_margin = 1e-6)
+    assert_near(result_by_variable['essence_ticpe'], simulation.calculate('essence_ticpe') * 1.06 / 1.1,
+        relative_error_margin = 1e-6)
+    # VAT is a share of the expenses.
+    assert_near(result_by_variable['tva_taux_plein'], simulation.calculate('tva_taux_plein') * 1.06,
+        relative_error_margin = 1e-6)
+
+
+def test_sweep_reactions_scalar_elasticity():
+    simulation = base.new_simulation(2010, menage = menage)
+    result_by_variable = sweep_reactions(
+        simulation,
+        [{'depenses_tva_taux_super_reduit': .1}],
+        elasticity_by_depenses = dict(depenses_tva_taux_super_reduit = -1),
+        variables = ['tva_taux_super_reduit'],
+        )
+    # With a unit elasticity, expenses don't change.
+    assert_near(
+        result_by_variable['depenses_tva_taux_super_reduit_ajustees'],
+        simulation.calculate('depenses_tva_taux_super_reduit'),
+        .01,
+        )
+    assert_near(result_by_variable['tva_taux_super_reduit'][0], simulation.calculate('tva_taux_super_reduit'), .01)
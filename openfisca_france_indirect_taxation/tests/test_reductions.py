@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from __future__ import division
+
+import os
+import shutil
+import tempfile
+
+import numpy
+
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation.memory_mapped_inputs import materialize_input_arrays
+from openfisca_france_indirect_taxation.model.quantiles import WeightedQuantiles
+from openfisca_france_indirect_taxation.reductions import WeightedQuantileSketch, WeightedSum
+from openfisca_france_indirect_taxation.surveys import SurveyScenario
+from openfisca_france_indirect_taxation.synthetic import build_synthetic_input_data_frame, new_synthetic_simulation
+from openfisca_france_indirect_taxation.tests import base
+
+
+def iter_chunks(size, *arrays):
+    for start in range(0, len(arrays[0]), size):
+        yield [array[start:start + size] for array in arrays]
+
+
+def test_weighted_sum():
+    random_state = numpy.random.RandomState(0)
+    values = random_state.lognormal(7, 1, 10000).astype(numpy.float32)
+    weights = random_state.uniform(100, 1000, 10000).astype(numpy.float32)
+    first = WeightedSum('depenses_totales')
+    second = WeightedSum('depenses_totales')
+    for index, (chunk_values, chunk_weights) in enumerate(iter_chunks(777, values, weights)):
+        (first if index % 2 else second).update(chunk_values, chunk_weights)
+    merged = first.merge(second)
+
+    assert merged.count == 10000
+    total = numpy.dot(weights.astype(numpy.float64), values.astype(numpy.float64))
+    assert_near(merged.total, total, relative_error_margin = 1e-12)
+    assert_near(merged.mean, total / weights.astype(numpy.float64).sum(), relative_error_margin = 1e-12)
+
+
+def test_weighted_quantile_sketch():
+    random_state = numpy.random.RandomState(0)
+    values = random_state.lognormal(7, 1, 50000)
+    weights = random_state.uniform(100, 1000, 50000)
+    size = 200
+    sketches = []
+    for chunk_values, chunk_weights in iter_chunks(3000, values, weights):
+        sketches.append(WeightedQuantileSketch('depenses_totales', size = size).update(chunk_values, chunk_weights))
+    sketch = WeightedQuantileSketch('depenses_totales', size = size)
+    for chunk_sketch in sketches:
+        sketch.merge(chunk_sketch)
+
+    assert sketch.count == 50000
+    assert len(sketch.values) <= 2 * size
+    assert (sketch.minimum, sketch.maximum) == (values.min(), values.max())
+    # Compare the weighted ranks of the estimated deciles with their exact ranks.
+    exact = WeightedQuantiles(values, weights)
+    estimated_positions = numpy.interp(sketch.quantiles(10), exact.sorted_data, exact.positions)
+    assert numpy.abs(estimated_positions - numpy.arange(1, 10) / 10).max() < 2 / size
+    deciles = sketch.partition(values, 10)
+    assert deciles.min() == 1 and deciles.max() == 10
+    assert numpy.abs(numpy.bincount(deciles, weights = weights)[1:] / weights.sum() - .1).max() < 2 / size
+
+
+def test_survey_scenario_stream():
+    year = 2011
+    input_data_frame = build_synthetic_input_data_frame(250, year)
+    directory = os.path.join(tempfile.mkdtemp(), 'input_arrays')
+    try:
+        materialize_input_arrays(input_data_frame, directory, base.tax_benefit_system)
+        menages_count_by_chunk = []
+        weighted_sum, sketch = SurveyScenario.stream(
+            [WeightedSum('tva_total'), WeightedQuantileSketch('depenses_totales')],
+            chunk_callback = lambda survey_scenario: menages_count_by_chunk.append(
+                len(survey_scenario.simulation.calculate('pondmen'))),
+            chunk_size = 100,
+            input_arrays_directory = directory,
+            year = year,
+            )
+    finally:
+        shutil.rmtree(os.path.dirname(directory))
+
+    assert menages_count_by_chunk == [100, 100, 50]
+    # Same results as a simulation of the whole population at once.
+    simulation = new_synthetic_simulation(base.tax_benefit_system, input_data_frame, year)
+    pondmen = simulation.calculate('pondmen').astype(numpy.float64)
+    assert weighted_sum.count == sketch.count == 250
+    assert_near(weighted_sum.total, numpy.dot(pondmen, simulation.calculate('tva_total')),
+        relative_error_margin = 1e-6)
+    depenses_totales = simulation.calculate('depenses_totales')
+    assert_near([sketch.minimum, sketch.maximum], [depenses_totales.min(), depenses_totales.max()],
+        relative_error_margin = 1e-6)
+
+
+def test_survey_scenario_stream_population_wide_variables():
+    # Deciles computed chunk by chunk would be those of each chunk.
+    try:
+        SurveyScenario.stream([WeightedSum('niveau_vie_decile')], input_arrays_directory = tempfile.gettempdir(),
+            year = 2011)
+    except ValueError as error:
+        assert 'niveau_vie_decile' in str(error) and 'WeightedQuantileSketch' in str(error)
+    else:
+        raise AssertionError('niveau_vie_decile should not be computed by chunks')
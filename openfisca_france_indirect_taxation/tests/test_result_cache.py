@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import datetime
+import os
+import shutil
+import tempfile
+
+import numpy
+
+from openfisca_core import periods
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation.model.consommation import variables_registry
+from openfisca_france_indirect_taxation.precision import set_dtype_by_variable, set_precision_policy
+from openfisca_france_indirect_taxation.result_cache import (
+    get_formula_source_file_paths,
+    get_variable_code_hash,
+    ResultCache,
+    )
+from openfisca_france_indirect_taxation.surveys import SurveyScenario
+from openfisca_france_indirect_taxation.tests import base
+
+
+def new_survey_scenario(result_cache, year = 2011):
+    survey_scenario = SurveyScenario()
+    survey_scenario.simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = year,
+        personne_de_reference = dict(birth = datetime.date(year - 40, 1, 1)),
+        menage = dict(poste_coicop_111 = 1000, poste_coicop_611 = 200),
+        ).new_simulation()
+    survey_scenario.result_cache = result_cache
+    survey_scenario.result_cache_items = dict(data_year = year)
+    return survey_scenario
+
+
+def test_result_cache_eviction():
+    directory = tempfile.mkdtemp()
+    try:
+        array = numpy.arange(100, dtype = numpy.float64)
+        result_cache = ResultCache(directory = directory)
+        result_cache.set('first', array)
+        file_size = os.path.getsize(result_cache.get_file_path('first'))
+        result_cache.max_size = 2 * file_size
+        result_cache.set('second', array)
+        for age, key in enumerate(['second', 'first']):
+            os.utime(result_cache.get_file_path(key), (1e9 - age, 1e9 - age))
+        # Reading "first" makes "second" the least recently used result.
+        assert_near(result_cache.get('first'), array, 0)
+        result_cache.set('third', array)
+        assert result_cache.get('second') is None
+        assert result_cache.get('first') is not None and result_cache.get('third') is not None
+        assert len(result_cache.get_file_paths()) == 2
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_survey_scenario_result_cache():
+    directory = tempfile.mkdtemp()
+    try:
+        result_cache = ResultCache(directory = directory)
+        survey_scenario = new_survey_scenario(result_cache)
+        tva_total = survey_scenario.calculate('tva_total')
+        assert len(result_cache.get_file_paths()) == 1
+
+        survey_scenario = new_survey_scenario(result_cache)
+        assert_near(survey_scenario.calculate('tva_total'), tva_total, 0)
+        # The cached result is put in the simulation without computing its dependencies.
+        period = survey_scenario.simulation.period
+        assert survey_scenario.simulation.get_or_new_holder('tva_taux_plein').get_array(period) is None
+        assert_near(survey_scenario.simulation.calculate('tva_total'), tva_total, 0)
+        # Other periods and variables have other keys.
+        assert survey_scenario.get_result_key('tva_total', period) != survey_scenario.get_result_key(
+            'tva_total', period.offset(-1))
+        assert survey_scenario.get_result_key('tva_total', period) != survey_scenario.get_result_key(
+            'ticpe_totale', period)
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_result_key_items():
+    survey_scenario = new_survey_scenario(None)
+    period = survey_scenario.simulation.period
+    result_key = survey_scenario.get_result_key('tva_total', period)
+
+    # The storage type of the postes COICOP, read by tva_total, changes its result.
+    previous_dtype_by_variable = set_precision_policy(base.tax_benefit_system, dict(postes_coicop = numpy.float64))
+    try:
+        assert survey_scenario.get_result_key('tva_total', period) != result_key
+    finally:
+        set_dtype_by_variable(base.tax_benefit_system, previous_dtype_by_variable)
+    assert survey_scenario.get_result_key('tva_total', period) == result_key
+
+    # So does the mapping of the postes COICOP to the categories fiscales.
+    registry = variables_registry.get_registry()
+    variables_registry.registry = dict(registry, csv_hash = 'edited')
+    try:
+        assert survey_scenario.get_result_key('tva_total', period) != result_key
+    finally:
+        variables_registry.registry = registry
+    assert survey_scenario.get_result_key('tva_total', period) == result_key
+
+
+def test_variable_code_hash():
+    period = periods.period(2011)
+    tax_benefit_system = base.tax_benefit_system
+    assert get_formula_source_file_paths(tax_benefit_system.column_by_name['categorie_fiscale_1'])[0].endswith(
+        os.path.join('consommation', 'categories_fiscales.py'))
+    # tva_total depends on the categories fiscales, not on the formulas of the TICPE.
+    tva_total_code_hash = get_variable_code_hash(tax_benefit_system, 'tva_total', period)
+    assert tva_total_code_hash != get_variable_code_hash(tax_benefit_system, 'ticpe_totale', period)
+    assert tva_total_code_hash != get_variable_code_hash(tax_benefit_system, 'poste_coicop_111', period)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import datetime
+import os
+import shutil
+import tempfile
+
+import pandas
+
+from openfisca_core import reforms
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation import surveys
+from openfisca_france_indirect_taxation.aggregates import compute_weighted_aggregates
+from openfisca_france_indirect_taxation.runner import run_jobs
+from openfisca_france_indirect_taxation.synthetic import (
+    build_synthetic_input_data_frame,
+    new_synthetic_simulation,
+    write_synthetic_survey,
+    )
+from openfisca_france_indirect_taxation.tests import base
+
+
+def compute_job_taxes(job, variables = None):
+    year = job['year']
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        axes = [dict(count = 3, max = 2000, min = 0, name = 'depenses_carburants')],
+        period = year,
+        personne_de_reference = dict(birth = datetime.date(year - 40, 1, 1)),
+        ).new_simulation()
+    return pandas.DataFrame(dict(
+        menage = range(3) * len(variables),
+        value = [value for variable in variables for value in simulation.calculate(variable)],
+        variable = [variable for variable in variables for _ in range(3)],
+        ))
+
+
+def build_tva_taux_plein_reform(taux_plein):
+    Reform = reforms.make_reform(
+        key = 'tva_taux_plein',
+        name = u"TVA à taux plein de {} %".format(100 * taux_plein),
+        reference = base.tax_benefit_system,
+        )
+
+    def modify_legislation_json(reference_legislation_json_copy):
+        taux_plein_node = reference_legislation_json_copy['children']['imposition_indirecte']['children']['tva'][
+            'children']['taux_plein']
+        for value in taux_plein_node['values']:
+            value['value'] = taux_plein
+        return reference_legislation_json_copy
+
+    reform = Reform()
+    reform.modify_legislation_json(modifier_function = modify_legislation_json)
+    return reform
+
+
+def compute_job_tva(job, variables = None):
+    year = job['year']
+    tax_benefit_system = job.get('reform') or base.tax_benefit_system
+    simulation = tax_benefit_system.new_scenario().init_single_entity(
+        period = year,
+        personne_de_reference = dict(birth = datetime.date(year - 40, 1, 1)),
+        menage = dict(depenses_tva_taux_plein = 125),
+        ).new_simulation()
+    return pandas.DataFrame(dict(
+        value = [simulation.calculate(variable)[0] for variable in variables],
+        variable = variables,
+        ))
+
+
+def check_run_jobs(processes):
+    jobs = [dict(year = 2005), dict(data_year = 2011, year = 2012)]
+    results = list(run_jobs(jobs, function = compute_job_taxes, processes = processes, variables = ['ticpe_totale']))
+
+    assert sorted(job['year'] for job, _ in results) == [2005, 2012]
+    data_frame = pandas.concat([data_frame for _, data_frame in results]).sort_values(['job', 'menage'])
+    assert list(data_frame.columns[:4]) == ['job', 'data_year', 'year', 'reform']
+    assert list(data_frame['data_year']) == [2005] * 3 + [2011] * 3
+    assert list(data_frame['variable']) == ['ticpe_totale'] * 6
+    for job, year in enumerate([2005, 2012]):
+        expected = compute_job_taxes(dict(year = year), variables = ['ticpe_totale'])['value'].values
+        assert_near(data_frame.loc[data_frame['job'] == job, 'value'].values, expected, absolute_error_margin = 1e-3)
+
+
+def test_run_jobs():
+    for processes in (1, 2):
+        yield check_run_jobs, processes
+
+
+def check_run_jobs_with_reform(processes):
+    # Reforms can't be pickled: the workers inherit the jobs by fork.
+    jobs = [dict(year = 2012), dict(reform = build_tva_taux_plein_reform(.25), year = 2012)]
+    data_frame = pandas.concat([
+        data_frame
+        for _, data_frame in run_jobs(jobs, function = compute_job_tva, processes = processes,
+            variables = ['tva_taux_plein'])
+        ]).sort_values('job')
+    assert list(data_frame['reform']) == [None, 'tva_taux_plein']
+    assert_near(data_frame['value'].values, [125 * .196 / 1.196, 25], absolute_error_margin = 1e-3)
+
+
+def test_run_jobs_with_reform():
+    for processes in (1, 2):
+        yield check_run_jobs_with_reform, processes
+
+
+def check_run_jobs_pivot_tables(processes):
+    # The default job creates the survey scenario of the job from the survey data, here a synthetic survey.
+    data_year = 2011
+    input_data_frame = build_synthetic_input_data_frame(200, data_year)
+    config_files_directory = tempfile.mkdtemp()
+    get_input_survey = surveys.get_input_survey
+    try:
+        with open(os.path.join(config_files_directory, 'config.ini'), 'w') as config_file:
+            config_file.write('[collections]\ncollections_directory = {0}\n\n[data]\noutput_directory = {0}\n'.format(
+                config_files_directory))
+        survey = write_synthetic_survey(input_data_frame, data_year, config_files_directory = config_files_directory)
+        surveys.get_input_survey = lambda year: survey if year == data_year else get_input_survey(year)
+        jobs = [dict(year = 2011), dict(data_year = data_year, year = 2012)]
+        data_frame = pandas.concat([
+            data_frame
+            for _, data_frame in run_jobs(jobs, processes = processes, aggfunc = 'sum',
+                columns = ['niveau_vie_decile'], values = ['tva_total', 'depenses_totales'])
+            ])
+    finally:
+        surveys.get_input_survey = get_input_survey
+        shutil.rmtree(config_files_directory)
+
+    assert list(data_frame.columns[:4]) == ['job', 'data_year', 'year', 'reform']
+    assert set(data_frame['data_year']) == set([data_year])
+    for job, year in enumerate([2011, 2012]):
+        simulation = new_synthetic_simulation(base.tax_benefit_system, input_data_frame, year)
+        expected = compute_weighted_aggregates(simulation, ['tva_total', 'depenses_totales'], ['niveau_vie_decile'])
+        result = data_frame[data_frame['job'] == job]
+        assert (result['year'] == year).all()
+        assert list(result['variable']) == list(expected['variable'])
+        assert list(result['niveau_vie_decile']) == list(expected['niveau_vie_decile'])
+        assert_near(result['value'].values, expected['sum'].values, relative_error_margin = 1e-6)
+
+
+def test_run_jobs_pivot_tables():
+    for processes in (1, 2):
+        yield check_run_jobs_pivot_tables, processes
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation.model.base import tax_from_expense_including_tax
+from openfisca_france_indirect_taxation.sweeps import build_variants_grid, sweep
+from openfisca_france_indirect_taxation.tests import base
+
+
+def test_sweep_without_override():
+    for year in (2005, 2010, 2013):
+        simulation = base.new_simulation(year, menage = base.depenses_by_poste)
+        result_by_variable = sweep(simulation, [{}, {}])
+        for variable, result in result_by_variable.iteritems():
+            assert result.shape == (2, 1)
+            assert_near(result[0], simulation.calculate(variable), .01)
+            assert_near(result[1], simulation.calculate(variable), .01)
+
+
+def test_sweep_taux_plein():
+    simulation = base.new_simulation(2010, menage = base.depenses_by_poste)
+    variants = build_variants_grid({'imposition_indirecte.tva.taux_plein': [.196, .25]})
+    result_by_variable = sweep(simulation, variants, variables = ['tva_taux_plein', 'tva_total', 'ticpe_totale'])
+    assert_near(result_by_variable['tva_taux_plein'][:, 0], [
+        tax_from_expense_including_tax(300, .196),
+        tax_from_expense_including_tax(300, .25),
+        ], .01)
+    tva_total = simulation.calculate('tva_total')
+    assert_near(result_by_variable['tva_total'][0], tva_total, .01)
+    assert_near(
+        result_by_variable['tva_total'][1] - result_by_variable['tva_total'][0],
+        tax_from_expense_including_tax(300, .25) - tax_from_expense_including_tax(300, .196),
+        .01,
+        )
+    # TICPE amounts only depend on the excise and the price including taxes, not on taux_plein.
+    assert_near(result_by_variable['ticpe_totale'][1], result_by_variable['ticpe_totale'][0], .01)
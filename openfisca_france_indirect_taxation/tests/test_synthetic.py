@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from __future__ import division
+
+import ConfigParser
+import os
+import shutil
+import tempfile
+
+import numpy
+
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation import surveys
+from openfisca_france_indirect_taxation.synthetic import (
+    build_synthetic_input_data_frame,
+    get_marginals,
+    menages_france_count,
+    new_synthetic_simulation,
+    write_synthetic_survey,
+    )
+from openfisca_france_indirect_taxation.tests import base
+
+
+def test_build_synthetic_input_data_frame():
+    data_frame = build_synthetic_input_data_frame(20000, 2011, seed = 1)
+    assert len(data_frame) == 20000
+    assert data_frame['ident_men'].is_unique
+    assert_near(data_frame['pondmen'].sum(), menages_france_count, relative_error_margin = .01)
+    postes_coicop = [column for column in data_frame.columns if column.startswith('poste_coicop_')]
+    assert len(postes_coicop) > 100
+    assert (data_frame[postes_coicop].values >= 0).all()
+    assert (data_frame['poste_coicop_9901'] == 0).all()
+
+    # Budget shares follow the marginals.
+    marginals = get_marginals(2011)
+    depenses = data_frame[postes_coicop].sum(axis = 1)
+    assert_near(depenses.mean(), marginals['depenses_tot'].mean(), relative_error_margin = .05)
+    assert_near(
+        (data_frame['poste_coicop_722'] / depenses).mean(),
+        marginals['w1'].clip(0).mean(),
+        relative_error_margin = .05,
+        )
+    assert_near(data_frame['veh_diesel'].mean(), marginals['veh_diesel'].mean(), relative_error_margin = .05)
+
+    # Draws are reproducible.
+    data_frame = build_synthetic_input_data_frame(100, 2011, seed = 1)
+    assert (build_synthetic_input_data_frame(100, 2011, seed = 1).values == data_frame.values).all()
+    other_data_frame = build_synthetic_input_data_frame(100, 2011, seed = 2)
+    assert (other_data_frame['poste_coicop_111'].values != data_frame['poste_coicop_111'].values).any()
+
+
+def test_synthetic_simulation():
+    simulation = new_synthetic_simulation(base.tax_benefit_system, build_synthetic_input_data_frame(200, 2011), 2011)
+    assert simulation.entity_by_key_plural['menages'].count == 200
+    for variable in ('taxes_indirectes_total', 'ticpe_totale'):
+        values = simulation.calculate(variable)
+        assert numpy.isfinite(values).all()
+        assert (values > 0).any()
+    assert set(simulation.calculate('niveau_vie_decile')) == set(range(1, 11))
+
+
+def test_write_synthetic_survey():
+    config_files_directory = tempfile.mkdtemp()
+    previous_input_collection = os.environ.pop(surveys.input_collection_environment_variable, None)
+    try:
+        # Survey collection of the Budget des Familles data, as written by build_survey_data.run_all.
+        collection_json_file_path = os.path.join(config_files_directory, 'openfisca_indirect_taxation.json')
+        with open(collection_json_file_path, 'w') as collection_json_file:
+            collection_json_file.write('{"name": "openfisca_indirect_taxation", "surveys": {}}')
+        with open(os.path.join(config_files_directory, 'config.ini'), 'w') as config_file:
+            config_file.write(
+                '[collections]\ncollections_directory = {0}\nopenfisca_indirect_taxation = {1}\n\n'
+                '[data]\noutput_directory = {0}\n'.format(config_files_directory, collection_json_file_path))
+
+        survey = write_synthetic_survey(
+            build_synthetic_input_data_frame(10, 2011), 2011, config_files_directory = config_files_directory)
+        assert survey.name == 'openfisca_indirect_taxation_synthetic_data_2011'
+        assert os.path.basename(survey.hdf5_file_path) == 'openfisca_indirect_taxation_synthetic_data_2011.h5'
+        with open(collection_json_file_path) as collection_json_file:
+            assert collection_json_file.read() == '{"name": "openfisca_indirect_taxation", "surveys": {}}'
+        config = ConfigParser.SafeConfigParser()
+        config.read(os.path.join(config_files_directory, 'config.ini'))
+        assert config.get('collections', 'openfisca_indirect_taxation') == collection_json_file_path
+
+        assert surveys.get_input_collection() == 'openfisca_indirect_taxation'
+        os.environ[surveys.input_collection_environment_variable] = surveys.synthetic_input_collection
+        assert surveys.get_input_collection() == 'openfisca_indirect_taxation_synthetic'
+    finally:
+        if previous_input_collection is None:
+            os.environ.pop(surveys.input_collection_environment_variable, None)
+        else:
+            os.environ[surveys.input_collection_environment_variable] = previous_input_collection
+        shutil.rmtree(config_files_directory)
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import itertools
+
+from pandas import DataFrame
+
+from openfisca_core import periods
+from openfisca_core.legislations import ParameterNotFound
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation.model.base import get_legislation_snapshot
+from openfisca_france_indirect_taxation.model.consommation import categories_fiscales
+from openfisca_france_indirect_taxation.model.consommation.postes_coicop import (
+    build_postes_coicop_block,
+    set_postes_coicop_block,
+    )
+from openfisca_france_indirect_taxation.model.taxes_indirectes.taux_effectifs import (
+    build_coefficient_by_taxe,
+    taux_effectifs_applicables,
+    taxes_by_total,
+    )
+from openfisca_france_indirect_taxation.tests import base
+
+
+# Années de matrice_passage_by_year dont la législation manque de paramètres : les formules échouent comme la voie
+# rapide.
+annees_non_couvertes = (1994, 1995, 1996, 1997, 1998, 1999, 2014)
+# En 2004, la formule de assurance_transport_taxe change le 5 août : les formules ne savent pas la calculer sur l'année.
+variables_sans_formule_annuelle_by_year = {
+    2004: ('assurance_transport_taxe', 'total_assurances_taxe', 'taxes_indirectes_total_hors_tva'),
+    }
+
+
+def new_simulation_with_all_postes(year):
+    """Crée une simulation avec une dépense distincte sur chaque poste COICOP de la nomenclature de l'année."""
+    postes_coicop = categories_fiscales.matrice_passage_by_year[year][0]
+    return base.new_simulation(year, menage = dict(
+        ('poste_coicop_{}'.format(poste_coicop), 10 + index)
+        for index, poste_coicop in enumerate(postes_coicop)
+        ))
+
+
+def check_taux_effectifs_by_year(year):
+    simulation = new_simulation_with_all_postes(year)
+    period = periods.period(year)
+    assert taux_effectifs_applicables(simulation, period)
+    reference_simulation = new_simulation_with_all_postes(year)
+    reference_simulation.calculate('tva_total')
+    assert not taux_effectifs_applicables(reference_simulation, period)
+
+    if year in annees_non_couvertes:
+        for tested_simulation in (simulation, reference_simulation):
+            try:
+                tested_simulation.calculate('taxes_indirectes_total')
+            except ParameterNotFound:
+                pass
+            else:
+                raise AssertionError('taxes_indirectes_total should fail for {}'.format(year))
+        return
+
+    taxes_indirectes_total = simulation.calculate('taxes_indirectes_total')
+    assert taxes_indirectes_total > 0
+    variables_sans_formule_annuelle = variables_sans_formule_annuelle_by_year.get(year, ())
+    if not variables_sans_formule_annuelle:
+        assert_near(taxes_indirectes_total, reference_simulation.calculate('taxes_indirectes_total'), .01)
+    categories_fiscales_variables = [
+        u'categorie_fiscale_{}'.format(categorie_fiscale)
+        for categorie_fiscale in categories_fiscales.matrice_passage_by_year[year][1]
+        ]
+    # Les taxes qui ne sont pas en vigueur dans l'année sont laissées aux formules.
+    taxes = build_coefficient_by_taxe(get_legislation_snapshot(simulation, period.start)).keys()
+    for variable in itertools.chain(categories_fiscales_variables, taxes_by_total, taxes):
+        if variable == 'taxes_indirectes_total':
+            continue
+        if variable in variables_sans_formule_annuelle:
+            try:
+                reference_simulation.calculate(variable)
+            except AssertionError:
+                continue
+            raise AssertionError('{} should have no yearly formula for {}'.format(variable, year))
+        assert_near(simulation.calculate(variable), reference_simulation.calculate(variable), .01,
+            message = u'{} ({}): '.format(variable, year))
+
+
+def test_taux_effectifs():
+    for year in (2005, 2010, 2013):
+        simulation = base.new_simulation(year, menage = base.depenses_by_poste)
+        assert taux_effectifs_applicables(simulation, periods.period(year))
+        taxes_indirectes_total = simulation.calculate('taxes_indirectes_total')
+
+        # Computing tva_total first disables the fast path: the formulas are used.
+        reference_simulation = base.new_simulation(year, menage = base.depenses_by_poste)
+        reference_simulation.calculate('tva_total')
+        assert not taux_effectifs_applicables(reference_simulation, periods.period(year))
+        assert_near(taxes_indirectes_total, reference_simulation.calculate('taxes_indirectes_total'), .01)
+        legislation = get_legislation_snapshot(simulation, periods.instant(year))
+        for variable in taxes_by_total.keys() + build_coefficient_by_taxe(legislation).keys():
+            assert_near(simulation.calculate(variable), reference_simulation.calculate(variable), .01)
+
+
+def test_taux_effectifs_by_year():
+    for year in sorted(categories_fiscales.matrice_passage_by_year):
+        yield check_taux_effectifs_by_year, year
+
+
+def test_taux_effectifs_with_postes_coicop_block():
+    simulation = base.new_simulation(2010, menage = base.depenses_by_poste)
+    set_postes_coicop_block(simulation, build_postes_coicop_block(DataFrame(dict(
+        (poste, [depenses])
+        for poste, depenses in base.depenses_by_poste.iteritems()
+        if poste != 'poste_coicop_2201'  # Read from its holder
+        ))))
+    assert taux_effectifs_applicables(simulation, periods.period(2010))
+    taxes_indirectes_total = simulation.calculate('taxes_indirectes_total')
+
+    reference_simulation = base.new_simulation(2010, menage = base.depenses_by_poste)
+    reference_simulation.calculate('tva_total')
+    assert_near(taxes_indirectes_total, reference_simulation.calculate('taxes_indirectes_total'), .01)
+    assert_near(
+        simulation.calculate('cigarette_droit_d_accise'),
+        reference_simulation.calculate('cigarette_droit_d_accise'),
+        .01,
+        )
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import multiprocessing
+
+import openfisca_france_indirect_taxation
+from openfisca_france_indirect_taxation import get_tax_benefit_system
+from openfisca_france_indirect_taxation.tests import base
+
+
+def is_tax_benefit_system_inherited(_):
+    return openfisca_france_indirect_taxation.shared_tax_benefit_system is not None and \
+        'categorie_fiscale_1' in get_tax_benefit_system().column_by_name
+
+
+def test_shared_tax_benefit_system():
+    assert get_tax_benefit_system() is base.tax_benefit_system
+    assert 'poste_coicop_111' in base.tax_benefit_system.column_by_name
+
+
+def test_shared_tax_benefit_system_in_forked_workers():
+    get_tax_benefit_system()
+    pool = multiprocessing.Pool(2)
+    try:
+        assert all(pool.map(is_tax_benefit_system_inherited, range(4)))
+    finally:
+        pool.terminate()
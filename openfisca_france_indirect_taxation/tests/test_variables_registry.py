@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import json
+
+from openfisca_france_indirect_taxation.model.consommation import variables_registry
+from openfisca_france_indirect_taxation.tests import base
+
+
+def test_registry_is_up_to_date():
+    # Run scripts/build_variables_registry.py when "Parametres fiscalite indirecte.csv" changes.
+    with open(variables_registry.registry_file_path) as registry_file:
+        registry = json.load(registry_file)
+    assert registry['csv_hash'] == variables_registry.get_csv_hash()
+    assert registry == json.loads(json.dumps(variables_registry.build_registry(csv_hash = registry['csv_hash'])))
+
+
+def test_registry_variables():
+    registry = variables_registry.get_registry()
+    column_by_name = base.tax_benefit_system.column_by_name
+    for poste, label in registry['postes_coicop']:
+        assert column_by_name['poste_coicop_{}'.format(poste)].label == label
+    for categorie_fiscale, intervals in registry['intervals_by_categorie_fiscale']:
+        assert 'categorie_fiscale_{}'.format(categorie_fiscale) in column_by_name
@@ -167,9 +167,24 @@ def check_calculate_output(yaml_path, name, period_str, test, force):
                     )
 
 
-def test(force = False, name_filter = None, options_by_path = None):
-    if isinstance(name_filter, str):
-        name_filter = name_filter.decode('utf-8')
+def get_options_by_path(paths):
+    """Renvoie les options des fichiers ou répertoires de tests donnés, celles de leur répertoire par défaut."""
+    options_by_path = collections.OrderedDict()
+    for path in paths:
+        path = os.path.abspath(path).rstrip(os.sep)
+        dir = path if os.path.isdir(path) else os.path.dirname(path)
+        options = options_by_dir.get(dir)
+        if options is None:
+            options = dict(
+                calculate_output = False,
+                default_absolute_error_margin = 0.005,
+                )
+        options_by_path[path] = options
+    return options_by_path
+
+
+def iter_yaml_paths(force = False, options_by_path = None):
+    """Renvoie les fichiers YAML de tests à exécuter, avec les options de leur chemin."""
     if options_by_path is None:
         options_by_path = options_by_dir
     for path, options in options_by_path.iteritems():
@@ -187,51 +202,56 @@ def test(force = False, name_filter = None, options_by_path = None):
                 ]
         else:
             yaml_paths = [path]
+        for yaml_path in yaml_paths:
+            yield yaml_path, options
 
-        reform_keys = options.get('reforms')
-        tax_benefit_system_for_path = base.get_cached_composed_reform(
-            reform_keys = reform_keys,
+
+def load_yaml_file(yaml_path, options, force = False, name_filter = None):
+    """Renvoie les tests d'un fichier YAML, convertis, sous forme de couples (nom, test)."""
+    if isinstance(name_filter, str):
+        name_filter = name_filter.decode('utf-8')
+    filename_core = os.path.splitext(os.path.basename(yaml_path))[0]
+    with open(yaml_path) as yaml_file:
+        tests = yaml.load(yaml_file)
+    tests, error = conv.pipe(
+        conv.make_item_to_singleton(),
+        conv.uniform_sequence(
+            conv.noop,
+            drop_none_items = True,
+            ),
+        )(tests)
+    if error is not None:
+        embedding_error = conv.embed_error(tests, u'errors', error)
+        assert embedding_error is None, embedding_error
+        raise ValueError("Error in test {}:\n{}".format(yaml_path, yaml.dump(tests, allow_unicode = True,
+            default_flow_style = False, indent = 2, width = 120)))
+
+    for test in tests:
+        test, error = scenarios.make_json_or_python_to_test(
             tax_benefit_system = base.tax_benefit_system,
-            ) if reform_keys is not None else base.tax_benefit_system
+            default_absolute_error_margin = options['default_absolute_error_margin'],
+            )(test)
+        if error is not None:
+            embedding_error = conv.embed_error(test, u'errors', error)
+            assert embedding_error is None, embedding_error
+            raise ValueError("Error in test {}:\n{}\nYaml test content: \n{}\n".format(
+                yaml_path, error, yaml.dump(test, allow_unicode = True,
+                default_flow_style = False, indent = 2, width = 120)))
+
+        if not force and test.get(u'ignore', False):
+            continue
+        if name_filter is not None and name_filter not in filename_core \
+                and name_filter not in (test.get('name', u'')) \
+                and name_filter not in (test.get('keywords', [])):
+            continue
+        yield test.get('name') or filename_core, test
 
-        for yaml_path in yaml_paths:
-            filename_core = os.path.splitext(os.path.basename(yaml_path))[0]
-            with open(yaml_path) as yaml_file:
-                tests = yaml.load(yaml_file)
-            tests, error = conv.pipe(
-                conv.make_item_to_singleton(),
-                conv.uniform_sequence(
-                    conv.noop,
-                    drop_none_items = True,
-                    ),
-                )(tests)
-            if error is not None:
-                embedding_error = conv.embed_error(tests, u'errors', error)
-                assert embedding_error is None, embedding_error
-                raise ValueError("Error in test {}:\n{}".format(yaml_path, yaml.dump(tests, allow_unicode = True,
-                    default_flow_style = False, indent = 2, width = 120)))
-
-            for test in tests:
-                test, error = scenarios.make_json_or_python_to_test(
-                    tax_benefit_system = tax_benefit_system_for_path,
-                    default_absolute_error_margin = options['default_absolute_error_margin'],
-                    )(test)
-                if error is not None:
-                    embedding_error = conv.embed_error(test, u'errors', error)
-                    assert embedding_error is None, embedding_error
-                    raise ValueError("Error in test {}:\n{}\nYaml test content: \n{}\n".format(
-                        yaml_path, error, yaml.dump(test, allow_unicode = True,
-                        default_flow_style = False, indent = 2, width = 120)))
-
-                if not force and test.get(u'ignore', False):
-                    continue
-                if name_filter is not None and name_filter not in filename_core \
-                        and name_filter not in (test.get('name', u'')) \
-                        and name_filter not in (test.get('keywords', [])):
-                    continue
-                checker = check_calculate_output if options['calculate_output'] else check
-                yield checker, yaml_path, test.get('name') or filename_core, unicode(test['scenario'].period), test, \
-                    force
+
+def test(force = False, name_filter = None, options_by_path = None):
+    for yaml_path, options in iter_yaml_paths(force = force, options_by_path = options_by_path):
+        checker = check_calculate_output if options['calculate_output'] else check
+        for name, test in load_yaml_file(yaml_path, options, force = force, name_filter = name_filter):
+            yield checker, yaml_path, name, unicode(test['scenario'].period), test, force
 
 
 if __name__ == "__main__":
@@ -248,20 +268,7 @@ if __name__ == "__main__":
     args = parser.parse_args()
     logging.basicConfig(level = logging.DEBUG if args.verbose else logging.WARNING, stream = sys.stdout)
 
-    if args.paths:
-        options_by_path = collections.OrderedDict()
-        for path in args.paths:
-            path = os.path.abspath(path).rstrip(os.sep)
-            dir = path if os.path.isdir(path) else os.path.dirname(path)
-            options = options_by_dir.get(dir)
-            if options is None:
-                options = dict(
-                    calculate_output = False,
-                    default_absolute_error_margin = 0.005,
-                    )
-            options_by_path[path] = options
-    else:
-        options_by_path = None
+    options_by_path = get_options_by_path(args.paths) if args.paths else None
 
     tests_found = False
     for test_index, (function, yaml_path, name, period_str, test, force) in enumerate(
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+
+# OpenFisca -- A versatile microsimulation software
+# By: OpenFisca Team <contact@openfisca.fr>
+#
+# Copyright (C) 2011, 2012, 2013, 2014, 2015 OpenFisca Team
+# https://github.com/openfisca
+#
+# This file is part of OpenFisca.
+#
+# OpenFisca is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# OpenFisca is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from openfisca_france_indirect_taxation.tests import base, test_yaml, yaml_runner
+
+
+formulas_directory = os.path.join(os.path.dirname(__file__), 'formulas')
+
+
+def get_individual_statuses():
+    status_by_test = dict()
+    for checker, yaml_path, name, period_str, test, force in test_yaml.test():
+        try:
+            checker(yaml_path, name, period_str, test, force)
+        except AssertionError:
+            status = 'failed'
+        else:
+            status = 'passed'
+        status_by_test[(yaml_path, name, period_str)] = status
+    return status_by_test
+
+
+def test_run_yaml_tests():
+    # Batched or not, in one or several processes, the runner gives the same results as test_yaml.
+    status_by_test = get_individual_statuses()
+    for kwargs in (dict(processes = 1), dict(processes = 2), dict(batch = False, processes = 1)):
+        results = yaml_runner.run_yaml_tests(**kwargs)
+        assert dict(
+            ((result['yaml_path'], result['name'], result['period']), result['status'])
+            for result in results
+            ) == status_by_test, kwargs
+        assert all(result['time'] >= 0 for result in results)
+
+
+def test_batch():
+    yaml_path = os.path.join(formulas_directory, 'categorie_fiscale.yaml')
+    results = yaml_runner.run_yaml_tests(options_by_path = test_yaml.get_options_by_path([yaml_path]))
+    assert [result['status'] for result in results] == ['passed'] * 3
+    assert [result['batch_size'] for result in results] == [3] * 3
+
+
+def test_population_wide_variables_are_not_batched():
+    # Alone, a household is always in the last decile: in a batch, the other household would change its decile.
+    directory = tempfile.mkdtemp()
+    try:
+        yaml_path = os.path.join(directory, 'deciles.yaml')
+        with open(yaml_path, 'w') as yaml_file:
+            yaml_file.write(
+                '- name: "Bas revenu"\n'
+                '  period: "2011"\n'
+                '  input_variables:\n'
+                '    rev_disponible: 1000\n'
+                '  output_variables:\n'
+                '    rev_disponible_decile: 3\n'
+                '- name: "Haut revenu"\n'
+                '  period: "2011"\n'
+                '  input_variables:\n'
+                '    rev_disponible: 50000\n'
+                '  output_variables:\n'
+                '    rev_disponible_decile: 10\n'
+                )
+        options_by_path = test_yaml.get_options_by_path([yaml_path])
+        results = yaml_runner.run_yaml_tests(options_by_path = options_by_path, processes = 1)
+        unbatched_results = yaml_runner.run_yaml_tests(options_by_path = options_by_path, batch = False,
+            processes = 1)
+    finally:
+        shutil.rmtree(directory)
+
+    assert [result['status'] for result in results] == ['failed', 'passed']
+    assert [result['status'] for result in unbatched_results] == ['failed', 'passed']
+    assert [result['batch_size'] for result in results] == [1, 1]
+    assert '[10] differs from [3]' in results[0]['message']
+
+
+def test_build_batch_input_variables():
+    yaml_path = os.path.join(formulas_directory, 'age.yaml')
+    options = test_yaml.options_by_dir[formulas_directory]
+    tax_benefit_system = base.tax_benefit_system
+    tests = [
+        test
+        for _, test in test_yaml.load_yaml_file(yaml_path, options)
+        if test['scenario'].period.start.year == 2013
+        ]
+    count_by_key_plural_list = [
+        yaml_runner.get_entity_count_by_key_plural(test, tax_benefit_system)
+        for test in tests
+        ]
+    assert count_by_key_plural_list == [dict(individus = 1, menages = 1)] * 2
+    input_variables, offset_by_key_plural_list = yaml_runner.build_batch_input_variables(
+        tests, count_by_key_plural_list, tax_benefit_system)
+
+    assert offset_by_key_plural_list == [dict(), dict(individus = 1, menages = 1)]
+    period = tests[0]['scenario'].period
+    assert (input_variables['ident_men'][period] == [0, 1]).all()
+    birth = input_variables['birth'][period]
+    # The first test has no birth date: it gets the default one.
+    assert birth[0] == np.array(tax_benefit_system.column_by_name['birth'].default, dtype = birth.dtype)
+    assert str(birth[1]) == '1973-01-01'
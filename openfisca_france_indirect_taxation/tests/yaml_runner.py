@@ -0,0 +1,408 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Run YAML test files in parallel, sharing the tax and benefit system and batching tests into simulations.
+
+The tax and benefit system is built once, before the worker processes are forked. In each worker, the tests
+of a same period which only use input_variables are concatenated into a single simulation with as many
+households as tests: each output variable is calculated once for the whole batch, then every test checks its own
+rows. A test which fails (or whose batch fails) is run again alone, like test_yaml does: its individual result is
+the reference.
+
+Tests of variables depending on the whole population simulated (quantiles for instance, whose formulas read the
+weights of the households) are always run alone: in a batch, the other tests' households would change their value.
+"""
+
+
+from __future__ import division
+
+import collections
+import logging
+import multiprocessing
+import os
+import time
+import traceback
+
+import numpy as np
+
+from openfisca_core.tools import assert_near
+from openfisca_france_indirect_taxation.dependencies import get_population_wide_variables
+from openfisca_france_indirect_taxation.tests import base, test_yaml
+
+
+log = logging.getLogger(__name__)
+
+statuses = ('passed', 'failed', 'error')
+
+
+class NotBatchable(Exception):
+    pass
+
+
+def get_entity_count_by_key_plural(test, tax_benefit_system):
+    """
+    Renvoie le nombre d'entités de chaque type simulées par un test, comme les compte Scenario.fill_simulation.
+
+    Lève NotBatchable si le test ne peut pas être concaténé à d'autres.
+    """
+    scenario = test['scenario']
+    if scenario.test_case is not None or scenario.axes is not None:
+        raise NotBatchable(u'Test uses a test case')
+    column_by_name = tax_benefit_system.column_by_name
+    input_variables = scenario.input_variables or {}
+    count_by_key_plural = dict()
+    for variable_name, array_by_period in sorted(input_variables.iteritems()):
+        key_plural = column_by_name[variable_name].entity_key_plural
+        for array in array_by_period.itervalues():
+            if count_by_key_plural.setdefault(key_plural, len(array)) != len(array):
+                raise NotBatchable(u'Inconsistent lengths of {} input variables'.format(key_plural))
+
+    for key_plural, entity_class in tax_benefit_system.entity_class_by_key_plural.iteritems():
+        if entity_class.is_persons_entity:
+            persons_count = count_by_key_plural.setdefault(key_plural, 1)
+    for key_plural, entity_class in tax_benefit_system.entity_class_by_key_plural.iteritems():
+        if entity_class.is_persons_entity:
+            continue
+        index = input_variables.get(entity_class.index_for_person_variable_name, {}).get(scenario.period)
+        count = persons_count if index is None else int(max(index)) + 1
+        if count_by_key_plural.setdefault(key_plural, count) != count:
+            raise NotBatchable(u'Inconsistent count of {}'.format(key_plural))
+    return count_by_key_plural
+
+
+def get_batch_key(test, tax_benefit_system):
+    """
+    Renvoie la clé des tests pouvant être simulés ensemble : même période et mêmes variables calculées données en
+    entrée (une variable d'entrée absente d'un test prend sa valeur par défaut, pas une variable calculée).
+    """
+    scenario = test['scenario']
+    column_by_name = tax_benefit_system.column_by_name
+    input_variables = scenario.input_variables or {}
+    return scenario.period, frozenset(
+        (variable_name, period)
+        for variable_name, array_by_period in input_variables.iteritems()
+        if not column_by_name[variable_name].is_input_variable()
+        for period in array_by_period
+        )
+
+
+def build_batch_input_variables(tests, count_by_key_plural_list, tax_benefit_system):
+    """
+    Concatène les input_variables des tests, en décalant les index des entités de chaque test.
+
+    Renvoie les input_variables du lot et, pour chaque test, le rang de sa première entité de chaque type.
+    """
+    column_by_name = tax_benefit_system.column_by_name
+    entity_class_by_key_plural = tax_benefit_system.entity_class_by_key_plural
+    persons_key_plural = [
+        key_plural
+        for key_plural, entity_class in entity_class_by_key_plural.iteritems()
+        if entity_class.is_persons_entity
+        ][0]
+    index_variable_key_plural_by_name = dict(
+        (entity_class.index_for_person_variable_name, key_plural)
+        for key_plural, entity_class in entity_class_by_key_plural.iteritems()
+        if not entity_class.is_persons_entity
+        )
+
+    offset_by_key_plural_list = []
+    offset_by_key_plural = collections.defaultdict(int)
+    for count_by_key_plural in count_by_key_plural_list:
+        offset_by_key_plural_list.append(dict(offset_by_key_plural))
+        for key_plural, count in count_by_key_plural.iteritems():
+            offset_by_key_plural[key_plural] += count
+
+    periods_by_variable_name = collections.OrderedDict()
+    for test in tests:
+        for variable_name, array_by_period in (test['scenario'].input_variables or {}).iteritems():
+            periods_by_variable_name.setdefault(variable_name, set()).update(array_by_period)
+    simulation_period = tests[0]['scenario'].period
+    for variable_name in index_variable_key_plural_by_name:
+        periods_by_variable_name.setdefault(variable_name, set()).add(simulation_period)
+
+    input_variables = dict()
+    for variable_name, periods in periods_by_variable_name.iteritems():
+        column = column_by_name[variable_name]
+        index_key_plural = index_variable_key_plural_by_name.get(variable_name)
+        input_variables[variable_name] = array_by_period = dict()
+        for period in periods:
+            arrays = []
+            for test, count_by_key_plural, offset_by_key_plural in zip(
+                    tests, count_by_key_plural_list, offset_by_key_plural_list):
+                array = (test['scenario'].input_variables or {}).get(variable_name, {}).get(period)
+                if index_key_plural is not None:
+                    if array is None:
+                        array = np.arange(count_by_key_plural[persons_key_plural])
+                    array = array + offset_by_key_plural.get(index_key_plural, 0)
+                elif array is None:
+                    array = np.empty(count_by_key_plural[column.entity_key_plural], dtype = column.dtype)
+                    array.fill(column.default)
+                arrays.append(np.asarray(array, dtype = column.dtype))
+            array_by_period[period] = np.concatenate(arrays)
+    return input_variables, offset_by_key_plural_list
+
+
+def iter_expected_values(test, force = False):
+    """Itère sur les triplets (variable, période ou None, valeur attendue) vérifiés par un test."""
+    output_variables = test.get(u'output_variables')
+    if output_variables is None:
+        return
+    output_variables_name_to_ignore = test.get(u'output_variables_name_to_ignore') or set()
+    for variable_name, expected_value in output_variables.iteritems():
+        if not force and variable_name in output_variables_name_to_ignore:
+            continue
+        if isinstance(expected_value, dict):
+            for requested_period, expected_value_at_period in expected_value.iteritems():
+                yield variable_name, requested_period, expected_value_at_period
+        else:
+            yield variable_name, None, expected_value
+
+
+def new_result(yaml_path, name, period_str, status = 'passed', message = None, batch_size = 1, duration = 0):
+    return collections.OrderedDict((
+        ('yaml_path', yaml_path),
+        ('name', name),
+        ('period', period_str),
+        ('status', status),
+        ('message', message),
+        ('batch_size', batch_size),
+        ('time', duration),
+        ))
+
+
+def run_test(yaml_path, name, period_str, test, options, force = False):
+    """Exécute un test seul, avec le vérificateur de test_yaml, et renvoie son résultat."""
+    checker = test_yaml.check_calculate_output if options['calculate_output'] else test_yaml.check
+    start_time = time.time()
+    try:
+        checker(yaml_path, name, period_str, test, force)
+    except AssertionError as error:
+        status, message = 'failed', unicode(error)
+    except Exception:
+        status, message = 'error', traceback.format_exc().decode('utf-8')
+    else:
+        status, message = 'passed', None
+    return new_result(yaml_path, name, period_str, status = status, message = message,
+        duration = time.time() - start_time)
+
+
+def run_batch(items, tax_benefit_system, force = False):
+    """
+    Exécute un lot de tests dans une seule simulation et renvoie leurs résultats.
+
+    items est une liste de tuples (yaml_path, name, period_str, test, options, count_by_key_plural). Les tests qui
+    échouent dans le lot sont exécutés à nouveau seuls.
+    """
+    tests = [item[3] for item in items]
+    count_by_key_plural_list = [item[5] for item in items]
+    start_time = time.time()
+    try:
+        input_variables, offset_by_key_plural_list = build_batch_input_variables(
+            tests, count_by_key_plural_list, tax_benefit_system)
+        scenario = tax_benefit_system.new_scenario()
+        scenario.period = tests[0]['scenario'].period
+        scenario.input_variables = input_variables
+        simulation = scenario.new_simulation()
+    except Exception:
+        log.info(u'Unable to build a batch of {} tests: running them individually'.format(len(items)))
+        return [
+            run_test(yaml_path, name, period_str, test, options, force = force)
+            for yaml_path, name, period_str, test, options, _ in items
+            ]
+    shared_time = (time.time() - start_time) / len(items)
+
+    column_by_name = tax_benefit_system.column_by_name
+    results = []
+    for (yaml_path, name, period_str, test, options, count_by_key_plural), offset_by_key_plural in zip(
+            items, offset_by_key_plural_list):
+        start_time = time.time()
+        try:
+            for variable_name, requested_period, expected_value in iter_expected_values(test, force):
+                # Variables are calculated once for the whole batch: the following tests hit the cache.
+                array = simulation.calculate(variable_name, requested_period)
+                key_plural = column_by_name[variable_name].entity_key_plural
+                offset = offset_by_key_plural.get(key_plural, 0)
+                assert_near(
+                    array[offset:offset + count_by_key_plural[key_plural]],
+                    expected_value,
+                    absolute_error_margin = test.get('absolute_error_margin'),
+                    message = u'{}@{}: '.format(variable_name, requested_period or period_str),
+                    relative_error_margin = test.get('relative_error_margin'),
+                    )
+        except Exception:
+            result = run_test(yaml_path, name, period_str, test, options, force = force)
+            result['time'] += time.time() - start_time + shared_time
+        else:
+            result = new_result(yaml_path, name, period_str, batch_size = len(items),
+                duration = time.time() - start_time + shared_time)
+        results.append(result)
+
+    if getattr(simulation, 'weighted_quantiles_by_key', None):
+        # A formula compared the households of the batch: no batched result can be trusted.
+        log.info(u'Quantiles calculated in a batch of {} tests: running them individually'.format(len(items)))
+        results = [
+            batch_result if batch_result['batch_size'] == 1
+            else run_test(yaml_path, name, period_str, test, options, force = force)
+            for batch_result, (yaml_path, name, period_str, test, options, _) in zip(results, items)
+            ]
+    return results
+
+
+def run_yaml_files(arguments):
+    """Exécute les tests d'un groupe de fichiers YAML et renvoie la liste de leurs résultats, avec leur rang."""
+    indexed_yaml_paths, force, name_filter, batch = arguments
+    results = []
+    items_by_batch_key = collections.OrderedDict()
+    for file_index, yaml_path, options in indexed_yaml_paths:
+        tax_benefit_system = base.tax_benefit_system
+        try:
+            tests = list(test_yaml.load_yaml_file(yaml_path, options, force = force, name_filter = name_filter))
+        except Exception:
+            result = new_result(yaml_path, None, None, status = 'error',
+                message = traceback.format_exc().decode('utf-8'))
+            results.append(((file_index, 0), result))
+            continue
+        for test_index, (name, test) in enumerate(tests):
+            period_str = unicode(test['scenario'].period)
+            rank = (file_index, test_index)
+            item = (yaml_path, name, period_str, test, options)
+            if batch and not options['calculate_output']:
+                try:
+                    count_by_key_plural = get_entity_count_by_key_plural(test, tax_benefit_system)
+                except NotBatchable:
+                    pass
+                else:
+                    batch_key = get_batch_key(test, tax_benefit_system)
+                    items_by_batch_key.setdefault(batch_key, ([], [], tax_benefit_system))
+                    items_by_batch_key[batch_key][0].append(rank)
+                    items_by_batch_key[batch_key][1].append(item + (count_by_key_plural,))
+                    continue
+            results.append((rank, run_test(*item, force = force)))
+
+    for ranks, items, tax_benefit_system in items_by_batch_key.itervalues():
+        variables = sorted(set(
+            variable_name
+            for item in items
+            for variable_name, _, _ in iter_expected_values(item[3], force)
+            ))
+        population_wide_variables = get_population_wide_variables(
+            tax_benefit_system, items[0][3]['scenario'].period, variables)
+        batch_ranks = []
+        batch_items = []
+        for rank, item in zip(ranks, items):
+            if population_wide_variables.intersection(
+                    variable_name for variable_name, _, _ in iter_expected_values(item[3], force)):
+                results.append((rank, run_test(*item[:5], force = force)))
+            else:
+                batch_ranks.append(rank)
+                batch_items.append(item)
+        if batch_items:
+            results.extend(zip(batch_ranks, run_batch(batch_items, tax_benefit_system, force = force)))
+    return results
+
+
+def split_yaml_paths(yaml_paths_and_options, groups_count):
+    """Répartit les fichiers en groupes de tailles (en octets) voisines, en commençant par les plus gros."""
+    groups = [[] for _ in range(groups_count)]
+    sizes = [0] * groups_count
+    indexed_yaml_paths = sorted(
+        (
+            (file_index, yaml_path, options)
+            for file_index, (yaml_path, options) in enumerate(yaml_paths_and_options)
+            ),
+        key = lambda (file_index, yaml_path, options): -os.path.getsize(yaml_path),
+        )
+    for indexed_yaml_path in indexed_yaml_paths:
+        group_index = sizes.index(min(sizes))
+        groups[group_index].append(indexed_yaml_path)
+        sizes[group_index] += os.path.getsize(indexed_yaml_path[1])
+    return [group for group in groups if group]
+
+
+def run_yaml_tests(options_by_path = None, force = False, name_filter = None, processes = None, batch = True):
+    """
+    Exécute les tests YAML (tous ceux de test_yaml par défaut) et renvoie la liste de leurs résultats, dans l'ordre
+    des fichiers et des tests.
+
+    Chaque résultat est un OrderedDict : yaml_path, name, period, status (passed, failed ou error), message,
+    batch_size (nombre de tests de la simulation qui l'a validé, 1 s'il a été exécuté seul) et time (en secondes,
+    la part du test dans le temps de son lot). Les fichiers sont répartis sur processes processus (par défaut, un
+    par cœur).
+    """
+    yaml_paths_and_options = list(test_yaml.iter_yaml_paths(force = force, options_by_path = options_by_path))
+    if not yaml_paths_and_options:
+        return []
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = max(1, min(processes, len(yaml_paths_and_options)))
+
+    # The tax and benefit system was built in the main process when tests.base was imported: the forked workers
+    # inherit it.
+    tasks = [
+        (group, force, name_filter, batch)
+        for group in split_yaml_paths(yaml_paths_and_options, processes)
+        ]
+    if processes == 1:
+        ranked_results = [ranked_result for task in tasks for ranked_result in run_yaml_files(task)]
+    else:
+        log.info(u'Running {} YAML files on {} processes'.format(len(yaml_paths_and_options), processes))
+        pool = multiprocessing.Pool(processes)
+        try:
+            ranked_results = [
+                ranked_result
+                for task_results in pool.imap_unordered(run_yaml_files, tasks)
+                for ranked_result in task_results
+                ]
+        finally:
+            pool.terminate()
+    return [result for _, result in sorted(ranked_results, key = lambda (rank, result): rank)]
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('paths', help = "path (file or directory) of tests to execute", metavar = 'PATH', nargs = '*')
+    parser.add_argument('-f', '--force', action = 'store_true', default = False,
+        help = 'force testing of tests with "ignore" flag and formulas belonging to "ignore_output_variables" list')
+    parser.add_argument('-n', '--name', default = None, help = "partial name of tests to execute")
+    parser.add_argument('--no-batch', action = 'store_true', default = False,
+        help = "run each test in its own simulation")
+    parser.add_argument('-p', '--processes', default = None, type = int,
+        help = "number of worker processes (default: number of cores)")
+    parser.add_argument('-s', '--slowest', default = 10, type = int, help = "number of slowest tests to report")
+    parser.add_argument('-v', '--verbose', action = 'store_true', default = False, help = "increase output verbosity")
+    args = parser.parse_args()
+    logging.basicConfig(level = logging.DEBUG if args.verbose else logging.WARNING, stream = sys.stdout)
+
+    start_time = time.time()
+    results = run_yaml_tests(
+        options_by_path = test_yaml.get_options_by_path(args.paths) if args.paths else None,
+        force = args.force,
+        name_filter = args.name,
+        processes = args.processes,
+        batch = not args.no_batch,
+        )
+    if not results:
+        print("No test found!")
+        sys.exit(1)
+
+    for result in results:
+        if result['status'] != 'passed':
+            title = u"{}: {} {} - {}".format(result['status'].upper(), result['yaml_path'], result['name'],
+                result['period'])
+            print(u"=" * len(title))
+            print(title.encode('utf-8'))
+            print(u"=" * len(title))
+            print(result['message'].encode('utf-8'))
+    if args.slowest:
+        print("Slowest tests:")
+        for result in sorted(results, key = lambda result: -result['time'])[:args.slowest]:
+            print(u"  {:.4f}s {} {} - {} (batch of {})".format(result['time'], os.path.basename(result['yaml_path']),
+                result['name'], result['period'], result['batch_size']).encode('utf-8'))
+    count_by_status = collections.Counter(result['status'] for result in results)
+    print("{} tests in {:.3f}s: {}".format(len(results), time.time() - start_time, ', '.join(
+        '{} {}'.format(count_by_status[status], status) for status in statuses)))
+    sys.exit(0 if count_by_status['passed'] == len(results) else 1)
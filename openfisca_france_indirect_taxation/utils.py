@@ -26,10 +26,16 @@
 from __future__ import division
 
 
+import collections
+import cPickle
+import hashlib
+import json
 import os
+import tempfile
 
 
 import logging
+import numpy
 import pandas
 import pkg_resources
 
@@ -44,6 +50,278 @@ assets_directory = os.path.join(
     )
 
 
+def get_cache_directory():
+    """
+    Renvoie le répertoire de cache de l'utilisateur, en le créant au besoin, ou None s'il ne peut être créé.
+
+    Le répertoire est $OPENFISCA_INDIRECT_TAXATION_CACHE_DIR s'il est défini, sinon
+    $XDG_CACHE_HOME/openfisca-france-indirect-taxation (~/.cache par défaut) : les caches ne sont jamais écrits dans
+    le paquet installé.
+    """
+    cache_directory = os.environ.get('OPENFISCA_INDIRECT_TAXATION_CACHE_DIR')
+    if not cache_directory:
+        cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        cache_directory = os.path.join(cache_home, 'openfisca-france-indirect-taxation')
+    if not os.path.isdir(cache_directory):
+        try:
+            os.makedirs(cache_directory)
+        except OSError:
+            if not os.path.isdir(cache_directory):
+                log.warning(u'Unable to create cache directory {}: caching disabled'.format(cache_directory))
+                return None
+    return cache_directory
+
+
+parametres_fiscalite_csv_file_path = os.path.join(
+    assets_directory,
+    'legislation',
+    'Parametres fiscalite indirecte.csv',
+    )
+
+
+def get_file_hash(*file_paths):
+    """Renvoie l'empreinte SHA-1 du contenu des fichiers, dans l'ordre donné."""
+    sha1 = hashlib.sha1()
+    for file_path in file_paths:
+        with open(file_path, 'rb') as file_object:
+            for chunk in iter(lambda: file_object.read(1 << 16), b''):
+                sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+asset_tables_cache_version = 1
+
+
+def data_frame_to_columns(data_frame):
+    """
+    Convertit une table en tableaux numpy typés, colonne par colonne, pour le cache binaire des assets.
+
+    Les entiers sont stockés sur le plus petit type qui les contient, les chaînes sous forme de codes et de
+    catégories. Seules les colonnes d'objets hétérogènes restent des tableaux d'objets.
+    """
+    assert has_default_index(data_frame), "Only tables with a default index can be cached"
+    array_by_key = dict()
+    columns = []
+    for index, name in enumerate(data_frame.columns):
+        key = 'column_{}'.format(index)
+        values = data_frame[name].values
+        column = dict(
+            bytes_name = isinstance(name, str),
+            dtype = values.dtype.str,
+            name = name.decode('utf-8') if isinstance(name, str) else name,
+            )
+        if values.dtype.kind in 'iu':
+            for dtype in (numpy.int8, numpy.int16, numpy.int32):
+                if len(values) == 0 or (
+                        numpy.iinfo(dtype).min <= values.min() and values.max() <= numpy.iinfo(dtype).max):
+                    values = values.astype(dtype)
+                    break
+            column['kind'] = 'integer'
+        elif values.dtype.kind == 'O' and all(
+                isinstance(value, basestring) or (isinstance(value, float) and numpy.isnan(value))
+                for value in values
+                ):
+            codes, categories = pandas.factorize(values)
+            if all(isinstance(category, str) for category in categories):
+                categories = numpy.array(categories, dtype = str)
+            else:
+                categories = numpy.array(
+                    [category.decode('utf-8') if isinstance(category, str) else category for category in categories],
+                    dtype = unicode,
+                    )
+            array_by_key[key + '_categories'] = categories
+            values = codes.astype(numpy.int16 if len(categories) < 1 << 15 else numpy.int32)
+            column['kind'] = 'categorical'
+        else:
+            column['kind'] = 'object' if values.dtype.kind == 'O' else 'array'
+        array_by_key[key] = values
+        columns.append(column)
+    return columns, array_by_key
+
+
+def columns_to_data_frame(columns, array_by_key):
+    values_by_name = collections.OrderedDict()
+    for index, column in enumerate(columns):
+        key = 'column_{}'.format(index)
+        values = array_by_key[key]
+        if column['kind'] == 'categorical':
+            categories = numpy.append(array_by_key[key + '_categories'].astype(object), numpy.nan)
+            values = categories[values]  # Code -1 selects the trailing NaN.
+        else:
+            values = values.astype(numpy.dtype(column['dtype']), copy = False)
+        name = column['name'].encode('utf-8') if column['bytes_name'] else column['name']
+        values_by_name[name] = values
+    return pandas.DataFrame(values_by_name, columns = values_by_name.keys())
+
+
+def get_asset_table_cache_file_path(file_path, reader_kwargs):
+    key = hashlib.sha1(json.dumps([os.path.abspath(file_path), sorted(reader_kwargs.iteritems())])).hexdigest()
+    return os.path.join(
+        get_cache_directory(),
+        'assets',
+        '{}-{}.pickle'.format(os.path.splitext(os.path.basename(file_path))[0].replace(' ', '_'), key[:16]),
+        )
+
+
+def read_asset_table(file_path, reader = None, **reader_kwargs):
+    """
+    Lit une table des assets (CSV ou XLS) à travers le cache binaire en colonnes de l'utilisateur, plus rapide à
+    charger que le CSV et surtout que le XLS.
+
+    Le cache est valide tant que la taille et la date de modification du fichier source n'ont pas changé, ou à
+    défaut tant que son empreinte est la même. Il est écrit dans le répertoire de cache de l'utilisateur, jamais
+    dans le paquet installé.
+    """
+    if reader is None:
+        reader = pandas.read_excel if file_path.endswith('.xls') else pandas.read_csv
+    cache_directory = get_cache_directory()
+    if cache_directory is None:
+        return reader(file_path, **reader_kwargs)
+
+    source_stat = os.stat(file_path)
+    cache_file_path = get_asset_table_cache_file_path(file_path, reader_kwargs)
+    source_hash = None
+    if os.path.exists(cache_file_path):
+        try:
+            with open(cache_file_path, 'rb') as cache_file:
+                metadata, array_by_key = cPickle.load(cache_file)
+            if metadata['version'] == asset_tables_cache_version:
+                if metadata['source_size'] == source_stat.st_size and \
+                        metadata['source_mtime'] == source_stat.st_mtime:
+                    return columns_to_data_frame(metadata['columns'], array_by_key)
+                source_hash = get_file_hash(file_path)
+                if metadata['source_hash'] == source_hash:
+                    # Same content with a new modification time (fresh checkout...): refresh the cache metadata.
+                    data_frame = columns_to_data_frame(metadata['columns'], array_by_key)
+                    write_asset_table_cache(cache_file_path, data_frame, source_stat, source_hash)
+                    return data_frame
+        except Exception:
+            log.warning(u'Unable to read asset table cache {}: rebuilding it'.format(cache_file_path))
+
+    data_frame = reader(file_path, **reader_kwargs)
+    write_asset_table_cache(cache_file_path, data_frame, source_stat, source_hash or get_file_hash(file_path))
+    return data_frame
+
+
+def has_default_index(data_frame):
+    return data_frame.index.equals(pandas.Index(numpy.arange(len(data_frame))))
+
+
+def write_asset_table_cache(cache_file_path, data_frame, source_stat, source_hash):
+    if not has_default_index(data_frame):
+        # Read with index_col for example: the cache only stores columns, so the table is read from its source.
+        log.info(u'Asset table cache {} not written: the table has no default index'.format(cache_file_path))
+        return
+    columns, array_by_key = data_frame_to_columns(data_frame)
+    metadata = dict(
+        columns = columns,
+        source_hash = source_hash,
+        source_mtime = source_stat.st_mtime,
+        source_size = source_stat.st_size,
+        version = asset_tables_cache_version,
+        )
+    cache_directory = os.path.dirname(cache_file_path)
+    try:
+        if not os.path.isdir(cache_directory):
+            os.makedirs(cache_directory)
+        # Write to a temporary file then rename it, so that concurrent processes never read a partial file.
+        with tempfile.NamedTemporaryFile(dir = cache_directory, delete = False) as cache_file:
+            cPickle.dump((metadata, array_by_key), cache_file, cPickle.HIGHEST_PROTOCOL)
+        os.rename(cache_file.name, cache_file_path)
+    except (IOError, OSError):
+        log.warning(u'Unable to write asset table cache {}'.format(cache_file_path))
+
+
+def get_hdf_columns(hdf5_file_path, key):
+    """Renvoie les noms des colonnes d'une table HDF5 écrite par pandas, sans lire ses valeurs."""
+    store = pandas.HDFStore(hdf5_file_path, mode = 'r')
+    try:
+        storer = store.get_storer(key)
+        if storer.is_table:
+            return list(storer.non_index_axes[0][1])
+        return list(storer.read_index('axis0'))
+    finally:
+        store.close()
+
+
+def read_fixed_format_columns(storer, columns):
+    """
+    Lit les colonnes demandées d'une table pandas au format "fixed", bloc de valeurs par bloc de valeurs.
+
+    Cette lecture repose sur la disposition interne des tables "fixed" de pandas et PyTables : elle vérifie que la
+    table a bien la disposition attendue et lève ValueError sinon.
+    """
+    import tables
+
+    stored_columns = storer.read_index('axis0')
+    index = storer.read_index('axis1')
+    selected_columns = set(columns)
+    array_by_column = dict()
+    blocks_columns = []
+    for block_index in range(storer.nblocks):
+        block_key = 'block{}_values'.format(block_index)
+        block_columns = storer.read_index('block{}_items'.format(block_index))
+        blocks_columns.extend(block_columns)
+        positions = [
+            position
+            for position, column in enumerate(block_columns)
+            if column in selected_columns
+            ]
+        if not positions:
+            continue
+        node = getattr(storer.group, block_key)
+        attributes = node._v_attrs
+        if not isinstance(node, tables.VLArray) and getattr(attributes, 'transposed', False) and \
+                getattr(attributes, 'shape', None) is None and getattr(attributes, 'value_type', None) is None:
+            if node.shape != (len(index), len(block_columns)):
+                raise ValueError('Unexpected shape {} of block {}'.format(node.shape, block_key))
+            # Blocks are stored transposed (rows x columns): read only the selected columns.
+            values = node[:, positions].T
+        else:
+            # Object, date and empty blocks are read entirely.
+            values = storer.read_array(block_key)[positions]
+        for position, column_values in zip(positions, values):
+            if len(column_values) != len(index):
+                raise ValueError('Unexpected length of column {}'.format(block_columns[position]))
+            array_by_column[block_columns[position]] = column_values
+    if sorted(blocks_columns) != sorted(stored_columns):
+        raise ValueError('The blocks of the table do not hold its columns')
+    return pandas.DataFrame(
+        collections.OrderedDict((column, array_by_column[column]) for column in columns),
+        columns = columns,
+        index = index,
+        )
+
+
+def read_hdf_columns(hdf5_file_path, key, columns):
+    """
+    Lit seulement certaines colonnes d'une table HDF5 écrite par pandas.
+
+    Au format "table", la sélection est faite par pandas. Au format "fixed" (celui des tables du survey manager),
+    pandas ne sait lire que la table entière : les blocs de valeurs sans colonne demandée ne sont pas lus, et seules
+    les colonnes demandées des blocs numériques sont lues (voir read_fixed_format_columns). Si la table n'a pas la
+    disposition attendue (autre version de pandas ou de PyTables), elle est lue entière par pandas.
+    """
+    store = pandas.HDFStore(hdf5_file_path, mode = 'r')
+    try:
+        storer = store.get_storer(key)
+        if storer.is_table:
+            return store.select(key, columns = columns)
+        assert storer.ndim == 2, "Only data frames can be read by columns"
+        missing_columns = set(columns).difference(storer.read_index('axis0'))
+        if missing_columns:
+            raise KeyError(u'Columns {} are missing from table {} of {}'.format(
+                sorted(missing_columns), key, hdf5_file_path).encode('utf-8'))
+        try:
+            return read_fixed_format_columns(storer, columns)
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError) as error:
+            log.info(u'Unable to read columns of table {} of {} block by block ({}): reading it entirely'.format(
+                key, hdf5_file_path, error))
+        return store.get(key)[columns]
+    finally:
+        store.close()
+
+
 def get_transfert_data_frames(year = None):
     assert year is not None
     matrice_passage_csv_file_path = os.path.join(
@@ -52,15 +330,14 @@ def get_transfert_data_frames(year = None):
         'Matrice passage {}-COICOP.csv'.format(year),
         )
     if os.path.exists(matrice_passage_csv_file_path):
-        matrice_passage_data_frame = pandas.read_csv(matrice_passage_csv_file_path)
+        matrice_passage_data_frame = read_asset_table(matrice_passage_csv_file_path)
     else:
         matrice_passage_xls_file_path = os.path.join(
             assets_directory,
             'legislation',
             'Matrice passage {}-COICOP.xls'.format(year),
             )
-        matrice_passage_data_frame = pandas.read_excel(matrice_passage_xls_file_path)
-        matrice_passage_data_frame.to_csv(matrice_passage_csv_file_path, encoding = 'utf-8')
+        matrice_passage_data_frame = read_asset_table(matrice_passage_xls_file_path)
 
     if year == 2011:
         matrice_passage_data_frame['poste2011'] = \
@@ -99,22 +376,16 @@ def get_transfert_data_frames(year = None):
 
 
 def get_parametres_fiscalite_data_frame(year = None):
-    parametres_fiscalite_csv_file_path = os.path.join(
-        assets_directory,
-        'legislation',
-        'Parametres fiscalite indirecte.csv',
-        )
     if os.path.exists(parametres_fiscalite_csv_file_path):
-        parametres_fiscalite_data_frame = pandas.read_csv(parametres_fiscalite_csv_file_path)
+        parametres_fiscalite_data_frame = read_asset_table(parametres_fiscalite_csv_file_path)
     else:
         parametres_fiscalite_xls_file_path = os.path.join(
             assets_directory,
             'legislation',
             'Parametres fiscalite indirecte.xls',
             )
-        parametres_fiscalite_data_frame = pandas.read_excel(parametres_fiscalite_xls_file_path,
+        parametres_fiscalite_data_frame = read_asset_table(parametres_fiscalite_xls_file_path,
             sheetname = "categoriefiscale")
-        parametres_fiscalite_data_frame.to_csv(parametres_fiscalite_csv_file_path, encoding = 'utf-8')
 
     if year:
         selected_parametres_fiscalite_data_frame = \
@@ -57,6 +57,7 @@ setup(
     extras_require = dict(
         tests = [
             'pandas >= 0.17',
+            'tables',
             ],
         ),
     include_package_data = True,  # Will read MANIFEST.in